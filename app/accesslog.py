@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from pathlib import Path
+from typing import Any
+
+from app.body import json_dumps
+from app.config import AccessLogConfig
+
+LOGGER_NAME = "app.access"
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks: a full queue drops the record and counts it.  Records are
+    queued as they are; JSON encoding happens on the writer thread."""
+
+    def __init__(self, records: queue.Queue[Any]) -> None:
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The writer thread is still draining, so waiting for room is safe.
+        self.queue.put(self._sentinel)
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = getattr(record, "access", None)
+        if entry is None:
+            entry = {"message": record.getMessage()}
+        return json_dumps(entry).decode("utf-8")
+
+
+class AccessLog:
+    """One JSON line per proxied request, written off the event loop.
+
+    :meth:`log` samples the entry and hands it to a bounded queue; a
+    :class:`~logging.handlers.QueueListener` thread encodes and writes it to
+    stdout or ``path``.  When the writer falls behind (a slow log driver or
+    disk) new entries are dropped and counted instead of stalling requests.
+    Failed requests are always logged; ``sample_rate`` applies to the rest.
+    """
+
+    def __init__(self, config: AccessLogConfig) -> None:
+        self.config = config
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=config.queue_size)
+        self._handler = _DroppingQueueHandler(self._queue)
+        if config.path:
+            Path(config.path).parent.mkdir(parents=True, exist_ok=True)
+            output: logging.Handler = WatchedFileHandler(config.path, encoding="utf-8")
+        else:
+            output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonLineFormatter())
+        self._output = output
+        self._listener = _Listener(self._queue, output)
+        self._started = False
+        self.logged = 0
+        self.sampled_out = 0
+
+    def log(self, entry: dict[str, Any]) -> None:
+        rate = self.config.sample_rate
+        if rate < 1.0 and entry.get("status", 0) < 400 and random.random() >= rate:
+            self.sampled_out += 1
+            return
+        self.logged += 1
+        # Built directly rather than through a Logger: no caller lookup, and
+        # access entries never reach the root handlers.
+        record = logging.LogRecord(LOGGER_NAME, logging.INFO, "", 0, "access", None, None)
+        record.access = entry
+        self._handler.handle(record)
+
+    def start(self) -> None:
+        if not self._started:
+            self._listener.start()
+            self._started = True
+
+    def close(self) -> None:
+        """Write what is queued and detach from the logger."""
+        if self._started:
+            self._listener.stop()
+            self._started = False
+        self._output.close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "logged": self.logged - self._handler.dropped,
+            "sampled_out": self.sampled_out,
+            "dropped": self._handler.dropped,
+            "queued": self._queue.qsize(),
+        }
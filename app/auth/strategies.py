@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import functools
 import hashlib
 import importlib
 import inspect
@@ -9,6 +11,7 @@ import os
 import time
 import uuid
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Callable
 
@@ -36,10 +39,61 @@ class AuthContext:
     upstream_model: str
 
 
+class CredentialCache:
+    """Reuses signed headers within a validity window.
+
+    Windows are aligned to wall-clock multiples of ``ttl_seconds``.  Only use
+    it for credentials whose inputs are all fixed within the window: every
+    request in a window gets the exact same headers, including any request
+    or trace id they carry.  A non-positive ttl disables caching.
+    """
+
+    def __init__(self, ttl_seconds: float = 1.0) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, tuple[int, dict[str, str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _window(self) -> int:
+        return int(time.time() // self.ttl_seconds)
+
+    def get(self, key: str) -> dict[str, str] | None:
+        if self.ttl_seconds <= 0:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == self._window():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, headers: dict[str, str]) -> None:
+        if self.ttl_seconds > 0:
+            self._entries[key] = (self._window(), headers)
+
+    def stats(self) -> dict[str, Any]:
+        return {"ttl_seconds": self.ttl_seconds, "hits": self.hits, "misses": self.misses}
+
+
+def _is_async_callable(fn: Callable[..., Any]) -> bool:
+    if inspect.iscoroutinefunction(fn):
+        return True
+    call = getattr(fn, "__call__", None)
+    return inspect.iscoroutinefunction(call)
+
+
 class AuthStrategy(ABC):
+    cache: CredentialCache | None = None
+
     @abstractmethod
     async def headers(self, context: AuthContext) -> dict[str, str]:
-        pass
+        """Return auth headers; callers must not mutate the returned dict."""
+
+    def close(self) -> None:
+        """Release background resources (thread pools etc.)."""
+
+    def stats(self) -> dict[str, Any]:
+        return self.cache.stats() if self.cache is not None else {}
 
 
 class NoAuth(AuthStrategy):
@@ -73,6 +127,7 @@ class QwenSignatureAuth(AuthStrategy):
         fixed_capability_name: str | None = None,
         token_header: str | None = None,
         token_prefix: str = "Bearer ",
+        token_ttl_seconds: float = 0.0,
     ) -> None:
         self.appid = appid
         self.appkey = appkey
@@ -80,25 +135,27 @@ class QwenSignatureAuth(AuthStrategy):
         self.fixed_capability_name = fixed_capability_name
         self.token_header = token_header
         self.token_prefix = token_prefix
+        # X-Server-Param carries a fresh request id per call, so caching
+        # (token_ttl_seconds > 0) makes every request in a window share it.
+        self.cache = CredentialCache(token_ttl_seconds)
+        self._csid_prefixes: dict[str, str] = {}
 
     async def headers(self, context: AuthContext) -> dict[str, str]:
-        if not self.appid:
-            raise RuntimeError(f"Provider '{context.provider_id}' resolved empty appid.")
-        if not self.appkey:
-            raise RuntimeError(f"Provider '{context.provider_id}' resolved empty appkey.")
-
-        capability = self.fixed_capability_name or context.upstream_model
-        if self.capability_from == "fixed" and not self.fixed_capability_name:
-            raise RuntimeError(
-                f"Provider '{context.provider_id}' sets capability_from=fixed "
-                "but fixed_capability_name is empty."
-            )
-        capability_name = _get_capability_name_24(capability)
-        request_id = uuid.uuid4().hex
+        cached = self.cache.get(context.upstream_model) if self.cache is not None else None
+        if cached is not None:
+            return cached
+        headers = self._sign(context)
+        if self.cache is not None:
+            self.cache.put(context.upstream_model, headers)
+        return headers
 
+    def _sign(self, context: AuthContext) -> dict[str, str]:
+        prefix = self._csid_prefixes.get(context.upstream_model)
+        if prefix is None:
+            prefix = self._csid_prefixes[context.upstream_model] = self._csid_prefix(context)
         x_server_param = {
             "appid": self.appid,
-            "csid": f"{self.appid}{capability_name}{request_id}",
+            "csid": f"{prefix}{uuid.uuid4().hex}",
         }
         encoded_param = _encode_base64(x_server_param)
         current_time = str(int(time.time()))
@@ -113,6 +170,20 @@ class QwenSignatureAuth(AuthStrategy):
             headers[self.token_header] = f"{self.token_prefix}{self.appkey}"
         return headers
 
+    def _csid_prefix(self, context: AuthContext) -> str:
+        if not self.appid:
+            raise RuntimeError(f"Provider '{context.provider_id}' resolved empty appid.")
+        if not self.appkey:
+            raise RuntimeError(f"Provider '{context.provider_id}' resolved empty appkey.")
+
+        capability = self.fixed_capability_name or context.upstream_model
+        if self.capability_from == "fixed" and not self.fixed_capability_name:
+            raise RuntimeError(
+                f"Provider '{context.provider_id}' sets capability_from=fixed "
+                "but fixed_capability_name is empty."
+            )
+        return f"{self.appid}{_get_capability_name_24(capability)}"
+
 
 class InternalApiKeyResolverAuth(AuthStrategy):
     def __init__(
@@ -127,6 +198,9 @@ class InternalApiKeyResolverAuth(AuthStrategy):
         model_id_from: str = "upstream_model",
         token_header: str = "Authorization",
         token_prefix: str = "Bearer ",
+        token_ttl_seconds: float = 1.0,
+        resolver_timeout_seconds: float = 10.0,
+        resolver_max_workers: int = 4,
     ) -> None:
         self.request_url_env = request_url_env
         self.api_id_env = api_id_env
@@ -137,7 +211,20 @@ class InternalApiKeyResolverAuth(AuthStrategy):
         self.model_id_from = model_id_from
         self.token_header = token_header
         self.token_prefix = token_prefix
+        self.resolver_timeout_seconds = resolver_timeout_seconds
+        self.resolver_max_workers = resolver_max_workers
         self._resolver = self._load_callable(resolver)
+        self._resolver_is_async = _is_async_callable(self._resolver)
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: dict[str, asyncio.Future[dict[str, str]]] = {}
+        self.cache = CredentialCache(token_ttl_seconds)
+        # Snapshot the env contract once; the hot path never calls os.getenv.
+        self._request_url = os.getenv(request_url_env, "")
+        self._api_id = os.getenv(api_id_env, "")
+        self._api_secret = os.getenv(api_secret_env, "")
+        self._model_source = os.getenv(model_source_env, "")
+        self._trace_id = os.getenv(trace_id_env, "")
+        self._env_model_id = os.getenv(model_id_env, "")
 
     @staticmethod
     def _load_callable(path: str) -> Callable[..., Any]:
@@ -152,33 +239,98 @@ class InternalApiKeyResolverAuth(AuthStrategy):
             raise RuntimeError(f"Resolver '{path}' is not callable.")
         return fn
 
+    @property
+    def shares_tokens(self) -> bool:
+        """Tokens are only reusable when every resolver input is fixed.
+
+        Without ``TRACE_ID`` each request gets its own trace id, so neither
+        the cache nor the sharing of concurrent resolver calls applies.
+        """
+        return bool(self._trace_id)
+
     async def headers(self, context: AuthContext) -> dict[str, str]:
-        request_url = os.getenv(self.request_url_env, "")
-        api_id = os.getenv(self.api_id_env, "")
-        api_secret = os.getenv(self.api_secret_env, "")
-        model_source = os.getenv(self.model_source_env, "")
-        trace_id = os.getenv(self.trace_id_env, "") or uuid.uuid4().hex
         model_id = (
             context.upstream_model
             if self.model_id_from == "upstream_model"
-            else os.getenv(self.model_id_env, "")
+            else self._env_model_id
         )
+        if not self.shares_tokens:
+            return await self._resolve(context, model_id)
+        cached = self.cache.get(model_id) if self.cache is not None else None
+        if cached is not None:
+            return cached
+
+        # Concurrent misses for the same model share one resolver call.
+        pending = self._pending.get(model_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._resolve(context, model_id))
+            self._pending[model_id] = pending
+            pending.add_done_callback(lambda done: self._forget_pending(model_id, done))
+        return await asyncio.shield(pending)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **super().stats(),
+            "resolver": "async" if self._resolver_is_async else "thread",
+            "resolver_pending": len(self._pending),
+            "shares_tokens": self.shares_tokens,
+        }
 
-        token = self._resolver(
-            request_url=request_url,
-            api_key=api_id,
-            api_secret=api_secret,
+    async def _resolve(self, context: AuthContext, model_id: str) -> dict[str, str]:
+        call = functools.partial(
+            self._resolver,
+            request_url=self._request_url,
+            api_key=self._api_id,
+            api_secret=self._api_secret,
             model_id=model_id,
-            model_source=model_source,
-            trace_id=trace_id,
+            model_source=self._model_source,
+            trace_id=self._trace_id or uuid.uuid4().hex,
         )
-        if inspect.isawaitable(token):
-            token = await token
+        try:
+            if self._resolver_is_async:
+                token = await asyncio.wait_for(call(), self.resolver_timeout_seconds)
+            else:
+                # Resolvers may block (vault files, signing daemons); keep them
+                # off the event loop so in-flight streams are not stalled.
+                loop = asyncio.get_running_loop()
+                token = await asyncio.wait_for(
+                    loop.run_in_executor(self._get_executor(), call),
+                    self.resolver_timeout_seconds,
+                )
+                if inspect.isawaitable(token):
+                    token = await asyncio.wait_for(token, self.resolver_timeout_seconds)
+        except asyncio.TimeoutError as exc:
+            raise RuntimeError(
+                f"Provider '{context.provider_id}' resolver timed out after "
+                f"{self.resolver_timeout_seconds}s."
+            ) from exc
         if not token:
             raise RuntimeError(
                 f"Provider '{context.provider_id}' resolver returned empty API key."
             )
-        return {self.token_header: f"{self.token_prefix}{token}"}
+        headers = {self.token_header: f"{self.token_prefix}{token}"}
+        if self.cache is not None and self.shares_tokens:
+            self.cache.put(model_id, headers)
+        return headers
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.resolver_max_workers,
+                thread_name_prefix="auth-resolver",
+            )
+        return self._executor
+
+    def _forget_pending(self, model_id: str, future: asyncio.Future[dict[str, str]]) -> None:
+        if self._pending.get(model_id) is future:
+            del self._pending[model_id]
+        if not future.cancelled():
+            future.exception()
 
 
 def _value_from_raw_or_env(
@@ -251,6 +403,7 @@ def build_auth_strategy(provider_id: str, auth_config: dict[str, Any]) -> AuthSt
             fixed_capability_name=fixed_capability_name,
             token_header=token_header,
             token_prefix=token_prefix,
+            token_ttl_seconds=float(auth_config.get("token_ttl_seconds", 0.0)),
         )
 
     if auth_type == "internal_api_key":
@@ -266,6 +419,9 @@ def build_auth_strategy(provider_id: str, auth_config: dict[str, Any]) -> AuthSt
             model_id_from=str(auth_config.get("model_id_from", "upstream_model")),
             token_header=str(auth_config.get("token_header", "Authorization")),
             token_prefix=str(auth_config.get("token_prefix", "Bearer ")),
+            token_ttl_seconds=float(auth_config.get("token_ttl_seconds", 1.0)),
+            resolver_timeout_seconds=float(auth_config.get("resolver_timeout_seconds", 10.0)),
+            resolver_max_workers=int(auth_config.get("resolver_max_workers", 4)),
         )
 
     raise RuntimeError(f"Provider '{provider_id}' uses unsupported auth type '{auth_type}'.")
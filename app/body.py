@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
+
+_MODEL_KEY = re.compile(rb'"model"\s*:\s*')
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+
+
+def json_loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class RequestBody:
+    """Client request body that can be forwarded without re-serialization.
+
+    The body is decoded once (with orjson when installed) to read ``model``,
+    ``stream`` and friends, but the upstream body is the original bytes with
+    the upstream model name spliced in.  Re-encoding the whole payload only
+    happens when the splice point is ambiguous or the body came from a dict.
+    """
+
+    __slots__ = ("_raw", "_payload")
+
+    def __init__(self, payload: dict[str, Any], raw: bytes | None = None) -> None:
+        self._payload = payload
+        self._raw = raw
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> "RequestBody":
+        return cls(payload)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "RequestBody":
+        """Raises ValueError when the body is not a JSON object."""
+        try:
+            payload = json_loads(raw)
+        except ValueError as exc:
+            raise ValueError("Body must be valid JSON.") from exc
+        if not isinstance(payload, dict):
+            raise ValueError("Body must be a JSON object.")
+        return cls(payload, raw)
+
+    @property
+    def model(self) -> str:
+        return str(self._payload.get("model", "")).strip()
+
+    @property
+    def stream(self) -> bool:
+        return bool(self._payload.get("stream", False))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._payload.get(key, default)
+
+    def to_payload(self) -> dict[str, Any]:
+        return self._payload
+
+    def identity(self, path: str) -> str:
+        """Hash of the exact client bytes (canonical JSON for dict bodies)."""
+        digest = hashlib.sha256(path.encode("utf-8") + b"\0")
+        if self._raw is not None:
+            digest.update(self._raw)
+        else:
+            digest.update(
+                json.dumps(self._payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+            )
+        return digest.hexdigest()
+
+    def forwarded(self, upstream_model: str, *, default_stream: bool | None = None) -> bytes:
+        """Upstream body with ``model`` replaced and ``stream`` defaulted."""
+        add_stream = default_stream is not None and "stream" not in self._payload
+        span = self._model_span()
+        if span is None:
+            payload = dict(self._payload)
+            payload["model"] = upstream_model
+            if add_stream:
+                payload["stream"] = default_stream
+            return json_dumps(payload)
+
+        assert self._raw is not None
+        raw = self._raw
+        parts: list[bytes] = []
+        cursor = 0
+        if add_stream:
+            insert_at = raw.index(b"{") + 1
+            parts.append(raw[:insert_at])
+            parts.append(b'"stream":true,' if default_stream else b'"stream":false,')
+            cursor = insert_at
+        parts.append(raw[cursor : span[0]])
+        parts.append(json_dumps(upstream_model))
+        parts.append(raw[span[1] :])
+        return b"".join(parts)
+
+    def _model_span(self) -> tuple[int, int] | None:
+        if self._raw is None or not isinstance(self._payload.get("model"), str):
+            return None
+        # A quote inside a JSON string is always escaped, so every match is a
+        # real "model" key.  The top-level one is known to exist; if it is
+        # the only match, it is the one to replace.
+        matches = list(_MODEL_KEY.finditer(self._raw))
+        if len(matches) != 1:
+            return None
+        value = _STRING.match(self._raw, matches[0].end())
+        if value is None:
+            return None
+        return value.span()
+
+
+_STRUCTURAL = re.compile(rb'["{}\[\]:,]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_NON_WHITESPACE = re.compile(rb"\S")
+_QUOTE = ord('"')
+_BACKSLASH = ord("\\")
+_MAX_KEY_BYTES = 64
+
+_SCAN = 0
+_AWAIT_VALUE = 1
+_SKIP_VALUE = 2
+
+
+class ModelFieldRewriter:
+    """Replaces the top-level ``"model"`` string of a JSON object as it streams.
+
+    Only the parser state and (short) key being read are kept between
+    chunks; once the value has been replaced the rest of the body is passed
+    through untouched.
+    """
+
+    def __init__(self, model: str) -> None:
+        self._replacement = json_dumps(model)
+        self._done = False
+        self._state = _SCAN
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key_parts: list[bytes] | None = None
+        self._key_size = 0
+        self._last_key: bytes | None = None
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._done or not chunk:
+            return chunk
+        out: list[bytes] = []
+        emit_from = 0
+        key_start = 0
+        pos = 0
+        size = len(chunk)
+        if self._escape:
+            self._escape = False
+            pos = 1
+        while pos < size and not self._done:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(chunk, pos)
+                if match is None:
+                    pos = size
+                    break
+                index = match.start()
+                if chunk[index] == _BACKSLASH:
+                    if index + 1 >= size:
+                        self._escape = True
+                    pos = index + 2
+                    continue
+                self._in_string = False
+                pos = index + 1
+                if self._state == _SKIP_VALUE:
+                    emit_from = pos
+                    self._done = True
+                elif self._key_parts is not None:
+                    self._capture_key(chunk[key_start:index])
+                    self._last_key = b"".join(self._key_parts)
+                    self._key_parts = None
+                continue
+            if self._state == _AWAIT_VALUE:
+                match = _NON_WHITESPACE.search(chunk, pos)
+                if match is None:
+                    pos = size
+                    break
+                index = match.start()
+                if chunk[index] != _QUOTE:
+                    self._done = True
+                    break
+                out.append(chunk[emit_from:index])
+                out.append(self._replacement)
+                self._state = _SKIP_VALUE
+                self._in_string = True
+                pos = index + 1
+                continue
+            match = _STRUCTURAL.search(chunk, pos)
+            if match is None:
+                break
+            index = match.start()
+            char = chunk[index : index + 1]
+            pos = index + 1
+            if char == b'"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._expect_key = False
+                    self._key_parts = []
+                    self._key_size = 0
+                    key_start = pos
+            elif char in b"{[":
+                self._depth += 1
+                if self._depth == 1:
+                    if char == b"[":
+                        self._done = True
+                    self._expect_key = True
+            elif char in b"}]":
+                self._depth -= 1
+                if self._depth <= 0:
+                    self._done = True
+            elif self._depth == 1 and char == b":":
+                if self._last_key == b"model":
+                    self._state = _AWAIT_VALUE
+                self._last_key = None
+            elif self._depth == 1 and char == b",":
+                self._expect_key = True
+
+        if self._key_parts is not None and self._in_string:
+            self._capture_key(chunk[key_start:size])
+        if self._state == _SKIP_VALUE and not self._done:
+            emit_from = size
+        out.append(chunk[emit_from:])
+        return b"".join(out)
+
+    def _capture_key(self, part: bytes) -> None:
+        assert self._key_parts is not None
+        self._key_size += len(part)
+        if self._key_size <= _MAX_KEY_BYTES:
+            self._key_parts.append(part)
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.body import RequestBody
+from app.config import ResponseCacheConfig
+
+logger = logging.getLogger(__name__)
+
+CACHE_HEADER = "x-gateway-cache"
+_OPT_IN_VALUES = {"1", "true", "on", "force"}
+_OPT_OUT_VALUES = {"0", "false", "off", "bypass"}
+_DISK_PRUNE_INTERVAL = 64
+
+
+def payload_fingerprint(
+    path: str,
+    payload: Mapping[str, Any],
+    *,
+    provider_id: str,
+    upstream_model: str,
+) -> str:
+    """Stable hash of a request: key order and whitespace do not matter.
+
+    The resolved route is part of the key, so a config reload that points an
+    alias at another provider or upstream model never serves the old answers.
+    """
+    canonical = json.dumps(
+        {
+            "path": path,
+            "payload": payload,
+            "provider": provider_id,
+            "upstream_model": upstream_model,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_cacheable_request(
+    path: str,
+    payload: Mapping[str, Any] | RequestBody,
+    headers: Mapping[str, str] | None,
+) -> bool:
+    if path != "/chat/completions" or payload.get("stream"):
+        return False
+    directive = (headers or {}).get(CACHE_HEADER, "").strip().lower()
+    if directive in _OPT_OUT_VALUES:
+        return False
+    if directive in _OPT_IN_VALUES:
+        return True
+    temperature = payload.get("temperature")
+    return isinstance(temperature, (int, float)) and temperature == 0
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    status_code: int
+    body: bytes
+    media_type: str
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+
+class ResponseCache:
+    """In-memory LRU with TTL and byte limits, backed by an optional disk tier.
+
+    Disk entries are written atomically (temp file + rename), so several
+    worker processes can share one ``disk_dir``.
+    """
+
+    def __init__(self, config: ResponseCacheConfig) -> None:
+        self.config = config
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self._disk_dir = Path(config.disk_dir) if config.disk_dir else None
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self._disk_dir is not None:
+            self._disk_dir.mkdir(parents=True, exist_ok=True)
+
+    async def get(self, key: str) -> CachedResponse | None:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self._remove(key)
+        if self._disk_dir is not None:
+            entry = await asyncio.to_thread(self._disk_read, key, now)
+            if entry is not None:
+                self.disk_hits += 1
+                self._store_memory(key, entry)
+                return entry
+        self.misses += 1
+        return None
+
+    async def put(
+        self,
+        key: str,
+        *,
+        status_code: int,
+        body: bytes,
+        media_type: str = "application/json",
+    ) -> None:
+        if len(body) > self.config.max_entry_bytes:
+            return
+        entry = CachedResponse(
+            status_code=status_code,
+            body=body,
+            media_type=media_type,
+            expires_at=time.time() + self.config.ttl_seconds,
+        )
+        self._store_memory(key, entry)
+        if self._disk_dir is not None:
+            await asyncio.to_thread(self._disk_write, key, entry)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _store_memory(self, key: str, entry: CachedResponse) -> None:
+        if entry.size > self.config.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.config.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _disk_path(self, key: str) -> Path:
+        assert self._disk_dir is not None
+        return self._disk_dir / key[:2] / f"{key}.bin"
+
+    def _disk_read(self, key: str, now: float) -> CachedResponse | None:
+        path = self._disk_path(key)
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            return None
+        header, sep, body = raw.partition(b"\n")
+        try:
+            meta = json.loads(header) if sep else None
+            entry = CachedResponse(
+                status_code=int(meta["status_code"]),
+                body=body,
+                media_type=str(meta.get("media_type", "application/json")),
+                expires_at=float(meta["expires_at"]),
+            )
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # Truncated or foreign entries (json.JSONDecodeError is a
+            # ValueError) are dropped and count as a miss.
+            entry = None
+        if entry is None or entry.expires_at <= now:
+            path.unlink(missing_ok=True)
+            return None
+        return entry
+
+    def _disk_write(self, key: str, entry: CachedResponse) -> None:
+        path = self._disk_path(key)
+        header = json.dumps(
+            {
+                "status_code": entry.status_code,
+                "media_type": entry.media_type,
+                "expires_at": entry.expires_at,
+            }
+        ).encode("utf-8")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(header + b"\n" + entry.body)
+            os.replace(tmp_name, path)
+        except OSError as exc:
+            logger.warning("Response cache disk write failed: %s", exc)
+            return
+        self._disk_writes += 1
+        if self._disk_writes % _DISK_PRUNE_INTERVAL == 0:
+            self._disk_prune()
+
+    def _disk_prune(self) -> None:
+        assert self._disk_dir is not None
+        files: list[tuple[float, int, Path]] = []
+        total = 0
+        for path in self._disk_dir.glob("*/*.bin"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.config.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
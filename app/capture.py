@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+from pathlib import Path
+from typing import Any
+
+from app.body import json_dumps
+from app.config import CaptureConfig
+
+logger = logging.getLogger(__name__)
+
+FILE_PREFIX = "capture-"
+
+
+class TrafficCapture:
+    """Sampled request/response records in rotating JSONL files, for
+    ``python -m app.replay``.
+
+    :meth:`record` only appends to an in-memory buffer; a background task
+    encodes and writes the buffer on a worker thread every
+    ``flush_interval_seconds``, so the request path never waits on the disk.
+    Records beyond ``buffer_records`` are dropped and counted.  Each process
+    writes its own ``capture-<time>-<pid>-<n>.jsonl``, starts a new one past
+    ``max_file_bytes`` and deletes the oldest beyond ``max_files``.
+    """
+
+    def __init__(self, config: CaptureConfig) -> None:
+        self.config = config
+        self.dir = Path(config.dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._buffer: list[dict[str, Any]] = []
+        self._file: Path | None = None
+        self._file_bytes = 0
+        self._sequence = 0
+        self._task: asyncio.Task[None] | None = None
+        self.written = 0
+        self.dropped = 0
+
+    def sample(self) -> bool:
+        rate = self.config.sample_rate
+        return rate >= 1.0 or random.random() < rate
+
+    def record(self, entry: dict[str, Any]) -> None:
+        if len(self._buffer) >= self.config.buffer_records:
+            self.dropped += 1
+            return
+        self._buffer.append(entry)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except OSError as exc:
+            self.dropped += len(batch)
+            logger.warning("capture | writing %d records failed: %s", len(batch), exc)
+            return 0
+        self.written += len(batch)
+        return len(batch)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "file": str(self._file) if self._file is not None else None,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.flush_interval_seconds)
+            await self.flush()
+
+    def _write(self, batch: list[dict[str, Any]]) -> None:
+        data = b"".join(json_dumps(entry) + b"\n" for entry in batch)
+        if self._file is None or self._file_bytes >= self.config.max_file_bytes:
+            self._rotate()
+        assert self._file is not None
+        with self._file.open("ab") as handle:
+            handle.write(data)
+        self._file_bytes += len(data)
+
+    def _rotate(self) -> None:
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        self._sequence += 1
+        self._file = self.dir / f"{FILE_PREFIX}{stamp}-{os.getpid()}-{self._sequence:04d}.jsonl"
+        self._file_bytes = 0
+        # Names start with the UTC time, so they sort oldest first.
+        files = sorted(self.dir.glob(f"{FILE_PREFIX}*.jsonl"))
+        stale = [path for path in files if path != self._file]
+        for path in stale[: max(0, len(stale) - self.config.max_files + 1)]:
+            path.unlink(missing_ok=True)
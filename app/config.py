@@ -3,19 +3,36 @@ from __future__ import annotations
 import json
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, Field, ValidationError, model_validator
 
 
 class ConfigError(RuntimeError):
     """Configuration-related error."""
 
 
+class ConcurrencyConfig(BaseModel):
+    max_in_flight: int | None = Field(default=None, ge=1)
+    max_queue: int = Field(default=100, ge=0)
+    max_wait_seconds: float = Field(default=5.0, ge=0)
+
+
+class AdaptiveConcurrencyConfig(BaseModel):
+    enabled: bool = False
+    algorithm: Literal["aimd", "gradient"] = "gradient"
+    initial_limit: int = Field(default=16, ge=1)
+    min_limit: int = Field(default=1, ge=1)
+    max_limit: int = Field(default=256, ge=1)
+    latency_tolerance: float = Field(default=2.0, gt=1)
+    backoff_ratio: float = Field(default=0.9, gt=0, lt=1)
+
+
 class ModelConfig(BaseModel):
     alias: str
     upstream_model: str | None = None
     upstream_model_env: str | None = None
+    concurrency: ConcurrencyConfig = Field(default_factory=ConcurrencyConfig)
 
     def resolve_upstream_model(self, provider_id: str) -> str:
         if self.upstream_model_env:
@@ -36,6 +53,56 @@ class ModelConfig(BaseModel):
         )
 
 
+class PoolConfig(BaseModel):
+    max_connections: int | None = 100
+    max_keepalive_connections: int | None = 20
+    keepalive_expiry: float | None = 5.0
+    http2: bool = False
+    connect_timeout_seconds: float = 30.0
+
+
+class CircuitBreakerConfig(BaseModel):
+    enabled: bool = False
+    consecutive_failures: int = Field(default=5, ge=1)
+    error_rate_threshold: float = Field(default=0.5, gt=0, le=1)
+    min_requests: int = Field(default=20, ge=1)
+    window_seconds: float = Field(default=30.0, gt=0)
+    slow_call_seconds: float | None = None
+    open_seconds: float = Field(default=10.0, gt=0)
+    max_open_seconds: float = Field(default=300.0, gt=0)
+    half_open_probes: int = Field(default=1, ge=1)
+
+
+class RetryConfig(BaseModel):
+    enabled: bool = False
+    max_attempts: int = Field(default=3, ge=1)
+    backoff_base_seconds: float = Field(default=0.05, ge=0)
+    backoff_max_seconds: float = Field(default=1.0, ge=0)
+    retry_statuses: list[int] = Field(default_factory=lambda: [502, 503, 504])
+    budget_ratio: float = Field(default=0.1, ge=0)
+    budget_burst: float = Field(default=10.0, ge=1)
+
+
+class EndpointConfig(BaseModel):
+    base_url: str | None = None
+    base_url_env: str | None = None
+    weight: float = Field(default=1.0, gt=0)
+
+    def resolved_base_url(self, provider_id: str) -> str:
+        if self.base_url:
+            return self.base_url.rstrip("/")
+        if self.base_url_env:
+            value = os.getenv(self.base_url_env, "").strip()
+            if value:
+                return value.rstrip("/")
+            raise ConfigError(
+                f"Provider '{provider_id}' endpoint requires env '{self.base_url_env}'."
+            )
+        raise ConfigError(
+            f"Provider '{provider_id}' endpoint must set base_url or base_url_env."
+        )
+
+
 class ProviderConfig(BaseModel):
     id: str
     provider_type: str = "generic"
@@ -46,6 +113,15 @@ class ProviderConfig(BaseModel):
     extra_headers: dict[str, str] = Field(default_factory=dict)
     path_overrides: dict[str, str] = Field(default_factory=dict)
     timeout_seconds: float = 300.0
+    pool: PoolConfig = Field(default_factory=PoolConfig)
+    endpoints: list[EndpointConfig] = Field(default_factory=list)
+    circuit_breaker: CircuitBreakerConfig = Field(default_factory=CircuitBreakerConfig)
+    retry: RetryConfig = Field(default_factory=RetryConfig)
+    concurrency: ConcurrencyConfig = Field(default_factory=ConcurrencyConfig)
+    adaptive_concurrency: AdaptiveConcurrencyConfig = Field(
+        default_factory=AdaptiveConcurrencyConfig
+    )
+    lane_pools: dict[str, PoolConfig] = Field(default_factory=dict)
 
     def resolved_base_url(self) -> str:
         if self.base_url:
@@ -57,9 +133,74 @@ class ProviderConfig(BaseModel):
             raise ConfigError(
                 f"Provider '{self.id}' requires env '{self.base_url_env}' for base_url."
             )
+        if self.endpoints:
+            return self.endpoints[0].resolved_base_url(self.id)
         raise ConfigError(f"Provider '{self.id}' must set base_url or base_url_env.")
 
 
+class ResponseCacheConfig(BaseModel):
+    enabled: bool = False
+    ttl_seconds: float = 600.0
+    max_bytes: int = 64 * 1024 * 1024
+    max_entry_bytes: int = 4 * 1024 * 1024
+    disk_dir: str | None = None
+    disk_max_bytes: int = 1024 * 1024 * 1024
+
+
+class SingleFlightConfig(BaseModel):
+    enabled: bool = False
+    subscriber_buffer_chunks: int = 1024
+    join_window_bytes: int = 64 * 1024
+
+
+class UsageLedgerConfig(BaseModel):
+    enabled: bool = False
+    path: str = "data/usage.sqlite3"
+    flush_interval_seconds: float = Field(default=2.0, gt=0)
+    max_pending_rows: int = Field(default=10000, ge=1)
+    admin_keys: list[str] = Field(default_factory=list)
+
+
+class CaptureConfig(BaseModel):
+    enabled: bool = False
+    dir: str = "data/capture"
+    sample_rate: float = Field(default=1.0, gt=0, le=1)
+    include_bodies: bool = False
+    max_body_bytes: int = Field(default=1024 * 1024, ge=0)
+    max_file_bytes: int = Field(default=64 * 1024 * 1024, gt=0)
+    max_files: int = Field(default=10, ge=1)
+    buffer_records: int = Field(default=10000, ge=1)
+    flush_interval_seconds: float = Field(default=1.0, gt=0)
+
+
+class AccessLogConfig(BaseModel):
+    enabled: bool = False
+    path: str | None = None
+    sample_rate: float = Field(default=1.0, gt=0, le=1)
+    queue_size: int = Field(default=10000, ge=1)
+
+
+class ServerTimingConfig(BaseModel):
+    enabled: bool = True
+    stream_comment: bool = False
+
+
+class ReloadConfig(BaseModel):
+    watch: bool = True
+    poll_interval_seconds: float = Field(default=2.0, gt=0)
+    sighup: bool = True
+
+
+class AliasGroupMember(BaseModel):
+    alias: str
+    weight: float = Field(default=1.0, gt=0)
+
+
+class AliasGroupConfig(BaseModel):
+    alias: str
+    members: list[AliasGroupMember]
+
+
 def _deep_merge(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
     """Deep merge two dicts. override takes precedence; nested dicts are merged recursively."""
     result = dict(base)
@@ -71,10 +212,67 @@ def _deep_merge(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any
     return result
 
 
+class ClientLimitConfig(BaseModel):
+    requests_per_minute: float | None = Field(default=None, gt=0)
+    request_burst: float | None = Field(default=None, ge=1)
+    tokens_per_minute: int | None = Field(default=None, gt=0)
+    daily_tokens: int | None = Field(default=None, gt=0)
+
+    @property
+    def enabled(self) -> bool:
+        return (
+            self.requests_per_minute is not None
+            or self.tokens_per_minute is not None
+            or self.daily_tokens is not None
+        )
+
+
+class PriorityConfig(BaseModel):
+    lanes: dict[str, float] = Field(
+        default_factory=lambda: {"interactive": 4.0, "batch": 1.0}
+    )
+    default_lane: str = "interactive"
+    header: str = "x-gateway-priority"
+    client_lanes: dict[str, str] = Field(default_factory=dict)
+
+    @model_validator(mode="after")
+    def _check_lanes(self) -> "PriorityConfig":
+        for lane in [self.default_lane, *self.client_lanes.values()]:
+            if lane not in self.lanes:
+                raise ValueError(f"Unknown priority lane '{lane}'.")
+        if any(weight <= 0 for weight in self.lanes.values()):
+            raise ValueError("Priority lane weights must be positive.")
+        return self
+
+
+class SharedStateConfig(BaseModel):
+    path: str | None = None
+    path_env: str = "GATEWAY_STATE_FILE"
+    busy_timeout_seconds: float = Field(default=0.005, ge=0)
+
+    def resolved_path(self) -> str | None:
+        """``path`` wins; otherwise the env var, which ``run()`` sets for
+        multi-worker mode."""
+        return self.path or os.getenv(self.path_env, "").strip() or None
+
+
 class GatewayConfig(BaseModel):
     providers: list[ProviderConfig]
     client_api_keys: list[str] = Field(default_factory=list)
+    client_limits: dict[str, ClientLimitConfig] = Field(default_factory=dict)
+    client_limit_defaults: ClientLimitConfig = Field(default_factory=ClientLimitConfig)
+    priority: PriorityConfig = Field(default_factory=PriorityConfig)
+    shared_state: SharedStateConfig = Field(default_factory=SharedStateConfig)
     provider_defaults: dict[str, dict[str, Any]] = Field(default_factory=dict)
+    response_cache: ResponseCacheConfig = Field(default_factory=ResponseCacheConfig)
+    single_flight: SingleFlightConfig = Field(default_factory=SingleFlightConfig)
+    json_passthrough: bool = False
+    server_timing: ServerTimingConfig = Field(default_factory=ServerTimingConfig)
+    usage_ledger: UsageLedgerConfig = Field(default_factory=UsageLedgerConfig)
+    capture: CaptureConfig = Field(default_factory=CaptureConfig)
+    access_log: AccessLogConfig = Field(default_factory=AccessLogConfig)
+    alias_groups: list[AliasGroupConfig] = Field(default_factory=list)
+    reload: ReloadConfig = Field(default_factory=ReloadConfig)
 
     @classmethod
     def from_file(cls, path: Path) -> "GatewayConfig":
@@ -114,7 +312,7 @@ class GatewayConfig(BaseModel):
         return raw
 
 
-def _resolve_registry_path() -> Path:
+def resolve_registry_path() -> Path:
     default_path = Path("config/model_registry.json")
     configured = os.getenv("MODEL_REGISTRY_FILE")
     path = Path(configured) if configured else default_path
@@ -128,7 +326,7 @@ def _parse_client_keys(value: str) -> list[str]:
 
 
 def load_gateway_config() -> GatewayConfig:
-    config = GatewayConfig.from_file(_resolve_registry_path())
+    config = GatewayConfig.from_file(resolve_registry_path())
     env_keys = _parse_client_keys(os.getenv("GATEWAY_API_KEYS", ""))
     if env_keys:
         merged = list(dict.fromkeys([*config.client_api_keys, *env_keys]))
@@ -3,28 +3,215 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import os
 import time
+from collections.abc import AsyncIterator, Mapping
+from pathlib import Path
 from typing import Any
 
 import httpx
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.responses import Response
 
-from app.config import GatewayConfig
-from app.providers import ModelRouter, ProviderFactory
+from app.accesslog import AccessLog
+from app.body import ModelFieldRewriter, RequestBody
+from app.cache import CACHE_HEADER, ResponseCache, is_cacheable_request, payload_fingerprint
+from app.capture import TrafficCapture
+from app.config import GatewayConfig, ProviderConfig
+from app.ledger import UsageLedger
+from app.metrics import ConnectTimer, MetricsRegistry, status_class
+from app.providers import ModelRoute, ModelRouter, Provider, ProviderFactory
+from app.providers.admission import AdmissionQueue, AdmissionRejected, Priority
+from app.providers.circuit import CircuitOpenError
+from app.providers.retry import backoff_delay, is_retryable_error
+from app.ratelimit import ClientLimit, ClientRateLimiter, mask_key
+from app.singleflight import SingleFlight, StreamSource, SubscriberOverflowError, clone_response
+from app.shared import SharedStore
+from app.sse import ChatCompletionAggregator
+from app.timing import RequestTimings
+from app.usage import TAIL_BYTES, extract_usage, token_counts, total_tokens
 
 logger = logging.getLogger(__name__)
 
+_METRICS_SNAPSHOT_SECONDS = 5.0
+_RETIRE_POLL_SECONDS = 0.5
+# Sections a reload swaps in; changes anywhere else need a restart.
+RELOADABLE_SECTIONS = ("providers", "provider_defaults", "alias_groups", "client_api_keys")
+
+_LiveProviders = dict[str, tuple[ProviderConfig, Provider]]
+
 
 class Gateway:
-    def __init__(self, config: GatewayConfig) -> None:
+    def __init__(
+        self,
+        config: GatewayConfig,
+        *,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
         self.config = config
-        self.router = self._build_router(config)
+        self._transport = transport
+        self.router, self._providers = self._build_router(config, transport)
+        # Providers dropped by a reload, by id(), until their requests finish.
+        self._retiring: dict[int, tuple[Provider, asyncio.Task[None]]] = {}
+        state_path = config.shared_state.resolved_path()
+        self.shared_state = (
+            SharedStore(state_path, config.shared_state.busy_timeout_seconds)
+            if state_path
+            else None
+        )
+        self.metrics = MetricsRegistry(
+            snapshot_dir=Path(state_path).with_suffix(".metrics") if state_path else None
+        )
+        self._snapshot_task: asyncio.Task[None] | None = None
+        self.client_api_keys = set(config.client_api_keys)
+        self.rate_limiter = (
+            ClientRateLimiter(
+                config.client_limits, config.client_limit_defaults, store=self.shared_state
+            )
+            if config.client_limits or config.client_limit_defaults.enabled
+            else None
+        )
+        self.response_cache = (
+            ResponseCache(config.response_cache) if config.response_cache.enabled else None
+        )
+        self.single_flight = (
+            SingleFlight(config.single_flight) if config.single_flight.enabled else None
+        )
+        self.usage_ledger = (
+            UsageLedger(config.usage_ledger) if config.usage_ledger.enabled else None
+        )
+        self.capture = TrafficCapture(config.capture) if config.capture.enabled else None
+        self.access_log = AccessLog(config.access_log) if config.access_log.enabled else None
+        self._lane_weights = dict(config.priority.lanes)
+        self.draining = False
+        self._active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        for provider in self.router.list_providers():
+            self._prepare_provider(provider)
+
+    def _prepare_provider(self, provider: Provider) -> None:
+        # Build the provider's pools up front so config errors surface at
+        # startup (or fail a reload) rather than on the first request.
+        _ = provider.client
+        for lane in provider.lane_pools:
+            provider.client_for(lane)
+        if self.shared_state is not None:
+            for endpoint in provider.endpoints:
+                if endpoint.breaker is not None:
+                    endpoint.breaker.share(
+                        self.shared_state,
+                        f"breaker:{provider.provider_id}:{endpoint.base_url}",
+                    )
+
+    def apply_config(self, config: GatewayConfig) -> dict[str, list[str]]:
+        """Swap in the providers, models, alias groups and client keys of a
+        reloaded ``config`` without interrupting traffic.
+
+        The new :class:`ModelRouter` is built next to the live one and
+        replaces it in a single assignment.  Providers whose settings are
+        unchanged (their model list aside) are carried over with their
+        connection pools, circuit breakers and retry budgets, and so are
+        model admission queues with unchanged limits.  Requests already
+        routed finish on the objects they started with; providers that are
+        no longer used are closed once their last request is done.
+
+        Raises :class:`ConfigError` or ``RuntimeError`` when the new config
+        cannot be built, leaving the live router as it was.  Returns which
+        providers were added, kept and removed, and the changed sections
+        that only take effect after a restart.
+        """
+        router, providers = self._build_router(
+            config, self._transport, previous=self.router, live=self._providers
+        )
+        previous = {id(provider): provider for _, provider in self._providers.values()}
+        current = {id(provider): provider for _, provider in providers.values()}
+        for provider in router.list_providers():
+            if id(provider) not in previous:
+                self._prepare_provider(provider)
+        retired = [provider for key, provider in previous.items() if key not in current]
+
+        self.router, self._providers = router, providers
         self.client_api_keys = set(config.client_api_keys)
-        self.client = httpx.AsyncClient(timeout=httpx.Timeout(300.0, connect=30.0))
+        self.config = self.config.model_copy(
+            update={name: getattr(config, name) for name in RELOADABLE_SECTIONS}
+        )
+        for provider in retired:
+            self._retiring[id(provider)] = (provider, asyncio.create_task(self._retire(provider)))
+        return {
+            "added": sorted(p.provider_id for key, p in current.items() if key not in previous),
+            "kept": sorted(p.provider_id for key, p in current.items() if key in previous),
+            "removed": sorted(p.provider_id for p in retired),
+            "restart_required": [
+                name
+                for name in GatewayConfig.model_fields
+                if name not in RELOADABLE_SECTIONS
+                and getattr(config, name) != getattr(self.config, name)
+            ],
+        }
+
+    async def _retire(self, provider: Provider) -> None:
+        try:
+            while provider.in_use:
+                await asyncio.sleep(_RETIRE_POLL_SECONDS)
+            await provider.aclose()
+        finally:
+            self._retiring.pop(id(provider), None)
 
-    async def close(self) -> None:
-        await self.client.aclose()
+    async def drain(self, timeout: float) -> bool:
+        """Refuse new requests and wait up to ``timeout`` seconds for the
+        upstream requests and streams in flight to finish.
+
+        Returns whether everything finished in time.
+        """
+        self.draining = True
+        if self._active:
+            logger.info("drain_start | in_flight=%d timeout=%.1fs", self._active, timeout)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("drain_timeout | in_flight=%d", self._active)
+            return False
+        return True
+
+    async def start(self) -> None:
+        """Start background work; only needed when serving."""
+        if self.metrics.snapshot_dir is not None and self._snapshot_task is None:
+            self._snapshot_task = asyncio.create_task(self._snapshot_metrics())
+        if self.usage_ledger is not None:
+            await self.usage_ledger.start()
+        if self.capture is not None:
+            await self.capture.start()
+        if self.access_log is not None:
+            self.access_log.start()
+
+    async def _snapshot_metrics(self) -> None:
+        while True:
+            await asyncio.sleep(_METRICS_SNAPSHOT_SECONDS)
+            self.collect_metrics()
+            self.metrics.write_snapshot()
+
+    async def close(self, *, drain_timeout: float = 0.0) -> None:
+        if drain_timeout > 0:
+            await self.drain(drain_timeout)
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            self._snapshot_task = None
+        self.metrics.write_snapshot(final=True)
+        if self.usage_ledger is not None:
+            await self.usage_ledger.close()
+        if self.capture is not None:
+            await self.capture.close()
+        if self.access_log is not None:
+            self.access_log.close()
+        retiring = list(self._retiring.values())
+        for _, task in retiring:
+            task.cancel()
+        for provider in [*self.router.list_providers(), *(provider for provider, _ in retiring)]:
+            await provider.aclose()
+        if self.shared_state is not None:
+            self.shared_state.close()
 
     @staticmethod
     def _extract_bearer_token(auth_header: str) -> str:
@@ -35,97 +222,549 @@ class Gateway:
             return auth_header[7:].strip()
         return auth_header.strip()
 
-    def authorize_client(self, request: Request) -> None:
+    def authorize_client(self, request: Request) -> ClientLimit | None:
+        """Check the bearer key; returns its rate limits, if any are configured.
+
+        Without ``client_api_keys`` every caller shares the anonymous limits.
+        """
         if not self.client_api_keys:
-            return
+            return self.rate_limiter.for_key("") if self.rate_limiter is not None else None
         token = self._extract_bearer_token(request.headers.get("authorization", ""))
         if token not in self.client_api_keys:
             raise HTTPException(status_code=401, detail="Invalid gateway API key.")
+        return self.rate_limiter.for_key(token) if self.rate_limiter is not None else None
+
+    def usage_client(self, request: Request, client: str | None) -> str | None:
+        """The ``client`` filter a ``/usage`` query runs with.
+
+        Keys in ``usage_ledger.admin_keys`` may query any client or all of
+        them; every other caller only sees its own (masked) key.
+        """
+        token = self._extract_bearer_token(request.headers.get("authorization", ""))
+        if token and token in self.config.usage_ledger.admin_keys:
+            return client
+        return mask_key(token)
+
+    def resolve_priority(self, headers: Mapping[str, str] | None) -> Priority:
+        """Lane and fairness flow of a request.
+
+        The flow is the client key.  The lane comes from the priority header
+        when it names a known lane, else from ``priority.client_lanes``, else
+        ``priority.default_lane``; a key with an assigned lane can only use
+        the header to move itself to a lane of lower or equal weight.
+        """
+        settings = self.config.priority
+        headers = headers or {}
+        key = self._extract_bearer_token(headers.get("authorization", ""))
+        assigned = settings.client_lanes.get(key)
+        lane = assigned or settings.default_lane
+        requested = headers.get(settings.header, "").strip().lower()
+        if requested in self._lane_weights and (
+            assigned is None or self._lane_weights[requested] <= self._lane_weights[assigned]
+        ):
+            lane = requested
+        return Priority(lane=lane, flow=key, weight=self._lane_weights[lane])
 
     def list_models(self) -> dict[str, object]:
         return self.router.list_openai_models()
 
-    async def proxy(self, path: str, payload: dict[str, Any]) -> JSONResponse | StreamingResponse:
-        model_alias = str(payload.get("model", "")).strip()
+    def health(self) -> dict[str, Any]:
+        result: dict[str, Any] = {
+            "status": "draining" if self.draining else "ok",
+            "pid": os.getpid(),
+            "in_flight": self._active,
+            "providers": {
+                provider.provider_id: {
+                    "pool": provider.pool_stats(),
+                    "auth": provider.auth_stats(),
+                    "endpoints": [endpoint.stats() for endpoint in provider.endpoints],
+                    "retry": provider.retry_budget.stats(),
+                    **(
+                        {"admission": provider.admission.stats()}
+                        if provider.admission is not None
+                        else {}
+                    ),
+                    **(
+                        {"adaptive_concurrency": provider.limiter.stats()}
+                        if provider.limiter is not None
+                        else {}
+                    ),
+                }
+                for provider in self.router.list_providers()
+            },
+        }
+        if self._retiring:
+            result["retiring_providers"] = sorted(
+                provider.provider_id for provider, _ in self._retiring.values()
+            )
+        aliases = self.router.admission_stats()
+        if aliases:
+            result["aliases"] = {alias: {"admission": stats} for alias, stats in aliases.items()}
+        if self.response_cache is not None:
+            result["response_cache"] = self.response_cache.stats()
+        if self.single_flight is not None:
+            result["single_flight"] = self.single_flight.stats()
+        if self.rate_limiter is not None:
+            result["clients"] = self.rate_limiter.stats()
+        if self.usage_ledger is not None:
+            result["usage_ledger"] = self.usage_ledger.stats()
+        if self.capture is not None:
+            result["capture"] = self.capture.stats()
+        if self.access_log is not None:
+            result["access_log"] = self.access_log.stats()
+        return result
+
+    async def proxy(
+        self,
+        path: str,
+        payload: dict[str, Any] | RequestBody,
+        *,
+        headers: Mapping[str, str] | None = None,
+        client: ClientLimit | None = None,
+    ) -> Response:
+        body = payload if isinstance(payload, RequestBody) else RequestBody.from_payload(payload)
+        model_alias = body.model
         if not model_alias:
             raise HTTPException(status_code=400, detail="Request body must include 'model'.")
 
-        is_stream = bool(payload.get("stream", False))
-        start = time.monotonic()
-        logger.info("proxy_start | model=%s path=%s stream=%s", model_alias, path, is_stream)
-
+        timings = RequestTimings()
+        entry = self._request_entry(path, body, headers)
+        captured = (
+            {"request": body.to_payload()}
+            if self.capture is not None and self.capture.sample()
+            else None
+        )
+        # Only known aliases become label values, so clients cannot blow up
+        # the metric cardinality with made-up model names.
+        labels = ("", "")
         try:
-            route = self.router.resolve(model_alias)
-        except RuntimeError as exc:
-            raise HTTPException(status_code=400, detail=str(exc)) from exc
-
-        forwarded_payload = dict(payload)
-        forwarded_payload["model"] = route.upstream_model
-        if path == "/chat/completions" and "stream" not in forwarded_payload:
-            forwarded_payload["stream"] = False
-        upstream_url, headers, timeout_seconds = await route.provider.request_spec(
-            path=path,
-            upstream_model=route.upstream_model,
+            if self.draining:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Gateway is shutting down.",
+                    headers={"Retry-After": "1", "Connection": "close"},
+                )
+            if client is not None:
+                client.admit()
+            try:
+                route, claim = self.router.acquire(model_alias)
+            except CircuitOpenError as exc:
+                labels = (model_alias, "")
+                logger.warning("proxy_reject | model=%s reason=circuit_open", model_alias)
+                raise HTTPException(
+                    status_code=503,
+                    detail=str(exc),
+                    headers={"Retry-After": exc.retry_after_header},
+                ) from exc
+            except RuntimeError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+            labels = (model_alias, route.provider.provider_id)
+            self.metrics.in_flight.inc(labels)
+            # Pin the provider across the awaits before ``_send`` (cache
+            # lookup, single-flight) so a reload cannot close it under us.
+            route.provider.in_use += 1
+            try:
+                response = await self._proxy_route(
+                    route, path, body, headers, timings, self.resolve_priority(headers)
+                )
+            except BaseException:
+                self.metrics.in_flight.inc(labels, -1)
+                raise
+            finally:
+                route.provider.in_use -= 1
+                # A half-open probe that never reached the upstream (cache hit,
+                # coalesced follower, signing error) must not hold its slot.
+                route.endpoint.release(claim)
+        except HTTPException as exc:
+            timings.finish()
+            entry["error"] = str(exc.detail)
+            self._finish_request(
+                labels, exc.status_code, timings, 0, None, None, entry, captured, None
+            )
+            raise
+        return self._instrument(response, labels, timings, client, entry, captured)
+
+    def _instrument(
+        self,
+        response: Response,
+        labels: tuple[str, str],
+        timings: RequestTimings,
+        client: ClientLimit | None,
+        entry: dict[str, Any],
+        captured: dict[str, Any] | None,
+    ) -> Response:
+        """Finish the request's bookkeeping (see :meth:`_finish_request`)
+        once its body has been sent.
+
+        Non-stream responses carry the timing breakdown known when their
+        headers go out in ``Server-Timing``; SSE streams can end with it as
+        a ``: server-timing ...`` comment instead.
+        """
+        if client is not None:
+            response.headers.update(client.headers())
+        if response.headers.get(CACHE_HEADER) == "HIT":
+            entry["cache"] = "hit"
+            client = None
+        settings = self.config.server_timing
+        if isinstance(response, StreamingResponse):
+            is_sse = "text/event-stream" in (response.media_type or "")
+            if settings.enabled and not entry["stream"]:
+                response.headers["Server-Timing"] = timings.server_timing()
+            response.body_iterator = self._relay_instrumented(
+                response.body_iterator,
+                labels,
+                response.status_code,
+                is_sse,
+                timings,
+                client,
+                entry,
+                captured,
+                settings.enabled and settings.stream_comment and is_sse,
+            )
+            return response
+        body = bytes(response.body)
+        timings.finish()
+        if settings.enabled:
+            response.headers["Server-Timing"] = timings.server_timing()
+        self.metrics.in_flight.inc(labels, -1)
+        self._finish_request(
+            labels,
+            response.status_code,
+            timings,
+            len(body),
+            extract_usage(body[-TAIL_BYTES:]),
+            client,
+            entry,
+            captured,
+            body,
         )
+        return response
 
+    async def _relay_instrumented(
+        self,
+        chunks: AsyncIterator[bytes],
+        labels: tuple[str, str],
+        status_code: int,
+        is_sse: bool,
+        timings: RequestTimings,
+        client: ClientLimit | None,
+        entry: dict[str, Any],
+        captured: dict[str, Any] | None,
+        timing_comment: bool,
+    ) -> AsyncIterator[bytes]:
+        metrics = self.metrics
+        size = 0
+        tail = b""
+        kept: list[bytes] | None = (
+            [] if captured is not None and self.config.capture.include_bodies else None
+        )
         try:
-            if is_stream:
-                result = await self._proxy_stream(
-                    url=upstream_url,
-                    headers=headers,
-                    payload=forwarded_payload,
-                    _timeout_seconds=timeout_seconds,
+            async for chunk in chunks:
+                if is_sse:
+                    timings.chunk(chunk, time.monotonic())
+                if kept is not None and size < self.config.capture.max_body_bytes:
+                    kept.append(chunk)
+                size += len(chunk)
+                # Usage sits in the last chunks; keep only the tail.
+                tail = (tail + chunk)[-TAIL_BYTES:]
+                yield chunk
+            if timing_comment:
+                timings.finish()
+                yield f": server-timing {timings.server_timing()}\n\n".encode("ascii")
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            timings.finish()
+            if timings.ttft is not None:
+                metrics.ttft_seconds.observe(labels, timings.ttft)
+                metrics.stream_seconds.observe(labels, timings.total - timings.ttft)
+            metrics.in_flight.inc(labels, -1)
+            self._finish_request(
+                labels,
+                status_code,
+                timings,
+                size,
+                extract_usage(tail),
+                client,
+                entry,
+                captured,
+                b"".join(kept) if kept is not None else None,
+            )
+
+    def _request_entry(
+        self, path: str, body: RequestBody, headers: Mapping[str, str] | None
+    ) -> dict[str, Any]:
+        """Access log fields known on arrival; completed by ``_finish_request``."""
+        headers = headers or {}
+        entry: dict[str, Any] = {
+            "ts": time.time(),
+            "path": path,
+            "client": mask_key(self._extract_bearer_token(headers.get("authorization", ""))),
+            "model": body.model,
+            "stream": body.stream,
+        }
+        lane = headers.get(self.config.priority.header)
+        if lane:
+            entry["priority"] = lane
+        return entry
+
+    def _finish_request(
+        self,
+        labels: tuple[str, str],
+        status_code: int,
+        timings: RequestTimings,
+        size: int,
+        usage: dict[str, Any] | None,
+        client: ClientLimit | None,
+        entry: dict[str, Any],
+        captured: dict[str, Any] | None,
+        response_body: bytes | None,
+    ) -> None:
+        """Record metrics, charge usage to ``client``, book it in the usage
+        ledger (not for cache hits), write the access log entry and, for
+        sampled requests, the capture record."""
+        metrics = self.metrics
+        series = (*labels, status_class(status_code))
+        metrics.requests.inc(series)
+        metrics.request_seconds.observe(series, timings.total)
+        if size:
+            metrics.bytes_relayed.inc(labels, size)
+        if usage:
+            prompt, completion = token_counts(usage)
+            if prompt:
+                metrics.tokens.inc((*labels, "prompt"), prompt)
+            if completion:
+                metrics.tokens.inc((*labels, "completion"), completion)
+            if client is not None:
+                client.record_tokens(total_tokens(usage))
+            if self.usage_ledger is not None and "cache" not in entry:
+                self.usage_ledger.record(entry["client"], labels[0], labels[1], usage)
+            entry["usage"] = usage
+        entry["provider"] = labels[1]
+        entry["status"] = status_code
+        entry["bytes"] = size
+        entry["timings_ms"] = {name: round(seconds * 1000, 1) for name, seconds in timings.phases()}
+        if timings.attempts > 1:
+            entry["attempts"] = timings.attempts
+        if self.access_log is not None:
+            self.access_log.log(entry)
+        if captured is not None:
+            self._capture({**entry, **captured}, size, response_body)
+
+    def _capture(self, record: dict[str, Any], size: int, response_body: bytes | None) -> None:
+        """Hand a sampled record to the capture writer, with the response
+        body only under ``capture.include_bodies``."""
+        assert self.capture is not None
+        settings = self.config.capture
+        if response_body is not None and settings.include_bodies:
+            record["response"] = response_body[: settings.max_body_bytes].decode(
+                "utf-8", errors="replace"
+            )
+            if size > settings.max_body_bytes:
+                record["response_truncated"] = True
+        self.capture.record(record)
+
+    def collect_metrics(self) -> None:
+        """Refresh the gauges that are read from component state."""
+        metrics = self.metrics
+        for provider in self.router.list_providers():
+            pid = provider.provider_id
+            pool = provider.pool_stats()
+            for state in ("active", "idle", "queued"):
+                metrics.pool_connections.set((pid, state), pool[state])
+            metrics.pool_max_connections.set((pid,), pool["max_connections"] or 0)
+            metrics.retries.set((pid,), provider.retry_budget.stats()["retries"])
+            for endpoint in provider.endpoints:
+                metrics.circuit_open.set(
+                    (pid, endpoint.base_url),
+                    0 if endpoint.breaker is None or endpoint.breaker.closed else 1,
                 )
-            else:
-                result = await self._proxy_json(
-                    path=path,
-                    url=upstream_url,
-                    headers=headers,
-                    payload=forwarded_payload,
-                    timeout_seconds=timeout_seconds,
-                    requested_model=model_alias,
+            if provider.admission is not None:
+                self._collect_admission("provider", pid, provider.admission.stats())
+        for alias, stats in self.router.admission_stats().items():
+            self._collect_admission("alias", alias, stats)
+
+    def _collect_admission(self, scope: str, name: str, stats: dict[str, Any]) -> None:
+        metrics = self.metrics
+        key = (scope, name)
+        metrics.admission_in_flight.set(key, stats["in_flight"])
+        metrics.admission_limit.set(key, stats["limit"])
+        metrics.admission_queue_depth.set(key, stats["queue_depth"])
+        metrics.admission_wait_seconds.set(key, stats["wait_seconds_total"])
+        metrics.admission_rejected.set((*key, "queue_full"), stats["rejected_queue_full"])
+        metrics.admission_rejected.set((*key, "timeout"), stats["rejected_timeout"])
+
+    def render_metrics(self) -> str:
+        self.collect_metrics()
+        return self.metrics.render()
+
+    async def _proxy_route(
+        self,
+        route: ModelRoute,
+        path: str,
+        body: RequestBody,
+        headers: Mapping[str, str] | None,
+        timings: RequestTimings,
+        priority: Priority,
+    ) -> Response:
+        model_alias = body.model
+        is_stream = body.stream
+        cache_key: str | None = None
+        if (
+            self.response_cache is not None
+            and not is_stream
+            and is_cacheable_request(path, body, headers)
+        ):
+            cache_key = payload_fingerprint(
+                path,
+                body.to_payload(),
+                provider_id=route.provider.provider_id,
+                upstream_model=route.upstream_model,
+            )
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                return Response(
+                    content=cached.body,
+                    status_code=cached.status_code,
+                    media_type=cached.media_type,
+                    headers={CACHE_HEADER: "HIT"},
                 )
-            elapsed_ms = int((time.monotonic() - start) * 1000)
-            logger.info("proxy_done  | model=%s elapsed=%dms stream=%s", model_alias, elapsed_ms, is_stream)
+
+        forwarded_body = body.forwarded(
+            route.upstream_model,
+            default_stream=False if path == "/chat/completions" else None,
+        )
+
+        flight_key: str | None = None
+        if self.single_flight is not None:
+            flight_key = cache_key or body.identity(path)
+
+        if is_stream:
+            return await self._proxy_stream(
+                route=route,
+                path=path,
+                request_body=forwarded_body,
+                flight_key=flight_key,
+                priority=priority,
+                timings=timings,
+            )
+        return await self._proxy_json_once(
+            route=route,
+            path=path,
+            request_body=forwarded_body,
+            requested_model=model_alias,
+            cache_key=cache_key,
+            flight_key=flight_key,
+            priority=priority,
+            timings=timings,
+        )
+
+    async def _proxy_json_once(
+        self,
+        *,
+        route: ModelRoute,
+        path: str,
+        request_body: bytes,
+        requested_model: str,
+        cache_key: str | None,
+        flight_key: str | None,
+        priority: Priority,
+        timings: RequestTimings,
+    ) -> Response:
+        async def fetch() -> Response:
+            result = await self._proxy_json(
+                route=route,
+                path=path,
+                request_body=request_body,
+                requested_model=requested_model,
+                priority=priority,
+                timings=timings,
+                passthrough=(
+                    self.config.json_passthrough and cache_key is None and flight_key is None
+                ),
+            )
+            if cache_key is not None and self.response_cache is not None:
+                result.headers[CACHE_HEADER] = "MISS"
+                if result.status_code == 200:
+                    await self.response_cache.put(
+                        cache_key,
+                        status_code=result.status_code,
+                        body=bytes(result.body),
+                    )
             return result
-        except HTTPException:
-            elapsed_ms = int((time.monotonic() - start) * 1000)
-            logger.warning("proxy_error | model=%s elapsed=%dms stream=%s", model_alias, elapsed_ms, is_stream)
-            raise
+
+        if flight_key is None or self.single_flight is None:
+            return await fetch()
+        result, shared = await self.single_flight.do(flight_key, fetch)
+        return clone_response(result) if shared else result
 
     async def _proxy_json(
         self,
         *,
+        route: ModelRoute,
         path: str,
-        url: str,
-        headers: dict[str, str],
-        payload: dict[str, Any],
-        timeout_seconds: float,
+        request_body: bytes,
         requested_model: str,
-    ) -> JSONResponse:
+        priority: Priority,
+        timings: RequestTimings,
+        passthrough: bool = False,
+    ) -> Response:
         try:
-            response = await self.client.post(
-                url,
-                json=payload,
-                headers=headers,
-                timeout=timeout_seconds,
+            response = await self._send(
+                route, path, request_body, priority, timings, per_request_timeout=True
             )
         except httpx.HTTPError as exc:
             raise HTTPException(status_code=502, detail=f"Upstream request failed: {exc}") from exc
 
-        raw_text = response.text
+        handed_off = False
         try:
-            content = response.json()
-        except json.JSONDecodeError:
-            content = None
-
-        if content is None and path == "/chat/completions":
-            parsed_sse = self._merge_sse_chunks_to_chat_completion(
-                raw_text=raw_text,
-                requested_model=requested_model,
+            chunks = response.aiter_bytes()
+            head = b""
+            async for chunk in chunks:
+                head += chunk
+                if head.strip():
+                    break
+            is_sse = "text/event-stream" in response.headers.get("content-type", "") or (
+                head.lstrip()[:5].lower() == b"data:"
             )
-            if parsed_sse is not None:
-                return JSONResponse(status_code=response.status_code, content=parsed_sse)
+            if is_sse and path == "/chat/completions":
+                # Merge SSE deltas as they arrive instead of buffering the whole body.
+                aggregator = ChatCompletionAggregator()
+                aggregator.feed_bytes(head)
+                async for chunk in chunks:
+                    aggregator.feed_bytes(chunk)
+                parsed_sse = aggregator.result(requested_model)
+                if parsed_sse is not None:
+                    return JSONResponse(status_code=response.status_code, content=parsed_sse)
+                raw_text = aggregator.preview
+                content = None
+            elif passthrough and head.lstrip()[:1] == b"{":
+                handed_off = True
+                return StreamingResponse(
+                    self._relay_json(response, route, head, chunks, requested_model),
+                    status_code=response.status_code,
+                    media_type=response.headers.get("content-type", "application/json"),
+                )
+            else:
+                body = head + b"".join([chunk async for chunk in chunks])
+                raw_text = body.decode(response.encoding or "utf-8", errors="replace")
+                try:
+                    content = json.loads(body)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    content = None
+                if content is None and path == "/chat/completions":
+                    parsed_sse = self._merge_sse_chunks_to_chat_completion(
+                        raw_text=raw_text,
+                        requested_model=requested_model,
+                    )
+                    if parsed_sse is not None:
+                        return JSONResponse(status_code=response.status_code, content=parsed_sse)
+        except httpx.HTTPError as exc:
+            raise HTTPException(status_code=502, detail=f"Upstream response read failed: {exc}") from exc
+        finally:
+            if not handed_off:
+                await self._close_upstream(route, response)
 
         if content is None:
             content = {
@@ -143,24 +782,71 @@ class Gateway:
 
         return JSONResponse(status_code=response.status_code, content=content)
 
+    async def _relay_json(
+        self,
+        response: httpx.Response,
+        route: ModelRoute,
+        head: bytes,
+        chunks: AsyncIterator[bytes],
+        requested_model: str,
+    ) -> AsyncIterator[bytes]:
+        rewriter = ModelFieldRewriter(requested_model)
+        try:
+            yield rewriter.feed(head)
+            async for chunk in chunks:
+                rewritten = rewriter.feed(chunk)
+                if rewritten:
+                    yield rewritten
+        except httpx.HTTPError as exc:
+            # Status and headers are already sent; all we can do is stop.
+            logger.warning("Upstream JSON body interrupted: %s", exc)
+        finally:
+            await self._close_upstream(route, response)
+
     async def _proxy_stream(
         self,
         *,
-        url: str,
-        headers: dict[str, str],
-        payload: dict[str, Any],
-        _timeout_seconds: float,
-    ) -> JSONResponse | StreamingResponse:
-        try:
-            upstream_request = self.client.build_request(
-                "POST",
-                url,
-                json=payload,
-                headers=headers,
+        route: ModelRoute,
+        path: str,
+        request_body: bytes,
+        flight_key: str | None,
+        priority: Priority,
+        timings: RequestTimings,
+    ) -> Response:
+        async def open_source() -> StreamSource | Response:
+            return await self._open_stream(
+                route=route,
+                path=path,
+                request_body=request_body,
+                priority=priority,
+                timings=timings,
             )
-            response = await self.client.send(
-                upstream_request,
-                stream=True,
+
+        if flight_key is None or self.single_flight is None:
+            source = await open_source()
+        else:
+            source = await self.single_flight.stream(flight_key, open_source)
+        if isinstance(source, Response):
+            return source
+        return StreamingResponse(
+            self._relay_chunks(source),
+            status_code=source.status_code,
+            media_type=source.media_type,
+            headers=source.headers,
+        )
+
+    async def _open_stream(
+        self,
+        *,
+        route: ModelRoute,
+        path: str,
+        request_body: bytes,
+        priority: Priority,
+        timings: RequestTimings,
+    ) -> StreamSource | JSONResponse:
+        try:
+            response = await self._send(
+                route, path, request_body, priority, timings, stream=True
             )
         except httpx.HTTPError as exc:
             raise HTTPException(status_code=502, detail=f"Upstream request failed: {exc}") from exc
@@ -175,37 +861,275 @@ class Gateway:
                     ).encode("utf-8")
                 )
             finally:
-                await response.aclose()
+                await self._close_upstream(route, response)
             parsed = self._parse_error_body(body)
             return JSONResponse(status_code=response.status_code, content=parsed)
 
         media_type = response.headers.get("content-type", "text/event-stream")
+        # The adaptive limiter waits for the first token: time to headers says
+        # little about a streaming upstream's load (see _send_admitted).
+        sent = timings.sent
+        limiter = route.provider.limiter
 
         async def iter_chunks() -> Any:
+            nonlocal limiter
             try:
                 async for chunk in response.aiter_raw():
                     if chunk:
+                        if limiter is not None and b"data:" in chunk:
+                            limiter.record(True, time.monotonic() - sent)
+                            limiter = None
                         yield chunk
+                if limiter is not None:
+                    limiter.record(True, time.monotonic() - sent)
+                    limiter = None
             except asyncio.CancelledError:
                 raise
             except httpx.HTTPError as exc:
+                if limiter is not None:
+                    limiter.record(False, time.monotonic() - sent)
+                    limiter = None
                 logger.warning("Upstream stream interrupted: %s", exc)
                 if "text/event-stream" in media_type:
                     yield self._to_sse_bytes({"error": {"message": f"upstream stream interrupted: {exc}"}})
                     yield b"data: [DONE]\n\n"
             finally:
-                await response.aclose()
+                await self._close_upstream(route, response)
 
         passthrough_headers: dict[str, str] = {}
         if "x-request-id" in response.headers:
             passthrough_headers["x-request-id"] = response.headers["x-request-id"]
-        return StreamingResponse(
-            iter_chunks(),
+        return StreamSource(
             status_code=response.status_code,
             media_type=media_type,
             headers=passthrough_headers,
+            chunks=iter_chunks(),
         )
 
+    async def _send(
+        self,
+        route: ModelRoute,
+        path: str,
+        request_body: bytes,
+        priority: Priority,
+        timings: RequestTimings,
+        *,
+        per_request_timeout: bool = False,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """Send with ``stream=True``, retrying failures that happen before any
+        response bytes exist (transport errors, ``retry_statuses``).
+
+        Every attempt is re-signed through ``request_spec`` and reports its
+        time-to-headers and outcome (transport error or 5xx is a failure) to
+        the endpoint's EWMA and circuit breaker.  Retries are bounded by
+        ``retry.max_attempts`` and the provider's retry budget.  The request
+        first takes its alias and provider admission slots, held across
+        retries and queued by ``priority``; the caller hands them back
+        together with the endpoint via ``_close_upstream`` once the returned
+        response is done.  Attempts go through the pool of the request's
+        lane.  Queueing, signing, connect and time-to-headers go to
+        ``timings``.  With
+        ``per_request_timeout`` the provider's ``timeout_seconds`` from
+        ``request_spec`` is applied to the request as well.  With ``stream``
+        a successful response is left for the caller to report to the
+        adaptive limiter once its first token arrives.
+        """
+        self._active += 1
+        self._idle.clear()
+        route.provider.in_use += 1
+        try:
+            await self._admit(route, priority, timings)
+        except BaseException:
+            self._finish_active(route)
+            raise
+        try:
+            return await self._send_admitted(
+                route, path, request_body, priority.lane, timings, per_request_timeout, stream
+            )
+        except BaseException:
+            self._release_admission(route)
+            raise
+
+    async def _send_admitted(
+        self,
+        route: ModelRoute,
+        path: str,
+        request_body: bytes,
+        lane: str,
+        timings: RequestTimings,
+        per_request_timeout: bool,
+        stream: bool,
+    ) -> httpx.Response:
+        provider = route.provider
+        client = provider.client_for(lane)
+        endpoint = route.endpoint
+        policy = provider.retry
+        provider.retry_budget.deposit()
+        attempt = 1
+        while True:
+            signing = time.monotonic()
+            url, headers, timeout_seconds = await provider.request_spec(
+                path=path,
+                upstream_model=route.upstream_model,
+                base_url=endpoint.base_url,
+            )
+            timings.add("auth", time.monotonic() - signing)
+            timings.attempts = attempt
+            trace = ConnectTimer(self.metrics.connect_seconds, (provider.provider_id,))
+            upstream_request = client.build_request(
+                "POST",
+                url,
+                content=request_body,
+                headers=headers,
+                timeout=timeout_seconds if per_request_timeout else httpx.USE_CLIENT_DEFAULT,
+                extensions={"trace": trace},
+            )
+            endpoint.begin()
+            started = timings.sent = time.monotonic()
+            try:
+                response = await client.send(upstream_request, stream=True)
+            except httpx.HTTPError as exc:
+                if trace.seconds:
+                    timings.add("connect", trace.seconds)
+                self._record_attempt(route, False, False, time.monotonic() - started)
+                endpoint.end()
+                if not self._should_retry(route, attempt, is_retryable_error(exc)):
+                    raise
+                reason = type(exc).__name__
+            except BaseException:
+                endpoint.end()
+                raise
+            else:
+                timings.headers = time.monotonic() - started
+                if trace.seconds:
+                    timings.add("connect", trace.seconds)
+                self._record_attempt(
+                    route,
+                    response.status_code < 500,
+                    response.status_code == 429,
+                    timings.headers,
+                    limiter=not (stream and response.status_code < 400),
+                )
+                if not self._should_retry(
+                    route, attempt, response.status_code in policy.retry_statuses
+                ):
+                    return response
+                await response.aclose()
+                endpoint.end()
+                reason = str(response.status_code)
+            logger.warning(
+                "proxy_retry | provider=%s attempt=%d reason=%s",
+                provider.provider_id,
+                attempt,
+                reason,
+            )
+            await asyncio.sleep(backoff_delay(attempt, policy))
+            attempt += 1
+
+    @staticmethod
+    def _record_attempt(
+        route: ModelRoute,
+        ok: bool,
+        throttled: bool,
+        latency_seconds: float,
+        *,
+        limiter: bool = True,
+    ) -> None:
+        """Feed one attempt's outcome to the endpoint and the adaptive limiter.
+
+        An upstream 429 is not an endpoint failure, but it is the clearest
+        signal that the provider is over capacity.  ``limiter=False`` leaves
+        the limiter to the caller (a stream reports its first token instead).
+        """
+        route.endpoint.record(ok, latency_seconds)
+        if limiter and route.provider.limiter is not None:
+            route.provider.limiter.record(ok and not throttled, latency_seconds)
+
+    async def _admit(
+        self, route: ModelRoute, priority: Priority, timings: RequestTimings
+    ) -> None:
+        """Wait for the alias slot, then the provider slot.
+
+        Both waits share one deadline, so a request never queues longer in
+        total than the tightest ``max_wait_seconds`` of the two.
+        """
+        queues = [
+            queue for queue in (route.admission, route.provider.admission) if queue is not None
+        ]
+        if not queues:
+            return
+        queued = time.monotonic()
+        deadline = queued + min(queue.config.max_wait_seconds for queue in queues)
+        acquired: list[AdmissionQueue] = []
+        try:
+            for queue in queues:
+                await queue.acquire(deadline, priority)
+                acquired.append(queue)
+            timings.add("queue", time.monotonic() - queued)
+        except AdmissionRejected as exc:
+            for queue in acquired:
+                queue.release()
+            logger.warning(
+                "proxy_reject | model=%s reason=%s",
+                route.alias,
+                "queue_full" if exc.status_code == 429 else "queue_timeout",
+            )
+            raise HTTPException(
+                status_code=exc.status_code,
+                detail=str(exc),
+                headers={"Retry-After": exc.retry_after_header},
+            ) from exc
+        except BaseException:
+            for queue in acquired:
+                queue.release()
+            raise
+
+    def _release_admission(self, route: ModelRoute) -> None:
+        if route.provider.admission is not None:
+            route.provider.admission.release()
+        if route.admission is not None:
+            route.admission.release()
+        self._finish_active(route)
+
+    def _finish_active(self, route: ModelRoute) -> None:
+        route.provider.in_use -= 1
+        self._active -= 1
+        if self._active == 0:
+            self._idle.set()
+
+    async def _close_upstream(self, route: ModelRoute, response: httpx.Response) -> None:
+        try:
+            await response.aclose()
+        finally:
+            route.endpoint.end()
+            self._release_admission(route)
+
+    @staticmethod
+    def _should_retry(route: ModelRoute, attempt: int, retryable: bool) -> bool:
+        policy = route.provider.retry
+        return (
+            retryable
+            and policy.enabled
+            and attempt < policy.max_attempts
+            and route.endpoint.healthy
+            and route.provider.retry_budget.try_withdraw()
+        )
+
+    async def _relay_chunks(self, source: StreamSource) -> Any:
+        try:
+            async for chunk in source.chunks:
+                yield chunk
+        except SubscriberOverflowError as exc:
+            logger.warning("Coalesced stream subscriber dropped: %s", exc)
+            if "text/event-stream" in source.media_type:
+                yield self._to_sse_bytes({"error": {"message": f"gateway stream interrupted: {exc}"}})
+                yield b"data: [DONE]\n\n"
+        finally:
+            aclose = getattr(source.chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
     @staticmethod
     def _parse_error_body(raw: bytes) -> dict[str, Any]:
         try:
@@ -226,97 +1150,54 @@ class Gateway:
         raw_text: str,
         requested_model: str,
     ) -> dict[str, Any] | None:
-        chunks: list[dict[str, Any]] = []
+        aggregator = ChatCompletionAggregator()
         for line in raw_text.splitlines():
-            stripped = line.strip()
-            if not stripped or not stripped.lower().startswith("data:"):
-                continue
-            payload = stripped[5:].strip()
-            if not payload or payload == "[DONE]":
-                continue
-            try:
-                obj = json.loads(payload)
-            except json.JSONDecodeError:
-                continue
-            if isinstance(obj, dict):
-                chunks.append(obj)
-
-        if not chunks:
-            return None
-
-        first = chunks[0]
-        chat_id = str(first.get("id", f"chatcmpl-proxy-{int(time.time())}"))
-        created = int(first.get("created", int(time.time())))
-        usage: dict[str, Any] | None = None
-
-        states: dict[int, dict[str, Any]] = {}
-        for chunk in chunks:
-            maybe_usage = chunk.get("usage")
-            if isinstance(maybe_usage, dict):
-                usage = maybe_usage
-            for choice in chunk.get("choices", []):
-                if not isinstance(choice, dict):
-                    continue
-                index = int(choice.get("index", 0))
-                state = states.setdefault(
-                    index,
-                    {
-                        "index": index,
-                        "role": "assistant",
-                        "content": "",
-                        "finish_reason": None,
-                    },
-                )
-                delta = choice.get("delta")
-                if isinstance(delta, dict):
-                    role = delta.get("role")
-                    if isinstance(role, str) and role:
-                        state["role"] = role
-                    content = delta.get("content")
-                    if isinstance(content, str):
-                        state["content"] = f"{state['content']}{content}"
-                finish_reason = choice.get("finish_reason")
-                if finish_reason is not None:
-                    state["finish_reason"] = finish_reason
-
-        if not states:
-            return None
-
-        merged_choices: list[dict[str, Any]] = []
-        for index in sorted(states):
-            state = states[index]
-            merged_choices.append(
-                {
-                    "index": state["index"],
-                    "message": {
-                        "role": state["role"],
-                        "content": state["content"],
-                    },
-                    "finish_reason": state["finish_reason"] or "stop",
-                }
-            )
-
-        result: dict[str, Any] = {
-            "id": chat_id,
-            "object": "chat.completion",
-            "created": created,
-            "model": requested_model,
-            "choices": merged_choices,
-        }
-        if usage is not None:
-            result["usage"] = usage
-        return result
+            aggregator.feed_line(line)
+        return aggregator.result(requested_model)
 
     @staticmethod
-    def _build_router(config: GatewayConfig) -> ModelRouter:
+    def _build_router(
+        config: GatewayConfig,
+        transport: httpx.AsyncBaseTransport | None = None,
+        *,
+        previous: ModelRouter | None = None,
+        live: _LiveProviders | None = None,
+    ) -> tuple[ModelRouter, _LiveProviders]:
+        """The router for ``config`` and the provider built for each config.
+
+        Providers in ``live`` whose config is unchanged apart from ``models``
+        are reused, as are admission queues of ``previous`` whose limits are
+        unchanged.
+        """
         router = ModelRouter()
+        providers: _LiveProviders = {}
         for provider_config in config.providers:
-            provider = ProviderFactory.create_provider(provider_config)
+            existing = (live or {}).get(provider_config.id)
+            if existing is not None and existing[0].model_dump(
+                exclude={"models"}
+            ) == provider_config.model_dump(exclude={"models"}):
+                provider = existing[1]
+            else:
+                provider = ProviderFactory.create_provider(provider_config, transport)
+            providers[provider_config.id] = (provider_config, provider)
             for model in provider_config.models:
                 upstream_model = model.resolve_upstream_model(provider_config.id)
+                admission = previous.admission(model.alias) if previous is not None else None
+                if admission is None or admission.config != model.concurrency:
+                    admission = (
+                        AdmissionQueue(f"model '{model.alias}'", model.concurrency)
+                        if model.concurrency.max_in_flight is not None
+                        else None
+                    )
                 router.register(
                     alias=model.alias,
                     upstream_model=upstream_model,
                     provider=provider,
+                    admission=admission,
                 )
-        return router
+        for group in config.alias_groups:
+            router.register_group(
+                group.alias,
+                [(member.alias, member.weight) for member in group.members],
+            )
+        return router, providers
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from app.config import UsageLedgerConfig
+from app.usage import token_counts, total_tokens
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    hour TEXT NOT NULL,
+    client TEXT NOT NULL,
+    alias TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    total_tokens INTEGER NOT NULL,
+    PRIMARY KEY (hour, client, alias, provider)
+);
+"""
+
+_UPSERT = """
+INSERT INTO usage (hour, client, alias, provider, requests, prompt_tokens, completion_tokens, total_tokens)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (hour, client, alias, provider) DO UPDATE SET
+    requests = requests + excluded.requests,
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens,
+    total_tokens = total_tokens + excluded.total_tokens
+"""
+
+# Columns a query may group by, as SQL over the ``usage`` table.
+GROUP_COLUMNS = {
+    "day": "substr(hour, 1, 10)",
+    "hour": "hour",
+    "client": "client",
+    "alias": "alias",
+    "provider": "provider",
+}
+
+_Key = tuple[str, str, str, str]
+
+
+class UsageLedger:
+    """Token usage per UTC hour, client key, alias and provider, kept in a
+    local SQLite file for chargeback.
+
+    :meth:`record` only adds to in-memory totals, so nothing touches the disk
+    on the request path.  A background task flushes them every
+    ``flush_interval_seconds`` in one transaction on a worker thread.  Rows
+    are additive upserts, so several worker processes can share one file.
+    If writing fails the totals are kept for the next flush; beyond
+    ``max_pending_rows`` distinct keys new usage is dropped and counted.
+    """
+
+    def __init__(self, config: UsageLedgerConfig) -> None:
+        self.config = config
+        self.path = Path(config.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._pending: dict[_Key, list[int]] = {}
+        self._task: asyncio.Task[None] | None = None
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def record(self, client: str, alias: str, provider: str, usage: dict[str, Any]) -> None:
+        key = (time.strftime("%Y-%m-%dT%H", time.gmtime()), client, alias, provider)
+        totals = self._pending.get(key)
+        if totals is None:
+            if len(self._pending) >= self.config.max_pending_rows:
+                self.dropped += 1
+                return
+            totals = self._pending[key] = [0, 0, 0, 0]
+        prompt, completion = token_counts(usage)
+        totals[0] += 1
+        totals[1] += prompt
+        totals[2] += completion
+        totals[3] += total_tokens(usage)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        with self._lock:
+            self._db.close()
+
+    async def flush(self) -> int:
+        """Write the pending totals; returns how many rows were written."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except sqlite3.Error as exc:
+            self.failed_flushes += 1
+            logger.warning("usage_ledger | flush of %d rows failed: %s", len(batch), exc)
+            for key, totals in batch.items():
+                pending = self._pending.setdefault(key, [0, 0, 0, 0])
+                for index, value in enumerate(totals):
+                    pending[index] += value
+            return 0
+        self.written += len(batch)
+        return len(batch)
+
+    async def query(
+        self,
+        *,
+        since: str | None = None,
+        until: str | None = None,
+        group_by: tuple[str, ...] = ("client", "alias", "provider"),
+        client: str | None = None,
+        alias: str | None = None,
+        provider: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Summed usage grouped by ``group_by`` (see :data:`GROUP_COLUMNS`).
+
+        ``since`` (inclusive) and ``until`` (exclusive) are UTC dates or
+        ``YYYY-MM-DDTHH`` hours.  Pending totals are flushed first.
+        """
+        unknown = [column for column in group_by if column not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Cannot group usage by {', '.join(unknown)}.")
+        await self.flush()
+        where: list[str] = []
+        params: list[str] = []
+        for clause, value in (
+            ("hour >= ?", since),
+            ("hour < ?", until),
+            ("client = ?", client),
+            ("alias = ?", alias),
+            ("provider = ?", provider),
+        ):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        columns = [f"{GROUP_COLUMNS[column]} AS {column}" for column in group_by]
+        sql = (
+            f"SELECT {', '.join([*columns, 'sum(requests)', 'sum(prompt_tokens)', 'sum(completion_tokens)', 'sum(total_tokens)'])} "
+            "FROM usage"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + (f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}" if group_by else "")
+        )
+        rows = await asyncio.to_thread(self._read, sql, params)
+        names = (*group_by, "requests", "prompt_tokens", "completion_tokens", "total_tokens")
+        return [dict(zip(names, row)) for row in rows if row[len(group_by)] is not None]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending_rows": len(self._pending),
+            "written_rows": self.written,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.flush_interval_seconds)
+            await self.flush()
+
+    def _write(self, batch: dict[_Key, list[int]]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(_UPSERT, [(*key, *totals) for key, totals in batch.items()])
+
+    def _read(self, sql: str, params: list[str]) -> list[tuple[Any, ...]]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
@@ -0,0 +1,421 @@
+"""Drive chat completions through a gateway at fixed concurrency or arrival rates.
+
+    corp-gateway-loadgen --models juzhi_glm5,juzhi_kimi2.5 --concurrency 1,4,16 --duration 30
+    corp-gateway-loadgen --rate 2,5,10 --mode stream --output run.json --baseline last.json
+
+Each step runs one mode (``stream`` or ``json``) at one load level: a
+closed loop of ``--concurrency`` workers, or an open loop of Poisson
+arrivals at ``--rate`` requests per second (seeded, so runs are comparable).
+Aliases are used round-robin.  The report has throughput, total latency,
+TTFT and inter-chunk latency (ITL) percentiles and errors per step, as
+text or JSON; ``--baseline`` compares against an earlier JSON report.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.replay import percentile, summarize
+
+MODES = ("stream", "json")
+DEFAULT_PROMPT = "用一句话介绍你自己"
+
+
+@dataclass(frozen=True)
+class Step:
+    mode: str
+    concurrency: int | None = None
+    rate: float | None = None
+
+    @property
+    def load(self) -> str:
+        return f"c={self.concurrency}" if self.concurrency is not None else f"r={self.rate:g}/s"
+
+
+@dataclass
+class Sample:
+    model: str
+    status: int
+    seconds: float
+    ttft_seconds: float | None = None
+    gaps: list[float] = field(default_factory=list)
+    completion_tokens: int = 0
+    error: str | None = None
+
+
+def _parse_levels(raw: str | None, kind: type) -> list[Any]:
+    if not raw:
+        return []
+    levels = [kind(part) for part in raw.split(",") if part.strip()]
+    if any(level <= 0 for level in levels):
+        raise ValueError("load levels must be positive")
+    return levels
+
+
+def _completion_tokens(usage: Any) -> int:
+    if isinstance(usage, dict) and isinstance(usage.get("completion_tokens"), int):
+        return usage["completion_tokens"]
+    return 0
+
+
+def _read_stream(body: bytes) -> tuple[int, str | None]:
+    """Completion tokens and an error, if any, from a finished SSE body."""
+    tokens, error = 0, None
+    for line in body.splitlines():
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]" or b'"usage"' not in data and b'"error"' not in data:
+            continue
+        try:
+            event = json.loads(data)
+        except ValueError:
+            continue
+        if not isinstance(event, dict):
+            continue
+        if event.get("error"):
+            error = "stream_error"
+        tokens = _completion_tokens(event.get("usage")) or tokens
+    return tokens, error
+
+
+async def send(
+    client: httpx.AsyncClient,
+    path: str,
+    model: str,
+    stream: bool,
+    *,
+    prompt: str,
+    max_tokens: int,
+) -> Sample:
+    payload: dict[str, Any] = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.1,
+        "max_tokens": max_tokens,
+        "stream": stream,
+    }
+    if stream:
+        payload["stream_options"] = {"include_usage": True}
+    started = time.monotonic()
+    sample = Sample(model, 0, 0.0)
+    body = bytearray()
+    last = None
+    try:
+        async with client.stream("POST", path, json=payload) as response:
+            sample.status = response.status_code
+            async for chunk in response.aiter_bytes():
+                now = time.monotonic()
+                body += chunk
+                if stream and b"data:" in chunk:
+                    if sample.ttft_seconds is None:
+                        sample.ttft_seconds = now - started
+                    else:
+                        sample.gaps.append(now - last)
+                    last = now
+    except httpx.HTTPError as exc:
+        sample.error = type(exc).__name__
+    sample.seconds = time.monotonic() - started
+    if sample.error is not None:
+        return sample
+    if sample.status >= 400:
+        sample.error = f"http_{sample.status}"
+    elif stream:
+        sample.completion_tokens, sample.error = _read_stream(bytes(body))
+    else:
+        try:
+            sample.completion_tokens = _completion_tokens(json.loads(body).get("usage"))
+        except (ValueError, AttributeError):
+            sample.error = "invalid_json"
+    return sample
+
+
+async def run_step(
+    client: httpx.AsyncClient,
+    step: Step,
+    models: list[str],
+    *,
+    path: str = "/v1/chat/completions",
+    duration: float | None = 10.0,
+    requests: int | None = None,
+    prompt: str = DEFAULT_PROMPT,
+    max_tokens: int = 300,
+    seed: int = 0,
+) -> tuple[list[Sample], float]:
+    """Run one step; stops after ``requests`` if given, else after ``duration``.
+
+    Returns the samples and the wall time until the last response finished.
+    """
+    stream = step.mode == "stream"
+    started = time.monotonic()
+    deadline = None if requests is not None or duration is None else started + duration
+    issued = itertools.count()
+
+    def more(index: int, at: float) -> bool:
+        if requests is not None:
+            return index < requests
+        return deadline is None or at < deadline
+
+    def call(index: int) -> Any:
+        return send(client, path, models[index % len(models)], stream, prompt=prompt, max_tokens=max_tokens)
+
+    if step.concurrency is not None:
+        samples: list[Sample] = []
+
+        async def worker() -> None:
+            while more(index := next(issued), time.monotonic()):
+                samples.append(await call(index))
+
+        await asyncio.gather(*(worker() for _ in range(step.concurrency)))
+        return samples, time.monotonic() - started
+
+    assert step.rate is not None
+    rng = random.Random(seed)
+    tasks = []
+    arrival = started
+    for index in issued:
+        if not more(index, arrival):
+            break
+        delay = arrival - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(call(index)))
+        arrival += rng.expovariate(step.rate)
+    return list(await asyncio.gather(*tasks)), time.monotonic() - started
+
+
+def summarize_step(step: Step, samples: list[Sample], elapsed: float) -> dict[str, Any]:
+    ok = [sample for sample in samples if sample.error is None]
+    per_model: dict[str, list[Sample]] = defaultdict(list)
+    for sample in samples:
+        per_model[sample.model].append(sample)
+    return {
+        "mode": step.mode,
+        "concurrency": step.concurrency,
+        "rate": step.rate,
+        "requests": len(samples),
+        "ok": len(ok),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed > 0 else None,
+        "completion_tokens_per_second": (
+            round(sum(sample.completion_tokens for sample in ok) / elapsed, 1) if elapsed > 0 else None
+        ),
+        "errors": dict(sorted(Counter(sample.error for sample in samples if sample.error).items())),
+        "latency_seconds": summarize([sample.seconds for sample in ok]),
+        "ttft_seconds": summarize([sample.ttft_seconds for sample in ok if sample.ttft_seconds is not None]),
+        "itl_seconds": summarize([gap for sample in ok for gap in sample.gaps]),
+        "models": {
+            model: {
+                "requests": len(items),
+                "errors": sum(1 for sample in items if sample.error),
+                "latency_p50": percentile([sample.seconds for sample in items if sample.error is None], 0.5),
+            }
+            for model, items in sorted(per_model.items())
+        },
+    }
+
+
+async def preflight(client: httpx.AsyncClient, models: list[str]) -> list[str]:
+    """Check ``/health`` and that every alias is listed; returns the aliases
+    to use (all listed ones when ``models`` is empty)."""
+    health = await client.get("/health")
+    if health.status_code != 200:
+        raise RuntimeError(f"/health returned {health.status_code}; is the gateway running?")
+    listed = await client.get("/v1/models")
+    if listed.status_code != 200:
+        raise RuntimeError(f"/v1/models returned {listed.status_code}: {listed.text[:200]}")
+    available = [item["id"] for item in listed.json().get("data", [])]
+    missing = [model for model in models if model not in available]
+    if missing:
+        raise RuntimeError(f"Models not registered: {', '.join(missing)}.")
+    return models or available
+
+
+async def run(
+    steps: list[Step],
+    models: list[str],
+    *,
+    target: str,
+    api_key: str,
+    timeout: float = 300.0,
+    check: bool = True,
+    transport: httpx.AsyncBaseTransport | None = None,
+    **options: Any,
+) -> dict[str, Any]:
+    """Run every step in order and return the full report."""
+    headers = {"authorization": f"Bearer {api_key}"} if api_key else {}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=1000)
+    async with httpx.AsyncClient(
+        base_url=target, headers=headers, timeout=timeout, limits=limits, transport=transport
+    ) as client:
+        if check:
+            models = await preflight(client, models)
+        if not models:
+            raise RuntimeError("No models to load.")
+        results = []
+        for step in steps:
+            samples, elapsed = await run_step(client, step, models, **options)
+            results.append(summarize_step(step, samples, elapsed))
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "target": target,
+        "models": models,
+        "options": {key: value for key, value in options.items() if key != "prompt"},
+        "prompt_chars": len(options.get("prompt", DEFAULT_PROMPT)),
+        "steps": results,
+    }
+
+
+def _key(step: dict[str, Any]) -> tuple[Any, ...]:
+    return step["mode"], step["concurrency"], step["rate"]
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any]) -> list[dict[str, Any]]:
+    """Relative change per matching step: throughput, p50/p99 latency and TTFT."""
+    before = {_key(step): step for step in baseline.get("steps", [])}
+    changes = []
+    for step in report["steps"]:
+        old = before.get(_key(step))
+        if old is None:
+            continue
+        change: dict[str, Any] = {"mode": step["mode"], "concurrency": step["concurrency"], "rate": step["rate"]}
+        pairs = [("throughput_rps", step["throughput_rps"], old["throughput_rps"])]
+        for metric in ("latency_seconds", "ttft_seconds"):
+            for name in ("p50", "p99"):
+                pairs.append((f"{metric[:-8]}_{name}", step[metric][name], old[metric][name]))
+        for name, new_value, old_value in pairs:
+            if new_value is not None and old_value:
+                change[name] = round(new_value / old_value - 1, 4)
+        changes.append(change)
+    return changes
+
+
+def regressions(changes: list[dict[str, Any]], threshold: float) -> list[str]:
+    found = []
+    for change in changes:
+        label = f"{change['mode']} c={change['concurrency']} r={change['rate']}"
+        if change.get("throughput_rps", 0) < -threshold:
+            found.append(f"{label}: throughput {change['throughput_rps']:+.1%}")
+        for name in ("latency_p99", "ttft_p99"):
+            if change.get(name, 0) > threshold:
+                found.append(f"{label}: {name} {change[name]:+.1%}")
+    return found
+
+
+def _ms(summary: dict[str, float | None], name: str) -> str:
+    value = summary[name]
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def format_report(report: dict[str, Any], changes: list[dict[str, Any]] | None = None) -> str:
+    lines = [
+        f"target {report['target']}  models {','.join(report['models'])}",
+        f"{'mode':<7}{'load':>10}{'reqs':>7}{'ok':>7}{'req/s':>9}{'tok/s':>9}"
+        f"{'lat p50/p99':>15}{'ttft p50/p99':>15}{'itl p50/p99':>13}  errors",
+    ]
+    for step in report["steps"]:
+        load = Step(step["mode"], step["concurrency"], step["rate"]).load
+        errors = " ".join(f"{name}={count}" for name, count in step["errors"].items())
+        pairs = [
+            f"{_ms(step[key], 'p50')}/{_ms(step[key], 'p99')}"
+            for key in ("latency_seconds", "ttft_seconds", "itl_seconds")
+        ]
+        lines.append(
+            f"{step['mode']:<7}{load:>10}{step['requests']:>7}{step['ok']:>7}"
+            f"{step['throughput_rps'] or 0:>9.2f}{step['completion_tokens_per_second'] or 0:>9.1f}"
+            f"{pairs[0]:>15}{pairs[1]:>15}{pairs[2]:>13}  {errors}"
+        )
+    lines.append("latencies in ms")
+    for change in changes or []:
+        load = Step(change["mode"], change["concurrency"], change["rate"]).load
+        deltas = " ".join(f"{name}={value:+.1%}" for name, value in change.items() if isinstance(value, float) and name != "rate")
+        lines.append(f"vs baseline {change['mode']} {load}: {deltas}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="http://127.0.0.1:18080")
+    parser.add_argument("--api-key", default=os.getenv("GATEWAY_API_KEY", "local-proxy-key"))
+    parser.add_argument("--models", default="", help="comma-separated aliases (default: all listed)")
+    parser.add_argument("--mode", choices=(*MODES, "both"), default="both")
+    parser.add_argument("--concurrency", default=None, help="closed-loop levels, e.g. 1,4,16")
+    parser.add_argument("--rate", default=None, help="open-loop arrival rates per second, e.g. 2,5")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per step")
+    parser.add_argument("--requests", type=int, default=None, help="requests per step (overrides --duration)")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--max-tokens", type=int, default=300)
+    parser.add_argument("--path", default="/v1/chat/completions")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0, help="seed for open-loop arrivals")
+    parser.add_argument("--no-check", action="store_true", help="skip the /health and /v1/models checks")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--output", default=None, help="also write the JSON report to this file")
+    parser.add_argument("--baseline", default=None, help="JSON report of an earlier run to compare with")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=None,
+        help="exit 1 when throughput drops or p99 latency/TTFT rises by more than this fraction",
+    )
+    args = parser.parse_args(argv)
+    try:
+        concurrency = _parse_levels(args.concurrency, int)
+        rates = _parse_levels(args.rate, float)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not concurrency and not rates:
+        concurrency = [1]
+    modes = MODES if args.mode == "both" else (args.mode,)
+    steps = [Step(mode, concurrency=level) for mode in modes for level in concurrency]
+    steps += [Step(mode, rate=level) for mode in modes for level in rates]
+    models = [model.strip() for model in args.models.split(",") if model.strip()]
+
+    try:
+        report = asyncio.run(
+            run(
+                steps,
+                models,
+                target=args.target,
+                api_key=args.api_key,
+                timeout=args.timeout,
+                check=not args.no_check,
+                path=args.path,
+                duration=args.duration,
+                requests=args.requests,
+                prompt=args.prompt,
+                max_tokens=args.max_tokens,
+                seed=args.seed,
+            )
+        )
+    except (RuntimeError, httpx.HTTPError) as exc:
+        sys.exit(str(exc))
+    changes = None
+    if args.baseline:
+        changes = compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+        report["baseline"] = {"path": args.baseline, "changes": changes}
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(json.dumps(report, indent=2, ensure_ascii=False) if args.json else format_report(report, changes))
+    if changes is not None and args.max_regression is not None:
+        found = regressions(changes, args.max_regression)
+        if found:
+            print("\n".join(["regressions:", *found]), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,16 @@ from dotenv import load_dotenv
 
 load_dotenv()  # 自动加载项目根目录 .env
 
+import asyncio
+import logging
 import os
+import shutil
+import signal
+import threading
+import time
+from collections.abc import Callable
 from contextlib import asynccontextmanager
+from pathlib import Path
 from typing import Any
 
 import uvicorn
@@ -13,22 +21,85 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 from starlette.responses import Response
 
-from app.config import ConfigError, load_gateway_config
+from app.body import RequestBody
+from app.config import ConfigError, load_gateway_config, resolve_registry_path
 from app.env import load_project_env
 from app.gateway import Gateway
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.ratelimit import RateLimitExceeded
+from app.reload import ConfigReloader
 
 load_project_env()
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_DRAIN_SECONDS = 30.0
+DEFAULT_STATE_FILE = Path("data") / "gateway-state.sqlite3"
+
+
+def _drain_seconds() -> float:
+    return float(os.getenv("DRAIN_TIMEOUT_SECONDS", str(DEFAULT_DRAIN_SECONDS)))
+
+
+def _drain_on_sigterm(gateway: Gateway, timeout: float) -> Callable[[], None]:
+    """Start draining as soon as SIGTERM arrives, before uvicorn stops
+    accepting connections, so the load balancer sees ``/health`` turn 503
+    and new requests are refused while in-flight ones finish.
+
+    Wraps the SIGTERM handler uvicorn installed and only hands the signal
+    on once the drain is over.  uvicorn then waits for open connections
+    again, so its graceful timeout is cut to what is left of ``timeout``.
+    A second SIGTERM skips the wait.  Returns a function that puts the
+    previous handler back.
+    """
+    previous = signal.getsignal(signal.SIGTERM)
+    if not callable(previous) or threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    loop = asyncio.get_running_loop()
+    server_config = getattr(getattr(previous, "__self__", None), "config", None)
+    draining: list[asyncio.Task[None]] = []
+
+    async def drain_then_exit(sig: int) -> None:
+        started = time.monotonic()
+        await gateway.drain(timeout)
+        if server_config is not None:
+            left = timeout - (time.monotonic() - started)
+            server_config.timeout_graceful_shutdown = max(0, int(left))
+        previous(sig, None)
+
+    def start_drain(sig: int) -> None:
+        logger.info("drain_signal | timeout=%.1fs", timeout)
+        draining.append(loop.create_task(drain_then_exit(sig)))
+
+    def handle(sig: int, frame: Any) -> None:
+        if draining:
+            previous(sig, frame)
+            return
+        gateway.draining = True
+        loop.call_soon_threadsafe(start_drain, sig)
+
+    signal.signal(signal.SIGTERM, handle)
+    return lambda: signal.signal(signal.SIGTERM, previous)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> Any:
     config = load_gateway_config()
     gateway = Gateway(config)
+    await gateway.start()
+    reloader = ConfigReloader(gateway, resolve_registry_path(), config.reload, load_gateway_config)
+    await reloader.start()
     app.state.gateway = gateway
+    app.state.reloader = reloader
+    restore_sigterm = _drain_on_sigterm(gateway, _drain_seconds())
     try:
         yield
     finally:
-        await gateway.close()
+        restore_sigterm()
+        await reloader.close()
+        # After SIGTERM the drain already ran before uvicorn stopped
+        # accepting connections; only other shutdowns (e.g. Ctrl+C) drain here.
+        await gateway.close(drain_timeout=0.0 if gateway.draining else _drain_seconds())
 
 
 app = FastAPI(
@@ -38,6 +109,11 @@ app = FastAPI(
 )
 
 
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded(request: Request, exc: RateLimitExceeded) -> JSONResponse:
+    return JSONResponse(status_code=exc.status_code, content={"error": exc.error}, headers=exc.headers)
+
+
 def _get_gateway(request: Request) -> Gateway:
     gateway: Gateway | None = getattr(request.app.state, "gateway", None)
     if gateway is None:
@@ -51,19 +127,62 @@ async def _proxy_request(
     path: str,
 ) -> Response:
     gateway = _get_gateway(request)
-    gateway.authorize_client(request)
+    client = gateway.authorize_client(request)
     try:
-        payload = await request.json()
-    except Exception as exc:
-        raise HTTPException(status_code=400, detail="Body must be valid JSON.") from exc
-    if not isinstance(payload, dict):
-        raise HTTPException(status_code=400, detail="Body must be a JSON object.")
-    return await gateway.proxy(path=path, payload=payload)
+        body = RequestBody.from_bytes(await request.body())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return await gateway.proxy(path=path, payload=body, headers=request.headers, client=client)
+
 
+@app.get("/health", response_model=None)
+async def health(request: Request) -> dict[str, Any] | JSONResponse:
+    gateway: Gateway | None = getattr(request.app.state, "gateway", None)
+    if gateway is None:
+        return {"status": "ok"}
+    result = gateway.health()
+    reloader: ConfigReloader | None = getattr(request.app.state, "reloader", None)
+    if reloader is not None:
+        result["config_reload"] = reloader.stats()
+    if gateway.draining:
+        # Tell the load balancer to stop routing here.
+        return JSONResponse(status_code=503, content=result)
+    return result
+
+
+@app.get("/metrics", response_model=None)
+async def metrics(request: Request) -> Response:
+    gateway = _get_gateway(request)
+    return Response(content=gateway.render_metrics(), media_type=METRICS_CONTENT_TYPE)
 
-@app.get("/health")
-async def health() -> dict[str, str]:
-    return {"status": "ok"}
+
+@app.get("/usage")
+async def usage(
+    request: Request,
+    since: str | None = None,
+    until: str | None = None,
+    group_by: str = "client,alias,provider",
+    client: str | None = None,
+    alias: str | None = None,
+    provider: str | None = None,
+) -> dict[str, object]:
+    gateway = _get_gateway(request)
+    gateway.authorize_client(request)
+    if gateway.usage_ledger is None:
+        raise HTTPException(status_code=404, detail="Usage ledger is not enabled.")
+    client = gateway.usage_client(request, client)
+    try:
+        rows = await gateway.usage_ledger.query(
+            since=since,
+            until=until,
+            group_by=tuple(column.strip() for column in group_by.split(",") if column.strip()),
+            client=client,
+            alias=alias,
+            provider=provider,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"object": "list", "data": rows}
 
 
 @app.get("/v1/models")
@@ -89,11 +208,37 @@ async def responses(request: Request) -> Response:
 
 
 def run() -> None:
+    """Serve with ``WORKERS`` processes (default 1).
+
+    With several workers, rate limits, quotas and circuit breaker trips are
+    kept in a shared SQLite file (``GATEWAY_STATE_FILE``, default
+    ``data/gateway-state.sqlite3``).  SIGTERM first drains: ``/health``
+    answers 503 and new requests are refused while in-flight requests and
+    streams get up to ``DRAIN_TIMEOUT_SECONDS`` to finish, then the server
+    stops accepting connections; with several workers SIGHUP replaces them
+    one by one the same way.  Model registry changes do not need either: every
+    process reloads the file in place (see :class:`ConfigReloader`), and a
+    single process also reloads on SIGHUP.
+    """
     host = os.getenv("HOST", "127.0.0.1")
     port = int(os.getenv("PORT", "18080"))
     reload = os.getenv("RELOAD", "0") == "1"
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        if reload:
+            raise SystemExit("RELOAD=1 cannot be combined with WORKERS > 1.")
+        os.environ.setdefault("GATEWAY_STATE_FILE", str(DEFAULT_STATE_FILE.absolute()))
+        # Metrics snapshots of a previous run would add to the new counters.
+        shutil.rmtree(Path(os.environ["GATEWAY_STATE_FILE"]).with_suffix(".metrics"), ignore_errors=True)
     try:
-        uvicorn.run("app.main:app", host=host, port=port, reload=reload)
+        uvicorn.run(
+            "app.main:app",
+            host=host,
+            port=port,
+            reload=reload,
+            workers=workers,
+            timeout_graceful_shutdown=int(_drain_seconds()),
+        )
     except ConfigError as exc:
         raise SystemExit(str(exc)) from exc
 
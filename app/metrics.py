@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+CONNECT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...]) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.values: dict[tuple[str, ...], Any] = {}
+
+    def render(self, values: dict[tuple[str, ...], Any]) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def inc(self, labels: tuple[str, ...], amount: float = 1.0) -> None:
+        values = self.values
+        values[labels] = values.get(labels, 0.0) + amount
+
+    def set(self, labels: tuple[str, ...], value: float) -> None:
+        """Copy a running total kept by another component."""
+        self.values[labels] = value
+
+
+class Gauge(_Family):
+    """``merge`` is how :meth:`MetricsRegistry.render` combines workers:
+    ``"sum"`` for amounts (in-flight requests, open connections) and
+    ``"max"`` for per-process settings and flags (limits, circuit state)
+    that would be meaningless added up."""
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, help_text: str, labelnames: tuple[str, ...], merge: str = "sum"
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.merge = merge
+
+    def set(self, labels: tuple[str, ...], value: float) -> None:
+        self.values[labels] = value
+
+    def inc(self, labels: tuple[str, ...], amount: float = 1.0) -> None:
+        values = self.values
+        values[labels] = values.get(labels, 0.0) + amount
+
+
+class Histogram(_Family):
+    """Fixed buckets; each series is ``[count per bucket..., +Inf count, sum]``
+    so an observation is one bisect and two list updates."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...],
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = buckets
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, values: dict[tuple[str, ...], Any]) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        names = (*self.labelnames, "le")
+        for labels, series in sorted(values.items()):
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                yield f"{self.name}_bucket{_labels(names, (*labels, le))} {_number(cumulative)}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {_number(cumulative)}"
+
+
+class ConnectTimer:
+    """httpx ``trace`` extension observing how long opening a new upstream
+    connection took (TCP connect plus TLS handshake).  Requests that reuse a
+    pooled connection emit no connect events and record nothing.  ``seconds``
+    totals every connection opened for the request."""
+
+    __slots__ = ("_histogram", "_labels", "_started", "_connected", "seconds")
+
+    def __init__(self, histogram: Histogram, labels: tuple[str, ...]) -> None:
+        self._histogram = histogram
+        self._labels = labels
+        self._started = 0.0
+        self._connected: float | None = None
+        self.seconds = 0.0
+
+    async def __call__(self, event: str, info: dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.started":
+            self._started = time.monotonic()
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            self._connected = time.monotonic()
+        elif event.endswith("send_request_headers.started") and self._connected is not None:
+            elapsed = self._connected - self._started
+            self._histogram.observe(self._labels, elapsed)
+            self.seconds += elapsed
+            self._connected = None
+
+
+class MetricsRegistry:
+    """In-process Prometheus metrics for the proxy hot path.
+
+    Updates are plain dict/list operations on the event loop thread: no
+    locks and no per-request allocation beyond the label tuple.  With
+    several worker processes each one periodically writes its values to
+    ``<snapshot_dir>/<pid>.json`` and :meth:`render` sums every snapshot
+    (taking the maximum for ``merge="max"`` gauges), so any worker can
+    answer a scrape for the whole server.  Snapshots of exited workers are
+    kept for their counters; their gauges are dropped.
+    """
+
+    def __init__(self, snapshot_dir: str | Path | None = None) -> None:
+        self._families: dict[str, _Family] = {}
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        if self.snapshot_dir is not None:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        labels = ("alias", "provider")
+        self.requests = self.counter(
+            "gateway_requests_total", "Proxied requests.", (*labels, "status_class")
+        )
+        self.request_seconds = self.histogram(
+            "gateway_request_duration_seconds",
+            "Time from request arrival to the last byte sent to the client.",
+            (*labels, "status_class"),
+        )
+        self.in_flight = self.gauge(
+            "gateway_requests_in_flight", "Requests currently being proxied.", labels
+        )
+        self.connect_seconds = self.histogram(
+            "gateway_upstream_connect_seconds",
+            "Time to open a new upstream connection (TCP and TLS).",
+            ("provider",),
+            CONNECT_BUCKETS,
+        )
+        self.ttft_seconds = self.histogram(
+            "gateway_time_to_first_token_seconds",
+            "Time from request arrival to the first streamed chunk.",
+            labels,
+        )
+        self.stream_seconds = self.histogram(
+            "gateway_stream_duration_seconds",
+            "Time from the first to the last streamed chunk.",
+            labels,
+        )
+        self.bytes_relayed = self.counter(
+            "gateway_relayed_bytes_total", "Response body bytes sent to clients.", labels
+        )
+        self.tokens = self.counter(
+            "gateway_tokens_total", "Tokens reported in upstream usage.", (*labels, "kind")
+        )
+        self.pool_connections = self.gauge(
+            "gateway_pool_connections", "Upstream pool connections by state.", ("provider", "state")
+        )
+        self.pool_max_connections = self.gauge(
+            "gateway_pool_max_connections", "Upstream pool size limit per worker.", ("provider",), "max"
+        )
+        self.admission_in_flight = self.gauge(
+            "gateway_admission_in_flight", "Requests holding an admission slot.", ("scope", "name")
+        )
+        self.admission_limit = self.gauge(
+            "gateway_admission_limit", "Current admission limit per worker.", ("scope", "name"), "max"
+        )
+        self.admission_queue_depth = self.gauge(
+            "gateway_admission_queue_depth", "Requests waiting for a slot.", ("scope", "name")
+        )
+        self.admission_wait_seconds = self.counter(
+            "gateway_admission_queued_seconds_total", "Total time requests spent queued.", ("scope", "name")
+        )
+        self.admission_rejected = self.counter(
+            "gateway_admission_rejected_total", "Admission rejections by reason.", ("scope", "name", "reason")
+        )
+        self.circuit_open = self.gauge(
+            "gateway_circuit_open",
+            "1 when the endpoint's circuit is not closed in any worker.",
+            ("provider", "endpoint"),
+            "max",
+        )
+        self.retries = self.counter(
+            "gateway_upstream_retries_total", "Upstream retries.", ("provider",)
+        )
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...]) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(
+        self, name: str, help_text: str, labelnames: tuple[str, ...], merge: str = "sum"
+    ) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames, merge))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...],
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        merged = {name: dict(family.values) for name, family in self._families.items()}
+        if self.snapshot_dir is not None:
+            self.write_snapshot()
+            for path in self.snapshot_dir.glob("*.json"):
+                if path.stem == str(os.getpid()):
+                    continue
+                self._merge(merged, path)
+        lines: list[str] = []
+        for name, family in self._families.items():
+            lines.extend(family.render(merged[name]))
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, *, final: bool = False) -> None:
+        if self.snapshot_dir is None:
+            return
+        snapshot = {
+            name: [[list(labels), value] for labels, value in family.values.items()]
+            for name, family in self._families.items()
+            if not (final and isinstance(family, Gauge))
+        }
+        path = self.snapshot_dir / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(snapshot), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("Failed to write metrics snapshot %s: %s", path, exc)
+
+    def _merge(self, merged: dict[str, dict[tuple[str, ...], Any]], path: Path) -> None:
+        try:
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        for name, samples in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                continue
+            take_max = getattr(self._families[name], "merge", "sum") == "max"
+            for labels, value in samples:
+                key = tuple(labels)
+                current = target.get(key)
+                if current is None:
+                    target[key] = value
+                elif isinstance(value, list):
+                    target[key] = [a + b for a, b in zip(current, value)]
+                elif take_max:
+                    target[key] = max(current, value)
+                else:
+                    target[key] = current + value
+
+    def _register(self, family: Any) -> Any:
+        self._families[family.name] = family
+        return family
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
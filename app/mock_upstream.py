@@ -0,0 +1,308 @@
+"""Local stand-in for the panzhi and juzhi platforms.
+
+    python -m app.mock_upstream --platform juzhi --port 19060 --ttft 0.3 --tokens-per-second 40
+
+It verifies credentials the way the real platforms expect them from
+``QwenSignatureAuth`` (panzhi ``X-CheckSum``) and ``custom_resolvers.get_api_key``
+(juzhi HMAC ``Authorization``), then answers chat completions as JSON or SSE
+with a configurable time to first token, token rate, chunk size, error rate
+and mid-stream disconnects.  In tests, mount it in-process with
+``httpx.ASGITransport(app=create_app(settings))``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from collections.abc import AsyncIterator, Mapping
+from dataclasses import dataclass, field, fields
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.responses import Response
+
+PLATFORMS = ("none", "panzhi", "juzhi")
+_CSID_SUFFIX_LENGTH = 32  # uuid4().hex
+_HMAC_FIELD = re.compile(r'([\w-]+)="([^"]*)"')
+
+
+class MockDisconnect(httpx.RemoteProtocolError):
+    """Raised inside a stream to drop the connection mid-response.
+
+    Under uvicorn the connection is aborted; in-process through
+    ``httpx.ASGITransport`` the exception itself reaches the client, so it is
+    the ``httpx.RemoteProtocolError`` a dropped peer produces.
+    """
+
+
+@dataclass
+class MockUpstreamSettings:
+    platform: str = "none"
+    # panzhi
+    appid: str = ""
+    appkey: str = ""
+    # When set, the csid must embed the capability name the way
+    # QwenSignatureAuth derives it from the upstream model.
+    check_capability: bool = True
+    # juzhi
+    api_id: str = ""
+    api_secret: str = ""
+    max_clock_skew_seconds: float = 300.0
+    # Response shape and timing.
+    ttft_seconds: float = 0.2
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 64
+    tokens_per_chunk: int = 1
+    error_rate: float = 0.0
+    error_status: int = 503
+    disconnect_rate: float = 0.0
+    seed: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.platform not in PLATFORMS:
+            raise ValueError(f"Unknown platform '{self.platform}'; expected one of {PLATFORMS}.")
+        if self.tokens_per_chunk < 1:
+            raise ValueError("tokens_per_chunk must be at least 1.")
+
+    @classmethod
+    def from_env(cls, platform: str, **overrides: Any) -> "MockUpstreamSettings":
+        """Credentials from the same variables the gateway reads (see .env.example)."""
+        return cls(
+            platform=platform,
+            appid=os.getenv("PANZHI_APPID", ""),
+            appkey=os.getenv("PANZHI_APPKEY", ""),
+            api_id=os.getenv("OPENAI_API_ID", ""),
+            api_secret=os.getenv("OPENAI_API_SECRET", ""),
+            **overrides,
+        )
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    auth_failures: int = 0
+    injected_errors: int = 0
+    disconnects: int = 0
+    streams: int = 0
+    last_auth_error: str | None = field(default=None)
+
+
+def _capability_24(name: str) -> str:
+    return name[:24] if len(name) >= 24 else name.ljust(24, "0")
+
+
+def verify_panzhi(
+    headers: Mapping[str, str], model: str, settings: MockUpstreamSettings, now: float
+) -> str | None:
+    """Why the panzhi signature headers are invalid, or ``None``."""
+    param = headers.get("x-server-param", "")
+    cur_time = headers.get("x-curtime", "")
+    checksum = headers.get("x-checksum", "")
+    if not (param and cur_time and checksum):
+        return "missing X-Server-Param, X-CurTime or X-CheckSum"
+    expected = hashlib.md5(f"{settings.appkey}{cur_time}{param}".encode("utf-8")).hexdigest()
+    if not hmac.compare_digest(checksum, expected):
+        return "X-CheckSum mismatch"
+    try:
+        if abs(now - int(cur_time)) > settings.max_clock_skew_seconds:
+            return "X-CurTime outside the allowed clock skew"
+        server_param = json.loads(base64.b64decode(param))
+    except ValueError:
+        return "malformed X-CurTime or X-Server-Param"
+    if not isinstance(server_param, dict) or server_param.get("appid") != settings.appid:
+        return "X-Server-Param appid mismatch"
+    csid = str(server_param.get("csid", ""))
+    prefix = settings.appid + (_capability_24(model) if settings.check_capability else "")
+    if not csid.startswith(prefix) or len(csid) != len(settings.appid) + 24 + _CSID_SUFFIX_LENGTH:
+        return "X-Server-Param csid does not match appid and capability"
+    return None
+
+
+def verify_juzhi(
+    headers: Mapping[str, str], method: str, path: str, settings: MockUpstreamSettings, now: float
+) -> str | None:
+    """Why the juzhi HMAC ``Authorization`` token is invalid, or ``None``."""
+    authorization = headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return "missing bearer token"
+    try:
+        decoded = base64.b64decode(authorization[7:].strip(), validate=True).decode("utf-8")
+    except ValueError:
+        return "token is not base64"
+    if not decoded.startswith("hmac "):
+        return "token is not an hmac credential"
+    values = dict(_HMAC_FIELD.findall(decoded))
+    if values.get("api_key") != settings.api_id:
+        return "api_key mismatch"
+    if values.get("algorithm") != "hmac-sha256":
+        return "unsupported algorithm"
+    if values.get("headers") != "host date request-line":
+        return "unexpected signed headers"
+    for name in ("modelId", "modelSource", "traceId"):
+        if name not in values:
+            return f"missing {name}"
+    host, date, request_line = values.get("host", ""), values.get("date", ""), values.get("request-line", "")
+    if request_line != f"{method} {path} HTTP/1.1":
+        return "request-line does not match the request"
+    if host != headers.get("host", "").split(":")[0]:
+        return "host does not match the request"
+    try:
+        signed_at = parsedate_to_datetime(date).timestamp()
+    except (TypeError, ValueError):
+        return "malformed date"
+    if abs(now - signed_at) > settings.max_clock_skew_seconds:
+        return "date outside the allowed clock skew"
+    digest = hmac.new(
+        settings.api_secret.encode("utf-8"),
+        f"host: {host}\ndate: {date}\n{request_line}".encode("utf-8"),
+        hashlib.sha256,
+    ).digest()
+    if not hmac.compare_digest(values.get("signature", ""), base64.b64encode(digest).decode("utf-8")):
+        return "signature mismatch"
+    return None
+
+
+def _sse(payload: dict[str, Any]) -> bytes:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def create_app(settings: MockUpstreamSettings | None = None) -> FastAPI:
+    """The mock platform; ``app.state.stats`` counts what it did."""
+    settings = settings or MockUpstreamSettings()
+    rng = random.Random(settings.seed)
+    stats = MockStats()
+    app = FastAPI(title="Mock upstream", docs_url=None, redoc_url=None)
+    app.state.settings = settings
+    app.state.stats = stats
+
+    def usage(payload: dict[str, Any]) -> dict[str, int]:
+        prompt = max(1, len(json.dumps(payload.get("messages", ""))) // 4)
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": settings.completion_tokens,
+            "total_tokens": prompt + settings.completion_tokens,
+        }
+
+    async def stream(
+        payload: dict[str, Any], completion_id: str, model: str, disconnect: bool
+    ) -> AsyncIterator[bytes]:
+        created = int(time.time())
+        base = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model}
+        chunks = math.ceil(settings.completion_tokens / settings.tokens_per_chunk)
+        delay = settings.tokens_per_chunk / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+        await asyncio.sleep(settings.ttft_seconds)
+        yield _sse({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})
+        for index in range(chunks):
+            if disconnect and index == chunks // 2:
+                stats.disconnects += 1
+                raise MockDisconnect("mock upstream dropped the stream")
+            if index and delay:
+                await asyncio.sleep(delay)
+            tokens = min(settings.tokens_per_chunk, settings.completion_tokens - index * settings.tokens_per_chunk)
+            yield _sse({**base, "choices": [{"index": 0, "delta": {"content": "tok " * tokens}, "finish_reason": None}]})
+        yield _sse({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage(payload)})
+        yield b"data: [DONE]\n\n"
+
+    @app.get("/mock/stats")
+    async def mock_stats() -> dict[str, Any]:
+        return {item.name: getattr(stats, item.name) for item in fields(stats)}
+
+    @app.post("/{path:path}", response_model=None)
+    async def chat_completions(request: Request) -> Response:
+        stats.requests += 1
+        try:
+            payload = json.loads(await request.body())
+        except ValueError:
+            return JSONResponse(status_code=400, content={"error": {"message": "Body must be JSON."}})
+        model = str(payload.get("model", ""))
+        now = time.time()
+        problem = None
+        if settings.platform == "panzhi":
+            problem = verify_panzhi(request.headers, model, settings, now)
+        elif settings.platform == "juzhi":
+            problem = verify_juzhi(request.headers, request.method, request.url.path, settings, now)
+        if problem is not None:
+            stats.auth_failures += 1
+            stats.last_auth_error = problem
+            return JSONResponse(status_code=401, content={"error": {"message": f"auth failed: {problem}"}})
+        if settings.error_rate and rng.random() < settings.error_rate:
+            stats.injected_errors += 1
+            return JSONResponse(
+                status_code=settings.error_status,
+                content={"error": {"message": "mock upstream injected error"}},
+            )
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        if payload.get("stream"):
+            stats.streams += 1
+            disconnect = bool(settings.disconnect_rate) and rng.random() < settings.disconnect_rate
+            return StreamingResponse(
+                stream(payload, completion_id, model, disconnect), media_type="text/event-stream"
+            )
+        generation = settings.completion_tokens / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+        await asyncio.sleep(settings.ttft_seconds + generation)
+        return JSONResponse(
+            content={
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(now),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "tok " * settings.completion_tokens},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage(payload),
+            }
+        )
+
+    return app
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--platform", choices=PLATFORMS, default="none")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=19000)
+    parser.add_argument("--ttft", type=float, default=0.2, help="seconds to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="0 = no pacing")
+    parser.add_argument("--completion-tokens", type=int, default=64)
+    parser.add_argument("--tokens-per-chunk", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--no-check-capability", action="store_true")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    settings = MockUpstreamSettings.from_env(
+        args.platform,
+        ttft_seconds=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        tokens_per_chunk=args.tokens_per_chunk,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        disconnect_rate=args.disconnect_rate,
+        check_capability=not args.no_check_capability,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from app.config import ConcurrencyConfig
+
+
+class AdmissionRejected(RuntimeError):
+    """A request could not get an upstream slot in time.
+
+    ``status_code`` is 429 when the wait queue is full and 503 when the
+    request's admission deadline passed while it was queued.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after_seconds: float) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after_seconds = retry_after_seconds
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after_seconds)))
+
+
+@dataclass(frozen=True)
+class Priority:
+    """Who a request is queued for: ``flow`` (the client key) is the unit of
+    fairness and ``weight`` its lane's share of the slots."""
+
+    lane: str = "interactive"
+    flow: str = ""
+    weight: float = 1.0
+
+
+DEFAULT_PRIORITY = Priority()
+
+
+class AdmissionQueue:
+    """In-flight limit with a bounded, weighted-fair wait queue.
+
+    Waiters are ordered by start-time fair queuing: each gets the virtual
+    finish tag ``max(virtual_time, previous tag of its flow) + 1/weight``,
+    so while the gateway is saturated every flow gets slots in proportion
+    to its weight and a batch client with hundreds of queued requests
+    cannot push an interactive one to the back.  A single flow is served
+    FIFO.  A released slot is handed straight to the waiter with the
+    lowest tag, so a burst cannot overtake requests that are already
+    queued.  Waiters whose deadline has passed leave the queue and are
+    rejected with 503.
+    """
+
+    def __init__(self, name: str, config: ConcurrencyConfig, limit: int | None = None) -> None:
+        limit = limit if limit is not None else config.max_in_flight
+        assert limit is not None
+        self.name = name
+        self.config = config
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters: list[tuple[float, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._flow_tags: dict[str, float] = {}
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, deadline: float, priority: Priority = DEFAULT_PRIORITY) -> None:
+        """Take a slot, waiting until ``deadline`` (``time.monotonic``) at most."""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.config.max_queue:
+            self.rejected_full += 1
+            raise AdmissionRejected(
+                f"Too many concurrent requests for {self.name}; queue is full.",
+                status_code=429,
+                retry_after_seconds=self.config.max_wait_seconds,
+            )
+        started = time.monotonic()
+        timeout = min(deadline, started + self.config.max_wait_seconds) - started
+        waiter = asyncio.get_running_loop().create_future()
+        tag = max(self._virtual_time, self._flow_tags.get(priority.flow, 0.0)) + 1.0 / priority.weight
+        self._flow_tags[priority.flow] = tag
+        heapq.heappush(self._waiters, (tag, next(self._sequence), waiter))
+        self.queued_total += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.rejected_timeout += 1
+            raise AdmissionRejected(
+                f"Timed out after {timeout:.2f}s waiting for an upstream slot for {self.name}.",
+                status_code=503,
+                retry_after_seconds=self.config.max_wait_seconds,
+            ) from None
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        finally:
+            waited = time.monotonic() - started
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def set_limit(self, limit: int) -> None:
+        self.limit = max(1, limit)
+        self._wake()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected_queue_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "wait_seconds_max": round(self.wait_seconds_max, 3),
+        }
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            tag, _, waiter = heapq.heappop(self._waiters)
+            if waiter.done():
+                continue
+            self._virtual_time = tag
+            # The slot is transferred to the waiter before it runs again.
+            self.in_flight += 1
+            waiter.set_result(None)
+        if not self._waiters:
+            # Every tag is now behind the virtual clock; idle flows need no state.
+            self._flow_tags.clear()
+
+    def _abandon(self, waiter: asyncio.Future[None]) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as the wait ended; give it back.
+            self.release()
+            return
+        waiter.cancel()
+        for index, entry in enumerate(self._waiters):
+            if entry[2] is waiter:
+                self._waiters[index] = self._waiters[-1]
+                self._waiters.pop()
+                heapq.heapify(self._waiters)
+                break
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import math
+import random
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from app.providers.circuit import CircuitBreaker
+
+_EWMA_ALPHA = 0.3
+# Idle endpoints forget their latency with this time constant, so one that
+# was penalized gets retried once the others have been busy for a while.
+_EWMA_DECAY_SECONDS = 10.0
+
+T = TypeVar("T")
+
+
+@dataclass(eq=False)
+class Endpoint:
+    """One upstream base URL with the load signals used for balancing."""
+
+    base_url: str
+    weight: float = 1.0
+    ewma_seconds: float = 0.0
+    in_flight: int = 0
+    samples: int = field(default=0, repr=False)
+    failure_penalty_seconds: float = field(default=0.0, repr=False)
+    _observed_at: float = field(default=0.0, init=False, repr=False)
+    breaker: CircuitBreaker | None = field(default=None, repr=False)
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker is None or self.breaker.closed
+
+    def try_acquire(self) -> int | None:
+        """Claim admission through the circuit breaker (see
+        :meth:`CircuitBreaker.try_acquire`); ``None`` means refused."""
+        return 0 if self.breaker is None else self.breaker.try_acquire()
+
+    def release(self, claim: int) -> None:
+        if self.breaker is not None:
+            self.breaker.release(claim)
+
+    def retry_after(self) -> float:
+        return 0.0 if self.breaker is None else self.breaker.retry_after()
+
+    def begin(self) -> None:
+        self.in_flight += 1
+
+    def end(self) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def record(self, ok: bool, latency_seconds: float) -> None:
+        # A fast refusal or 5xx must not make the endpoint look fast: count a
+        # failed attempt as if it had waited out the provider timeout.
+        self.observe(latency_seconds if ok else max(latency_seconds, self.failure_penalty_seconds))
+        if self.breaker is not None:
+            self.breaker.record(ok, latency_seconds)
+
+    def observe(self, latency_seconds: float) -> None:
+        if self.samples == 0:
+            self.ewma_seconds = latency_seconds
+        else:
+            current = self.latency()
+            self.ewma_seconds = current + _EWMA_ALPHA * (latency_seconds - current)
+        self.samples += 1
+        self._observed_at = time.monotonic()
+
+    def latency(self) -> float:
+        """EWMA latency, decayed by the time since the last sample."""
+        if self.samples == 0:
+            return 0.0
+        idle = time.monotonic() - self._observed_at
+        return self.ewma_seconds * math.exp(-idle / _EWMA_DECAY_SECONDS)
+
+    def stats(self) -> dict[str, Any]:
+        stats: dict[str, Any] = {
+            "base_url": self.base_url,
+            "weight": self.weight,
+            "ewma_ms": round(self.latency() * 1000, 1),
+            "in_flight": self.in_flight,
+        }
+        if self.breaker is not None:
+            stats["circuit"] = self.breaker.stats()
+        return stats
+
+
+def pick_two_choices(
+    candidates: Sequence[T],
+    endpoint_of: Callable[[T], Endpoint],
+    weight_of: Callable[[T], float],
+    rng: random.Random | None = None,
+) -> T:
+    """Power-of-two-choices: sample two distinct candidates by weight, keep
+    the one with the lower EWMA latency x (in-flight + 1) / weight.
+
+    An endpoint without samples borrows the other candidate's latency, so
+    the comparison falls back to in-flight counts instead of sending all
+    traffic to whichever endpoint has not been measured yet.
+    """
+    if len(candidates) == 1:
+        return candidates[0]
+    rng = rng or random
+    indices = range(len(candidates))
+    weights = [weight_of(candidate) for candidate in candidates]
+    first = rng.choices(indices, weights=weights)[0]
+    rest = [index for index in indices if index != first]
+    second = rng.choices(rest, weights=[weights[index] for index in rest])[0]
+    a, b = candidates[first], candidates[second]
+    endpoint_a, endpoint_b = endpoint_of(a), endpoint_of(b)
+    latency_a = endpoint_a.latency() if endpoint_a.samples else None
+    latency_b = endpoint_b.latency() if endpoint_b.samples else None
+    if latency_a is None:
+        latency_a = 1.0 if latency_b is None else latency_b
+    if latency_b is None:
+        latency_b = latency_a
+    score_a = latency_a * (endpoint_a.in_flight + 1) / weights[first]
+    score_b = latency_b * (endpoint_b.in_flight + 1) / weights[second]
+    return a if score_a <= score_b else b
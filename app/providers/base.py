@@ -1,8 +1,25 @@
 from __future__ import annotations
 
+import importlib.util
 from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
 
 from app.auth import AuthContext, AuthStrategy
+from app.config import (
+    AdaptiveConcurrencyConfig,
+    CircuitBreakerConfig,
+    ConcurrencyConfig,
+    ConfigError,
+    PoolConfig,
+    RetryConfig,
+)
+from app.providers.admission import AdmissionQueue
+from app.providers.balancer import Endpoint
+from app.providers.circuit import CircuitBreaker
+from app.providers.limiter import AdaptiveLimiter
+from app.providers.retry import RetryBudget
 
 
 @dataclass
@@ -13,30 +30,168 @@ class Provider:
     timeout_seconds: float = 300.0
     extra_headers: dict[str, str] = field(default_factory=dict)
     path_overrides: dict[str, str] = field(default_factory=dict)
+    pool: PoolConfig = field(default_factory=PoolConfig)
+    transport: httpx.AsyncBaseTransport | None = field(default=None, repr=False)
+    endpoints: list[Endpoint] = field(default_factory=list)
+    circuit_breaker: CircuitBreakerConfig = field(default_factory=CircuitBreakerConfig)
+    retry: RetryConfig = field(default_factory=RetryConfig)
+    concurrency: ConcurrencyConfig = field(default_factory=ConcurrencyConfig)
+    adaptive_concurrency: AdaptiveConcurrencyConfig = field(
+        default_factory=AdaptiveConcurrencyConfig
+    )
+    lane_pools: dict[str, PoolConfig] = field(default_factory=dict)
+    _client: httpx.AsyncClient | None = field(default=None, init=False, repr=False)
+    _lane_clients: dict[str, httpx.AsyncClient] = field(default_factory=dict, init=False, repr=False)
+    _static_headers: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+    _auth_contexts: dict[str, AuthContext] = field(default_factory=dict, init=False, repr=False)
+    _urls: dict[tuple[str, str], str] = field(default_factory=dict, init=False, repr=False)
+    retry_budget: RetryBudget = field(init=False, repr=False)
+    admission: AdmissionQueue | None = field(default=None, init=False, repr=False)
+    limiter: AdaptiveLimiter | None = field(default=None, init=False, repr=False)
+    # Requests routed to this provider and not yet finished; a provider
+    # dropped by a config reload is closed once this reaches zero.
+    in_use: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.endpoints:
+            self.endpoints = [Endpoint(base_url=self.base_url)]
+        self.retry_budget = RetryBudget(self.retry)
+        if self.adaptive_concurrency.enabled:
+            # The limiter owns the limit; ``max_in_flight`` is not used.
+            self.admission = AdmissionQueue(
+                f"provider '{self.provider_id}'",
+                self.concurrency,
+                limit=self.adaptive_concurrency.initial_limit,
+            )
+            self.limiter = AdaptiveLimiter(
+                self.provider_id, self.adaptive_concurrency, self.admission
+            )
+        elif self.concurrency.max_in_flight is not None:
+            self.admission = AdmissionQueue(f"provider '{self.provider_id}'", self.concurrency)
+        for endpoint in self.endpoints:
+            endpoint.failure_penalty_seconds = self.timeout_seconds
+            if self.circuit_breaker.enabled and endpoint.breaker is None:
+                endpoint.breaker = CircuitBreaker(self.circuit_breaker)
+        self._static_headers = {
+            "Content-Type": "application/json; charset=utf-8",
+            **self.extra_headers,
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    def client_for(self, lane: str) -> httpx.AsyncClient:
+        """The pool for a priority lane: its own if ``lane_pools`` has one,
+        so batch traffic cannot occupy the connections interactive requests
+        need, otherwise the shared :attr:`client`."""
+        pool = self.lane_pools.get(lane)
+        if pool is None:
+            return self.client
+        client = self._lane_clients.get(lane)
+        if client is None:
+            client = self._lane_clients[lane] = self._build_client(pool)
+        return client
+
+    async def aclose(self) -> None:
+        self.auth_strategy.close()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        for client in self._lane_clients.values():
+            await client.aclose()
+        self._lane_clients.clear()
 
     async def request_spec(
         self,
         path: str,
         upstream_model: str,
+        base_url: str | None = None,
     ) -> tuple[str, dict[str, str], float]:
-        headers = {
-            "Content-Type": "application/json; charset=utf-8",
-            **self.extra_headers,
+        context = self._auth_contexts.get(upstream_model)
+        if context is None:
+            context = AuthContext(provider_id=self.provider_id, upstream_model=upstream_model)
+            self._auth_contexts[upstream_model] = context
+        headers = dict(self._static_headers)
+        headers.update(await self.auth_strategy.headers(context))
+        base_url = base_url or self.base_url
+        url = self._urls.get((base_url, path))
+        if url is None:
+            url = self._urls[(base_url, path)] = self._resolve_url(path, base_url)
+        return url, headers, self.timeout_seconds
+
+    def auth_stats(self) -> dict[str, Any]:
+        return self.auth_strategy.stats()
+
+    def pool_stats(self) -> dict[str, Any]:
+        stats = self._pool_stats(self._client, self.pool)
+        if self.lane_pools:
+            stats["lanes"] = {
+                lane: self._pool_stats(self._lane_clients.get(lane), pool)
+                for lane, pool in self.lane_pools.items()
+            }
+        return stats
+
+    @staticmethod
+    def _pool_stats(client: httpx.AsyncClient | None, pool_config: PoolConfig) -> dict[str, Any]:
+        stats: dict[str, Any] = {
+            "max_connections": pool_config.max_connections,
+            "max_keepalive_connections": pool_config.max_keepalive_connections,
+            "keepalive_expiry": pool_config.keepalive_expiry,
+            "http2": pool_config.http2,
+            "connections": 0,
+            "active": 0,
+            "idle": 0,
+            "queued": 0,
         }
-        dynamic = await self.auth_strategy.headers(
-            AuthContext(provider_id=self.provider_id, upstream_model=upstream_model)
+        # httpx does not expose pool internals publicly; read httpcore's pool
+        # defensively so a library upgrade degrades to zeros instead of raising.
+        transport = getattr(client, "_transport", None)
+        pool = getattr(transport, "_pool", None)
+        if pool is None:
+            return stats
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        stats["connections"] = len(connections)
+        stats["idle"] = idle
+        stats["active"] = len(connections) - idle
+        stats["queued"] = sum(
+            1 for request in getattr(pool, "_requests", []) if request.is_queued()
+        )
+        return stats
+
+    def _build_client(self, pool: PoolConfig | None = None) -> httpx.AsyncClient:
+        pool = pool or self.pool
+        if pool.http2 and importlib.util.find_spec("h2") is None:
+            raise ConfigError(
+                f"Provider '{self.provider_id}' enables pool.http2 but the 'h2' package "
+                "is not installed. Install with: pip install 'httpx[http2]'."
+            )
+        limits = httpx.Limits(
+            max_connections=pool.max_connections,
+            max_keepalive_connections=pool.max_keepalive_connections,
+            keepalive_expiry=pool.keepalive_expiry,
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            http2=pool.http2,
+            timeout=httpx.Timeout(
+                self.timeout_seconds,
+                connect=pool.connect_timeout_seconds,
+            ),
+            transport=self.transport,
         )
-        headers.update(dynamic)
-        url = self._resolve_url(path)
-        return url, headers, self.timeout_seconds
 
-    def _resolve_url(self, path: str) -> str:
+    def _resolve_url(self, path: str, base_url: str | None = None) -> str:
+        base_url = base_url or self.base_url
         override = self.path_overrides.get(path)
         if override is None:
-            return f"{self.base_url.rstrip('/')}/{path.lstrip('/')}"
+            return f"{base_url.rstrip('/')}/{path.lstrip('/')}"
         cleaned = override.strip()
         if not cleaned:
-            return self.base_url
+            return base_url
         if cleaned.startswith("http://") or cleaned.startswith("https://"):
             return cleaned
-        return f"{self.base_url.rstrip('/')}/{cleaned.lstrip('/')}"
+        return f"{base_url.rstrip('/')}/{cleaned.lstrip('/')}"
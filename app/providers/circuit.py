@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import math
+import time
+from typing import Any
+
+from app.config import CircuitBreakerConfig
+from app.shared import SharedStore, SharedStoreBusy
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_WINDOW_BUCKETS = 10
+_SHARED_POLL_SECONDS = 1.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Every endpoint that could serve a request has its circuit open."""
+
+    def __init__(self, message: str, retry_after_seconds: float) -> None:
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after_seconds)))
+
+
+class CircuitBreaker:
+    """Passive outlier ejection for one upstream endpoint.
+
+    The circuit opens on ``consecutive_failures`` failures in a row, or when
+    the error rate over the rolling ``window_seconds`` reaches
+    ``error_rate_threshold`` with at least ``min_requests`` samples.  Calls
+    slower than ``slow_call_seconds`` (time to response headers) count as
+    failures.  After the cool-down a limited number of half-open probes are
+    let through; one success closes the circuit, a failure reopens it with a
+    doubled cool-down capped at ``max_open_seconds``.
+
+    Admission is claimed with :meth:`try_acquire` when the endpoint is
+    chosen, so concurrent requests cannot all slip through as probes while
+    one of them is still signing.  Claims are tagged with the state
+    generation; :meth:`release` of a claim whose probe has already decided
+    the state is a no-op.
+
+    After :meth:`share`, a trip is published to the :class:`SharedStore` and
+    a closed breaker checks it at most once a second, so when one worker
+    process ejects an endpoint the others stop sending to it too.
+    """
+
+    def __init__(self, config: CircuitBreakerConfig) -> None:
+        self.config = config
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self._reopen_count = 0
+        self._open_until = 0.0
+        self._probes = 0
+        self._generation = 0
+        self._bucket_span = config.window_seconds / _WINDOW_BUCKETS
+        # Ring of [bucket_id, total, failures].
+        self._buckets = [[-1, 0, 0] for _ in range(_WINDOW_BUCKETS)]
+        self._shared: SharedStore | None = None
+        self._shared_name = ""
+        self._shared_checked = float("-inf")
+
+    def share(self, store: SharedStore, name: str) -> None:
+        self._shared = store
+        self._shared_name = name
+
+    @property
+    def closed(self) -> bool:
+        return self.state == CLOSED
+
+    def try_acquire(self) -> int | None:
+        """Claim admission; returns a claim token, or ``None`` when refused."""
+        if self.state == CLOSED:
+            if self._shared is None or not self._opened_elsewhere():
+                return self._generation
+        if self.state == OPEN:
+            if time.monotonic() < self._open_until:
+                return None
+            self._set_state(HALF_OPEN)
+        if self._probes >= self.config.half_open_probes:
+            return None
+        self._probes += 1
+        return self._generation
+
+    def release(self, claim: int) -> None:
+        if self.state == HALF_OPEN and claim == self._generation and self._probes > 0:
+            self._probes -= 1
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._open_until - time.monotonic())
+
+    def record(self, ok: bool, latency_seconds: float | None = None) -> None:
+        slow = self.config.slow_call_seconds
+        if ok and slow is not None and latency_seconds is not None and latency_seconds > slow:
+            ok = False
+        if self.state == HALF_OPEN:
+            if ok:
+                self._close()
+            else:
+                self._trip(time.monotonic())
+            return
+        if self.state == OPEN:
+            # Late answer from a request sent before the circuit opened.
+            return
+        now = time.monotonic()
+        total, failures = self._count(now, ok)
+        if ok:
+            self.consecutive_failures = 0
+            return
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.config.consecutive_failures or (
+            total >= self.config.min_requests
+            and failures / total >= self.config.error_rate_threshold
+        ):
+            self._trip(now)
+
+    def stats(self) -> dict[str, Any]:
+        total = failures = 0
+        current = int(time.monotonic() / self._bucket_span)
+        for bucket in self._buckets:
+            if current - bucket[0] < _WINDOW_BUCKETS:
+                total += bucket[1]
+                failures += bucket[2]
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "window_requests": total,
+            "window_failures": failures,
+            "trips": self.trips,
+            "retry_after_seconds": round(self.retry_after(), 1),
+        }
+
+    def _count(self, now: float, ok: bool) -> tuple[int, int]:
+        bucket_id = int(now / self._bucket_span)
+        bucket = self._buckets[bucket_id % _WINDOW_BUCKETS]
+        if bucket[0] != bucket_id:
+            bucket[0], bucket[1], bucket[2] = bucket_id, 0, 0
+        bucket[1] += 1
+        if not ok:
+            bucket[2] += 1
+        total = failures = 0
+        for other in self._buckets:
+            if bucket_id - other[0] < _WINDOW_BUCKETS:
+                total += other[1]
+                failures += other[2]
+        return total, failures
+
+    def _trip(self, now: float) -> None:
+        cooldown = min(
+            self.config.open_seconds * (2 ** min(self._reopen_count, 16)),
+            self.config.max_open_seconds,
+        )
+        self._set_state(OPEN)
+        self._open_until = now + cooldown
+        self._reopen_count += 1
+        self.trips += 1
+        if self._shared is not None:
+            try:
+                self._shared.set_deadline(self._shared_name, time.time() + cooldown)
+            except SharedStoreBusy:
+                pass  # other workers trip on their own failures instead
+
+    def _opened_elsewhere(self) -> bool:
+        now = time.monotonic()
+        if now - self._shared_checked < _SHARED_POLL_SECONDS:
+            return False
+        self._shared_checked = now
+        try:
+            remaining = self._shared.deadline(self._shared_name) - time.time()
+        except SharedStoreBusy:
+            return False
+        if remaining <= 0:
+            return False
+        self._set_state(OPEN)
+        self._open_until = now + remaining
+        return True
+
+    def _close(self) -> None:
+        self._set_state(CLOSED)
+        self.consecutive_failures = 0
+        self._reopen_count = 0
+        for bucket in self._buckets:
+            bucket[0], bucket[1], bucket[2] = -1, 0, 0
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        self._probes = 0
+        self._generation += 1
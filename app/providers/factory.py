@@ -3,23 +3,34 @@ from __future__ import annotations
 import os
 from typing import Any
 
+import httpx
+
 from app.auth import build_auth_strategy
 from app.config import ConfigError, ProviderConfig
+from app.providers.balancer import Endpoint
 from app.providers.base import Provider
 
 
 class ProviderFactory:
     @staticmethod
-    def create_provider(config: ProviderConfig) -> Provider:
+    def create_provider(
+        config: ProviderConfig,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> Provider:
+        """``transport`` replaces the pooled HTTP transport (e.g. a mock
+        upstream or a unix-socket sidecar); ``None`` uses the real pool."""
         provider_type = config.provider_type.strip().lower()
         if provider_type == "panzhi":
-            return ProviderFactory._create_panzhi_provider(config)
+            return ProviderFactory._create_panzhi_provider(config, transport)
         if provider_type in {"neibu", "internal", "juzhi"}:
-            return ProviderFactory._create_neibu_provider(config)
-        return ProviderFactory._create_generic_provider(config)
+            return ProviderFactory._create_neibu_provider(config, transport)
+        return ProviderFactory._create_generic_provider(config, transport)
 
     @staticmethod
-    def _create_generic_provider(config: ProviderConfig) -> Provider:
+    def _create_generic_provider(
+        config: ProviderConfig,
+        transport: httpx.AsyncBaseTransport | None,
+    ) -> Provider:
         return Provider(
             provider_id=config.id,
             base_url=config.resolved_base_url(),
@@ -27,10 +38,21 @@ class ProviderFactory:
             timeout_seconds=config.timeout_seconds,
             extra_headers=config.extra_headers,
             path_overrides=config.path_overrides,
+            pool=config.pool,
+            endpoints=ProviderFactory._build_endpoints(config),
+            circuit_breaker=config.circuit_breaker,
+            retry=config.retry,
+            concurrency=config.concurrency,
+            adaptive_concurrency=config.adaptive_concurrency,
+            lane_pools=config.lane_pools,
+            transport=transport,
         )
 
     @staticmethod
-    def _create_panzhi_provider(config: ProviderConfig) -> Provider:
+    def _create_panzhi_provider(
+        config: ProviderConfig,
+        transport: httpx.AsyncBaseTransport | None,
+    ) -> Provider:
         auth = ProviderFactory._merge_defaults(
             defaults={
                 "type": "qwen_signature",
@@ -53,10 +75,21 @@ class ProviderFactory:
             timeout_seconds=config.timeout_seconds,
             extra_headers=config.extra_headers,
             path_overrides=config.path_overrides,
+            pool=config.pool,
+            endpoints=ProviderFactory._build_endpoints(config),
+            circuit_breaker=config.circuit_breaker,
+            retry=config.retry,
+            concurrency=config.concurrency,
+            adaptive_concurrency=config.adaptive_concurrency,
+            lane_pools=config.lane_pools,
+            transport=transport,
         )
 
     @staticmethod
-    def _create_neibu_provider(config: ProviderConfig) -> Provider:
+    def _create_neibu_provider(
+        config: ProviderConfig,
+        transport: httpx.AsyncBaseTransport | None,
+    ) -> Provider:
         auth = ProviderFactory._merge_defaults(
             defaults={
                 "type": "internal_api_key",
@@ -85,6 +118,14 @@ class ProviderFactory:
             timeout_seconds=config.timeout_seconds,
             extra_headers=config.extra_headers,
             path_overrides=config.path_overrides,
+            pool=config.pool,
+            endpoints=ProviderFactory._build_endpoints(config),
+            circuit_breaker=config.circuit_breaker,
+            retry=config.retry,
+            concurrency=config.concurrency,
+            adaptive_concurrency=config.adaptive_concurrency,
+            lane_pools=config.lane_pools,
+            transport=transport,
         )
 
     @staticmethod
@@ -98,6 +139,8 @@ class ProviderFactory:
             raise ConfigError(
                 f"Provider '{config.id}' requires env '{config.base_url_env}' for base_url."
             )
+        if config.endpoints:
+            return config.endpoints[0].resolved_base_url(config.id)
         if fallback_env:
             fallback = os.getenv(fallback_env, "").strip()
             if fallback:
@@ -107,6 +150,13 @@ class ProviderFactory:
             f"Provider '{config.id}' must set base_url/base_url_env{source}."
         )
 
+    @staticmethod
+    def _build_endpoints(config: ProviderConfig) -> list[Endpoint]:
+        return [
+            Endpoint(base_url=endpoint.resolved_base_url(config.id), weight=endpoint.weight)
+            for endpoint in config.endpoints
+        ]
+
     @staticmethod
     def _merge_defaults(
         *,
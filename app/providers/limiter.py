@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from typing import Any
+
+from app.config import AdaptiveConcurrencyConfig
+from app.providers.admission import AdmissionQueue
+
+logger = logging.getLogger(__name__)
+
+_BASELINE_DRIFT = 0.01
+_RECENT_ALPHA = 0.2
+
+
+class AdaptiveLimiter:
+    """Moves an :class:`AdmissionQueue` limit towards the upstream's capacity.
+
+    Each upstream attempt reports whether it succeeded and its latency: time
+    to response headers, or to the first token for a stream.  ``baseline`` is the no-load latency: the lowest
+    latency seen, drifting slowly upwards so a stale minimum cannot pin the
+    limit down forever.
+
+    ``aimd`` adds ``1/limit`` per fast success (about +1 per round of
+    ``limit`` requests) and multiplies by ``backoff_ratio`` on a failure,
+    an upstream 429 or a latency above ``latency_tolerance * baseline``; at
+    most one decrease per recent latency interval, so a burst of failures
+    from one window counts once.
+
+    ``gradient`` compares a short EWMA of latency with the baseline: above
+    ``latency_tolerance * baseline`` the limit is scaled by that ratio
+    (at least 0.5), on failures by ``backoff_ratio``, and otherwise it grows
+    by a ``sqrt(limit)`` queue allowance; every step is smoothed.
+
+    The limit only grows while the queue actually uses at least half of it,
+    so an idle provider does not drift up to ``max_limit``.
+    """
+
+    def __init__(self, name: str, config: AdaptiveConcurrencyConfig, queue: AdmissionQueue) -> None:
+        self.name = name
+        self.config = config
+        self.queue = queue
+        self.limit = float(self._clamp(config.initial_limit))
+        self.baseline: float | None = None
+        self.recent: float | None = None
+        self.changes = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        queue.set_limit(int(self.limit))
+
+    def record(self, ok: bool, latency_seconds: float) -> None:
+        if ok:
+            self._observe(latency_seconds)
+        if self.baseline is None or self.recent is None:
+            if not ok:
+                self._decrease(self.limit * self.config.backoff_ratio, "error")
+            return
+        congested = not ok or latency_seconds > self.baseline * self.config.latency_tolerance
+        if self.config.algorithm == "aimd":
+            if congested:
+                self._decrease(self.limit * self.config.backoff_ratio, "error" if not ok else "latency")
+            elif self._saturated():
+                self._apply(self.limit + 1.0 / self.limit, "probe")
+            return
+        if not ok:
+            target, reason = self.limit * self.config.backoff_ratio, "error"
+        else:
+            gradient = self.config.latency_tolerance * self.baseline / self.recent
+            if gradient < 1.0:
+                target, reason = self.limit * max(0.5, gradient), "latency"
+            elif self._saturated():
+                target, reason = self.limit + math.sqrt(self.limit), "probe"
+            else:
+                return
+        self._apply(self.limit * (1 - _RECENT_ALPHA) + target * _RECENT_ALPHA, reason)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "algorithm": self.config.algorithm,
+            "limit": int(self.limit),
+            "baseline_seconds": None if self.baseline is None else round(self.baseline, 4),
+            "recent_seconds": None if self.recent is None else round(self.recent, 4),
+            "changes": self.changes,
+            "decreases": self.decreases,
+        }
+
+    def _observe(self, latency: float) -> None:
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * _BASELINE_DRIFT
+        if self.recent is None:
+            self.recent = latency
+        else:
+            self.recent += (latency - self.recent) * _RECENT_ALPHA
+
+    def _saturated(self) -> bool:
+        return self.queue.in_flight * 2 >= self.limit or self.queue.queue_depth > 0
+
+    def _decrease(self, value: float, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < (self.recent or 0.0):
+            return
+        self._last_decrease = now
+        self.decreases += 1
+        self._apply(value, reason)
+
+    def _apply(self, value: float, reason: str) -> None:
+        previous = int(self.limit)
+        self.limit = float(self._clamp(value))
+        current = int(self.limit)
+        if current == previous:
+            return
+        self.changes += 1
+        self.queue.set_limit(current)
+        logger.info(
+            "adaptive_limit | provider=%s limit=%d->%d reason=%s",
+            self.name,
+            previous,
+            current,
+            reason,
+        )
+
+    def _clamp(self, value: float) -> float:
+        return min(float(self.config.max_limit), max(float(self.config.min_limit), value))
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import random
+from typing import Any
+
+import httpx
+
+from app.config import RetryConfig
+
+
+def is_retryable_error(exc: httpx.HTTPError) -> bool:
+    """Transport failures where the upstream produced no response.
+
+    A read timeout is excluded: the request was delivered and waited out in
+    full, so a retry would double the load on an upstream that is already
+    slow.
+    """
+    return isinstance(exc, httpx.TransportError) and not isinstance(exc, httpx.ReadTimeout)
+
+
+def backoff_delay(attempt: int, config: RetryConfig, rng: random.Random | None = None) -> float:
+    """Full-jitter exponential backoff for retry number ``attempt`` (1-based)."""
+    ceiling = min(config.backoff_max_seconds, config.backoff_base_seconds * (2 ** (attempt - 1)))
+    return (rng or random).uniform(0, ceiling)
+
+
+class RetryBudget:
+    """Token bucket that keeps retries to ``budget_ratio`` of requests.
+
+    Every first attempt deposits ``budget_ratio`` tokens (capped at
+    ``budget_burst``); every retry withdraws one.  The initial balance of
+    ``budget_burst`` lets a quiet provider still retry an isolated failure.
+    """
+
+    def __init__(self, config: RetryConfig) -> None:
+        self.config = config
+        self._tokens = config.budget_burst
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    def deposit(self) -> None:
+        self.requests += 1
+        self._tokens = min(self.config.budget_burst, self._tokens + self.config.budget_ratio)
+
+    def try_withdraw(self) -> bool:
+        # Tolerate float drift so ten 0.1 deposits buy exactly one retry.
+        if self._tokens < 1 - 1e-9:
+            self.exhausted += 1
+            return False
+        self._tokens -= 1
+        self.retries += 1
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "budget_exhausted": self.exhausted,
+            "budget_tokens": round(self._tokens, 2),
+        }
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any
 
+from app.providers.admission import AdmissionQueue
+from app.providers.balancer import Endpoint, pick_two_choices
 from app.providers.base import Provider
+from app.providers.circuit import CircuitOpenError
+
+_ENDPOINT_OF = attrgetter("endpoint")
+_WEIGHT_OF = attrgetter("weight")
 
 
 @dataclass(frozen=True)
@@ -10,33 +18,122 @@ class ModelRoute:
     alias: str
     upstream_model: str
     provider: Provider
+    endpoint: Endpoint
+    weight: float = 1.0
+    admission: AdmissionQueue | None = None
 
 
 class ModelRouter:
     def __init__(self) -> None:
-        self._routes: dict[str, ModelRoute] = {}
+        self._routes: dict[str, list[ModelRoute]] = {}
+        self._groups: set[str] = set()
 
-    def register(self, alias: str, upstream_model: str, provider: Provider) -> None:
+    def register(
+        self,
+        alias: str,
+        upstream_model: str,
+        provider: Provider,
+        admission: AdmissionQueue | None = None,
+    ) -> None:
         if alias in self._routes:
-            existing_provider = self._routes[alias].provider.provider_id
+            existing_provider = self._routes[alias][0].provider.provider_id
             raise RuntimeError(
                 f"Model alias '{alias}' is duplicated between providers "
                 f"'{existing_provider}' and '{provider.provider_id}'."
             )
-        self._routes[alias] = ModelRoute(
-            alias=alias,
-            upstream_model=upstream_model,
-            provider=provider,
-        )
+        self._routes[alias] = [
+            ModelRoute(
+                alias=alias,
+                upstream_model=upstream_model,
+                provider=provider,
+                endpoint=endpoint,
+                weight=endpoint.weight,
+                admission=admission,
+            )
+            for endpoint in provider.endpoints
+        ]
+
+    def register_group(self, alias: str, members: list[tuple[str, float]]) -> None:
+        """Expose ``alias`` as a weighted union of already registered aliases."""
+        if alias in self._routes:
+            raise RuntimeError(f"Alias group '{alias}' collides with an existing model alias.")
+        if not members:
+            raise RuntimeError(f"Alias group '{alias}' has no members.")
+        routes: list[ModelRoute] = []
+        for member_alias, weight in members:
+            if member_alias in self._groups or member_alias not in self._routes:
+                raise RuntimeError(
+                    f"Alias group '{alias}' references unknown model alias '{member_alias}'."
+                )
+            for route in self._routes[member_alias]:
+                routes.append(
+                    ModelRoute(
+                        alias=route.alias,
+                        upstream_model=route.upstream_model,
+                        provider=route.provider,
+                        endpoint=route.endpoint,
+                        weight=route.weight * weight,
+                        admission=route.admission,
+                    )
+                )
+        self._routes[alias] = routes
+        self._groups.add(alias)
 
     def resolve(self, alias: str) -> ModelRoute:
-        route = self._routes.get(alias)
-        if route is None:
+        """Pick a route for ``alias`` without holding its admission claim."""
+        route, claim = self.acquire(alias)
+        route.endpoint.release(claim)
+        return route
+
+    def acquire(self, alias: str) -> tuple[ModelRoute, int]:
+        """Pick a route and claim admission on its endpoint.
+
+        Only the chosen endpoint's circuit breaker is consulted; if it
+        refuses, the next pick is made among the remaining routes.  The
+        caller must hand the claim back with ``route.endpoint.release``
+        once the request has finished.
+        """
+        routes = self._routes.get(alias)
+        if routes is None:
             supported = ", ".join(sorted(self._routes)) or "<empty>"
             raise RuntimeError(
                 f"Unknown model '{alias}'. Supported models: {supported}"
             )
-        return route
+        candidates = routes
+        while candidates:
+            route = pick_two_choices(candidates, endpoint_of=_ENDPOINT_OF, weight_of=_WEIGHT_OF)
+            claim = route.endpoint.try_acquire()
+            if claim is not None:
+                return route, claim
+            candidates = [candidate for candidate in candidates if candidate is not route]
+        retry_after = min(route.endpoint.retry_after() for route in routes)
+        raise CircuitOpenError(
+            f"Model '{alias}' is temporarily unavailable: "
+            "circuit open on every upstream endpoint.",
+            retry_after_seconds=retry_after,
+        )
+
+    def admission_stats(self) -> dict[str, dict[str, Any]]:
+        """Per-alias admission queue stats for aliases with a concurrency limit."""
+        return {
+            alias: routes[0].admission.stats()
+            for alias, routes in sorted(self._routes.items())
+            if alias not in self._groups and routes[0].admission is not None
+        }
+
+    def admission(self, alias: str) -> AdmissionQueue | None:
+        """The admission queue of a model alias, if it has one."""
+        routes = self._routes.get(alias)
+        if routes is None or alias in self._groups:
+            return None
+        return routes[0].admission
+
+    def list_providers(self) -> list[Provider]:
+        providers: dict[int, Provider] = {}
+        for routes in self._routes.values():
+            for route in routes:
+                providers.setdefault(id(route.provider), route.provider)
+        return list(providers.values())
 
     def list_model_ids(self) -> list[str]:
         return sorted(self._routes.keys())
@@ -46,11 +143,12 @@ class ModelRouter:
             "object": "list",
             "data": [
                 {
-                    "id": route.alias,
+                    "id": alias,
                     "object": "model",
-                    "owned_by": route.provider.provider_id,
+                    "owned_by": ",".join(
+                        dict.fromkeys(route.provider.provider_id for route in routes)
+                    ),
                 }
-                for route in sorted(self._routes.values(), key=lambda item: item.alias)
+                for alias, routes in sorted(self._routes.items())
             ],
         }
-
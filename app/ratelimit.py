@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import time
+from typing import Any
+
+from fastapi import HTTPException
+
+from app.config import ClientLimitConfig
+from app.shared import SharedStore, SharedStoreBusy
+
+
+class RateLimitExceeded(HTTPException):
+    """429 with an OpenAI-style error body and ``x-ratelimit-*`` headers."""
+
+    def __init__(self, message: str, *, code: str, error_type: str, headers: dict[str, str]) -> None:
+        super().__init__(status_code=429, detail=message, headers=headers)
+        self.error = {"message": message, "type": error_type, "param": None, "code": code}
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, per_second: float) -> None:
+        self.capacity = capacity
+        self.per_second = per_second
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def balance(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.per_second)
+        self._updated = now
+        return self.tokens
+
+    def take(self, amount: float, require: float | None = None) -> bool:
+        """Withdraw ``amount``; with ``require`` only while that much is left,
+        otherwise unconditionally (the balance may go into debt)."""
+        if require is not None and self.balance() < require:
+            return False
+        self.balance()
+        self.tokens -= amount
+        return True
+
+    def seconds_until(self, tokens: float) -> float:
+        return max(0.0, (tokens - self.tokens) / self.per_second)
+
+
+class SharedTokenBucket(TokenBucket):
+    """A :class:`TokenBucket` whose balance lives in a :class:`SharedStore`,
+    so every worker process draws from the same bucket.
+
+    While the store is busy the last balance seen is used as a local bucket,
+    so a slow file lock costs accuracy rather than latency.
+    """
+
+    def __init__(self, store: SharedStore, name: str, capacity: float, per_second: float) -> None:
+        super().__init__(capacity, per_second)
+        self.store = store
+        self.name = name
+
+    def balance(self) -> float:
+        try:
+            _, tokens = self.store.take(self.name, self.capacity, self.per_second, 0.0)
+        except SharedStoreBusy:
+            return super().balance()
+        self._sync(tokens)
+        return self.tokens
+
+    def take(self, amount: float, require: float | None = None) -> bool:
+        try:
+            taken, tokens = self.store.take(
+                self.name, self.capacity, self.per_second, amount, require=require
+            )
+        except SharedStoreBusy:
+            return super().take(amount, require)
+        self._sync(tokens)
+        return taken
+
+    def _sync(self, tokens: float) -> None:
+        self.tokens = tokens
+        self._updated = time.monotonic()
+
+
+def _duration(seconds: float) -> str:
+    """OpenAI's reset format: ``1s``, ``6m0s``, ``20ms``."""
+    if seconds < 1:
+        return f"{max(0, math.ceil(seconds * 1000))}ms"
+    seconds = math.ceil(seconds)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{minutes}m{seconds}s" if minutes else f"{seconds}s"
+
+
+class ClientLimit:
+    """Request-rate, token-rate and daily token limits of one client key.
+
+    Requests are admitted while a request token and a positive token balance
+    are left; the tokens a response actually used are only known at the end,
+    so :meth:`record_tokens` may drive the token bucket negative and hold the
+    next requests back until it refills.  With a :class:`SharedStore` the
+    buckets and the daily counter are shared by all worker processes.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        config: ClientLimitConfig,
+        store: SharedStore | None = None,
+        store_key: str = "",
+    ) -> None:
+        self.label = label
+        self.config = config
+        self.store = store
+        self._store_key = store_key
+        self.requests = (
+            self._bucket(
+                "requests",
+                config.request_burst or config.requests_per_minute,
+                config.requests_per_minute / 60,
+            )
+            if config.requests_per_minute
+            else None
+        )
+        self.tokens = (
+            self._bucket("tokens", config.tokens_per_minute, config.tokens_per_minute / 60)
+            if config.tokens_per_minute
+            else None
+        )
+        self.day = ""
+        self._daily_used = 0
+        self._daily_unsaved = 0
+        self.rejected = 0
+
+    @property
+    def daily_used(self) -> int:
+        self._roll_day()
+        if self.store is not None:
+            try:
+                self._daily_used = int(self.store.get(self._daily_name())) + self._daily_unsaved
+            except SharedStoreBusy:
+                pass
+        return self._daily_used
+
+    def admit(self) -> None:
+        """Take one request or raise :class:`RateLimitExceeded`."""
+        if self.config.daily_tokens is not None and self.daily_used >= self.config.daily_tokens:
+            self.rejected += 1
+            raise RateLimitExceeded(
+                f"Daily token quota of {self.config.daily_tokens} exhausted for key {self.label}.",
+                code="insufficient_quota",
+                error_type="insufficient_quota",
+                headers={**self.headers(), "Retry-After": str(self._seconds_to_midnight())},
+            )
+        if self.tokens is not None and self.tokens.balance() <= 0:
+            self.rejected += 1
+            wait = self.tokens.seconds_until(1)
+            raise RateLimitExceeded(
+                f"Rate limit reached for tokens on key {self.label}: "
+                f"limit {self.config.tokens_per_minute}/min. Try again in {_duration(wait)}.",
+                code="rate_limit_exceeded",
+                error_type="tokens",
+                headers={**self.headers(), "Retry-After": str(max(1, math.ceil(wait)))},
+            )
+        if self.requests is not None and not self.requests.take(1, require=1):
+            self.rejected += 1
+            wait = self.requests.seconds_until(1)
+            raise RateLimitExceeded(
+                f"Rate limit reached for requests on key {self.label}: "
+                f"limit {self.config.requests_per_minute:g}/min. Try again in {_duration(wait)}.",
+                code="rate_limit_exceeded",
+                error_type="requests",
+                headers={**self.headers(), "Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    def record_tokens(self, count: int) -> None:
+        if count <= 0:
+            return
+        self._roll_day()
+        self._daily_used += count
+        if self.store is not None:
+            # Tokens the store could not take yet ride along with the next add.
+            self._daily_unsaved += count
+            try:
+                self.store.add(self._daily_name(), self._daily_unsaved)
+            except SharedStoreBusy:
+                pass
+            else:
+                self._daily_unsaved = 0
+        if self.tokens is not None:
+            self.tokens.take(count)
+
+    def headers(self) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if self.requests is not None:
+            headers["x-ratelimit-limit-requests"] = str(int(self.requests.capacity))
+            headers["x-ratelimit-remaining-requests"] = str(max(0, int(self.requests.tokens)))
+            headers["x-ratelimit-reset-requests"] = _duration(
+                self.requests.seconds_until(self.requests.capacity)
+            )
+        if self.tokens is not None:
+            headers["x-ratelimit-limit-tokens"] = str(int(self.tokens.capacity))
+            headers["x-ratelimit-remaining-tokens"] = str(max(0, int(self.tokens.tokens)))
+            headers["x-ratelimit-reset-tokens"] = _duration(
+                self.tokens.seconds_until(self.tokens.capacity)
+            )
+        return headers
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "remaining_requests": None if self.requests is None else int(self.requests.balance()),
+            "remaining_tokens": None if self.tokens is None else int(self.tokens.balance()),
+            "daily_tokens_used": self.daily_used,
+            "daily_tokens_limit": self.config.daily_tokens,
+            "rejected": self.rejected,
+        }
+
+    def _bucket(self, kind: str, capacity: float, per_second: float) -> TokenBucket:
+        if self.store is None:
+            return TokenBucket(capacity, per_second)
+        return SharedTokenBucket(self.store, f"client:{self._store_key}:{kind}", capacity, per_second)
+
+    def _daily_name(self) -> str:
+        return f"client:{self._store_key}:daily:{self.day}"
+
+    def _roll_day(self) -> None:
+        today = time.strftime("%Y-%m-%d")
+        if today != self.day:
+            self.day = today
+            self._daily_used = 0
+            self._daily_unsaved = 0
+
+    @staticmethod
+    def _seconds_to_midnight() -> int:
+        now = time.localtime()
+        return max(1, 86400 - (now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec))
+
+
+class ClientRateLimiter:
+    """Per-key :class:`ClientLimit` built from ``client_limits`` in the
+    registry, falling back to ``client_limit_defaults``."""
+
+    def __init__(
+        self,
+        limits: dict[str, ClientLimitConfig],
+        defaults: ClientLimitConfig,
+        store: SharedStore | None = None,
+    ) -> None:
+        self._configs = limits
+        self._defaults = defaults
+        self._store = store
+        self._clients: dict[str, ClientLimit] = {}
+
+    def for_key(self, key: str) -> ClientLimit | None:
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        config = self._configs.get(key, self._defaults)
+        if not config.enabled:
+            return None
+        client = self._clients[key] = ClientLimit(
+            mask_key(key),
+            config,
+            store=self._store,
+            # Never write the raw key to disk.
+            store_key=hashlib.sha256(key.encode("utf-8")).hexdigest()[:16],
+        )
+        return client
+
+    def stats(self) -> dict[str, Any]:
+        return {client.label: client.stats() for client in self._clients.values()}
+
+
+def mask_key(key: str) -> str:
+    if not key:
+        return "<anonymous>"
+    return f"{key[:4]}...{key[-2:]}" if len(key) > 8 else "***"
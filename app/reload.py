@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from app.config import ConfigError, GatewayConfig, ReloadConfig
+from app.gateway import Gateway
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigReloader:
+    """Reloads the model registry into a running :class:`Gateway`.
+
+    A reload is triggered by SIGHUP or, when ``watch`` is on, by the file's
+    size or modification time changing (polled every
+    ``poll_interval_seconds``).  The file is read and validated on a worker
+    thread and handed to :meth:`Gateway.apply_config`; a config that fails to
+    load or build is logged and counted, and traffic keeps using the live
+    one.  Reloads never overlap; a trigger during one runs another after it.
+    """
+
+    def __init__(
+        self,
+        gateway: Gateway,
+        path: Path,
+        config: ReloadConfig,
+        loader: Callable[[], GatewayConfig],
+    ) -> None:
+        self.gateway = gateway
+        self.path = path
+        self.config = config
+        self.loader = loader
+        self._lock = asyncio.Lock()
+        self._pending: set[asyncio.Task[bool]] = set()
+        self._watch_task: asyncio.Task[None] | None = None
+        self._signal_installed = False
+        self._fingerprint = self._stat()
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: str | None = None
+        self.last_reload_at: float | None = None
+        self.last_changes: dict[str, list[str]] | None = None
+
+    async def start(self) -> None:
+        if self.config.watch and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+        if self.config.sighup and not self._signal_installed:
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self.trigger)
+                self._signal_installed = True
+            except (NotImplementedError, RuntimeError, ValueError, AttributeError):
+                # No SIGHUP on this platform, or not on the main thread.
+                logger.info("config_reload | SIGHUP handler not installed")
+
+    async def close(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        if self._signal_installed:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+            self._signal_installed = False
+        # Let triggered reloads finish: cancelling one could stop it halfway
+        # through applying a config.
+        while self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def trigger(self) -> None:
+        """Schedule a reload; safe to call from a signal handler."""
+        task = asyncio.get_running_loop().create_task(self.reload())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def reload(self) -> bool:
+        """Load the registry and apply it; returns whether it was applied."""
+        async with self._lock:
+            self._fingerprint = self._stat()
+            try:
+                config = await asyncio.to_thread(self.loader)
+                changes = self.gateway.apply_config(config)
+            except (ConfigError, ImportError, RuntimeError, ValueError) as exc:
+                self.failures += 1
+                self.last_error = str(exc)
+                logger.error("config_reload_failed | path=%s error=%s", self.path, exc)
+                return False
+            self.reloads += 1
+            self.last_error = None
+            self.last_reload_at = time.time()
+            self.last_changes = changes
+            logger.info(
+                "config_reload | added=%s kept=%s removed=%s",
+                ",".join(changes["added"]) or "-",
+                ",".join(changes["kept"]) or "-",
+                ",".join(changes["removed"]) or "-",
+            )
+            if changes["restart_required"]:
+                logger.warning(
+                    "config_reload | changed sections need a restart: %s",
+                    ", ".join(changes["restart_required"]),
+                )
+            return True
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_reload_at": self.last_reload_at,
+            "last_changes": self.last_changes,
+        }
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.poll_interval_seconds)
+            if self._stat() != self._fingerprint:
+                await self.reload()
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
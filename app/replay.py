@@ -0,0 +1,205 @@
+"""Replay traffic recorded by ``capture`` against a gateway.
+
+    python -m app.replay data/capture --target http://127.0.0.1:18080 --speed 2
+
+Requests are sent open-loop at their recorded arrival times, divided by
+``--speed``, so a slow target builds up concurrency the way production
+would.  Captured keys are masked, so every request uses ``--api-key``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.capture import FILE_PREFIX
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+@dataclass
+class Result:
+    status: int
+    seconds: float
+    ttft_seconds: float | None = None
+    error: str | None = None
+
+
+def load_records(paths: Iterable[str | Path]) -> list[dict[str, Any]]:
+    """Records from capture files and directories, oldest first."""
+    files: list[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        files.extend(sorted(path.glob(f"{FILE_PREFIX}*.jsonl")) if path.is_dir() else [path])
+    records = []
+    for file in files:
+        with file.open(encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record.get("request"), dict) and "ts" in record:
+                    records.append(record)
+    records.sort(key=lambda record: record["ts"])
+    return records
+
+
+def percentile(values: list[float], fraction: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(values: list[float]) -> dict[str, float | None]:
+    summary = {f"p{int(fraction * 100)}": percentile(values, fraction) for fraction in PERCENTILES}
+    summary["max"] = max(values) if values else None
+    return summary
+
+
+async def send(
+    client: httpx.AsyncClient,
+    record: dict[str, Any],
+    headers: dict[str, str],
+    priority_header: str,
+) -> Result:
+    request_headers = dict(headers)
+    if record.get("priority"):
+        request_headers[priority_header] = record["priority"]
+    started = time.monotonic()
+    ttft = None
+    try:
+        async with client.stream(
+            "POST", f"/v1{record['path']}", json=record["request"], headers=request_headers
+        ) as response:
+            async for chunk in response.aiter_bytes():
+                if ttft is None and b"data:" in chunk:
+                    ttft = time.monotonic() - started
+        return Result(response.status_code, time.monotonic() - started, ttft)
+    except httpx.HTTPError as exc:
+        return Result(0, time.monotonic() - started, error=type(exc).__name__)
+
+
+async def replay(
+    records: list[dict[str, Any]],
+    *,
+    target: str,
+    api_key: str,
+    speed: float = 1.0,
+    timeout: float = 300.0,
+    priority_header: str = "x-gateway-priority",
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> tuple[list[Result], float]:
+    """Send every record at its recorded offset divided by ``speed``.
+
+    Returns the results in record order and the wall time taken.
+    """
+    headers = {"authorization": f"Bearer {api_key}"} if api_key else {}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(
+        base_url=target, timeout=timeout, limits=limits, transport=transport
+    ) as client:
+        started = time.monotonic()
+        first_ts = records[0]["ts"] if records else 0.0
+
+        async def scheduled(record: dict[str, Any]) -> Result:
+            delay = started + (record["ts"] - first_ts) / speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return await send(client, record, headers, priority_header)
+
+        results = await asyncio.gather(*(scheduled(record) for record in records))
+        return list(results), time.monotonic() - started
+
+
+def report(records: list[dict[str, Any]], results: list[Result], elapsed: float) -> dict[str, Any]:
+    ok = [result for result in results if 0 < result.status < 400]
+    captured = [
+        record["timings_ms"]["total"] / 1000
+        for record in records
+        if isinstance(record.get("timings_ms"), dict) and "total" in record["timings_ms"]
+    ]
+    return {
+        "requests": len(results),
+        "seconds": round(elapsed, 3),
+        "rate_per_second": round(len(results) / elapsed, 2) if elapsed > 0 else None,
+        "statuses": dict(sorted(Counter(str(result.status) for result in results).items())),
+        "errors": dict(Counter(result.error for result in results if result.error)),
+        "latency_seconds": summarize([result.seconds for result in ok]),
+        "ttft_seconds": summarize([result.ttft_seconds for result in ok if result.ttft_seconds is not None]),
+        "captured_latency_seconds": summarize(captured),
+    }
+
+
+def format_report(summary: dict[str, Any]) -> str:
+    lines = [
+        f"requests   {summary['requests']} in {summary['seconds']}s ({summary['rate_per_second']}/s)",
+        f"statuses   {' '.join(f'{code}={count}' for code, count in summary['statuses'].items())}",
+    ]
+    if summary["errors"]:
+        lines.append(f"errors     {' '.join(f'{name}={count}' for name, count in summary['errors'].items())}")
+    for key, title in (
+        ("latency_seconds", "latency"),
+        ("ttft_seconds", "ttft"),
+        ("captured_latency_seconds", "captured"),
+    ):
+        values = summary[key]
+        if values["max"] is None:
+            continue
+        lines.append(
+            f"{title:<10} "
+            + " ".join(f"{name}={value * 1000:.0f}ms" for name, value in values.items())
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="capture files or directories")
+    parser.add_argument("--target", default="http://127.0.0.1:18080")
+    parser.add_argument("--api-key", default=os.getenv("GATEWAY_API_KEY", ""))
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="arrival rate multiplier (2 = twice as fast)"
+    )
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N records")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--priority-header", default="x-gateway-priority")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    records = load_records(args.paths)[: args.limit]
+    if not records:
+        sys.exit("No captured requests found.")
+    results, elapsed = asyncio.run(
+        replay(
+            records,
+            target=args.target,
+            api_key=args.api_key,
+            speed=args.speed,
+            timeout=args.timeout,
+            priority_header=args.priority_header,
+        )
+    )
+    summary = report(records, results, elapsed)
+    print(json.dumps(summary, indent=2) if args.json else format_report(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS deadlines (name TEXT PRIMARY KEY, until REAL NOT NULL);
+"""
+
+
+class SharedStoreBusy(RuntimeError):
+    """Another worker held the file lock for longer than the busy timeout."""
+
+
+class SharedStore:
+    """Counters that every worker process sees, in one local SQLite file.
+
+    Each operation is a single short ``BEGIN IMMEDIATE`` transaction, so
+    concurrent workers serialize on the file lock instead of losing updates.
+    Times are wall-clock (``time.time``) because monotonic clocks are not
+    comparable across processes.  Calls are synchronous: with WAL and
+    ``synchronous=OFF`` they take tens of microseconds, cheaper than handing
+    them to a thread.  They run on the event loop, so a lock held elsewhere
+    is waited for at most ``busy_timeout_seconds``; after that the call
+    raises :class:`SharedStoreBusy` and the caller falls back to its
+    worker-local state.
+    """
+
+    def __init__(self, path: str | Path, busy_timeout_seconds: float = 0.005) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.busy = 0
+        self._db = sqlite3.connect(
+            self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.executescript(_SCHEMA)
+        # Only setup may wait long; every later call gives up quickly.
+        self._db.execute(f"PRAGMA busy_timeout={max(0, int(busy_timeout_seconds * 1000))}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _busy(self, exc: sqlite3.OperationalError) -> SharedStoreBusy:
+        self.busy += 1
+        return SharedStoreBusy(f"shared state {self.path} is busy: {exc}")
+
+    def take(
+        self,
+        name: str,
+        capacity: float,
+        per_second: float,
+        amount: float,
+        *,
+        require: float | None = None,
+    ) -> tuple[bool, float]:
+        """Refill token bucket ``name`` and remove ``amount`` from it.
+
+        With ``require`` the withdrawal only happens while the balance is at
+        least ``require``; without it the bucket may go negative (debt).
+        Returns whether the withdrawal happened and the balance after it.
+        """
+        with self._lock:
+            try:
+                self._db.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as exc:
+                raise self._busy(exc) from exc
+            try:
+                now = time.time()
+                row = self._db.execute(
+                    "SELECT tokens, updated FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                tokens = capacity if row is None else min(
+                    capacity, row[0] + max(0.0, now - row[1]) * per_second
+                )
+                taken = require is None or tokens >= require
+                if taken:
+                    tokens -= amount
+                self._db.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    (name, tokens, now),
+                )
+                self._db.execute("COMMIT")
+            except BaseException as exc:
+                self._db.execute("ROLLBACK")
+                if isinstance(exc, sqlite3.OperationalError):
+                    raise self._busy(exc) from exc
+                raise
+        return taken, tokens
+
+    def add(self, name: str, amount: float) -> float:
+        row = self._execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value "
+            "RETURNING value",
+            (name, amount),
+        )
+        return row[0]
+
+    def get(self, name: str) -> float:
+        row = self._execute("SELECT value FROM counters WHERE name = ?", (name,))
+        return 0.0 if row is None else row[0]
+
+    def set_deadline(self, name: str, until: float) -> None:
+        self._execute(
+            "INSERT INTO deadlines (name, until) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET until = max(until, excluded.until)",
+            (name, until),
+        )
+
+    def deadline(self, name: str) -> float:
+        row = self._execute("SELECT until FROM deadlines WHERE name = ?", (name,))
+        return 0.0 if row is None else row[0]
+
+    def _execute(self, sql: str, params: tuple[object, ...]) -> tuple | None:
+        with self._lock:
+            try:
+                return self._db.execute(sql, params).fetchone()
+            except sqlite3.OperationalError as exc:
+                raise self._busy(exc) from exc
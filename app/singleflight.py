@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from starlette.responses import Response
+
+from app.config import SingleFlightConfig
+
+T = TypeVar("T")
+
+
+class SubscriberOverflowError(RuntimeError):
+    """A coalesced stream subscriber fell too far behind the upstream."""
+
+
+@dataclass
+class StreamSource:
+    status_code: int
+    media_type: str
+    headers: dict[str, str]
+    chunks: AsyncIterator[bytes] = field(repr=False)
+
+
+def clone_response(response: Response) -> Response:
+    """Copy a fully-buffered response so each waiter gets its own object."""
+    headers = {
+        key: value for key, value in response.headers.items() if key != "content-length"
+    }
+    return Response(
+        content=bytes(response.body),
+        status_code=response.status_code,
+        headers=headers,
+        media_type=response.media_type,
+    )
+
+
+class _Subscriber:
+    """Per-subscriber chunk buffer.
+
+    ``limit`` bounds only the live backlog: replayed history is already
+    bounded by ``join_window_bytes`` and does not count against it.
+    """
+
+    def __init__(self, limit: int, history: list[bytes]) -> None:
+        self._chunks: deque[bytes] = deque(history)
+        self._replay = len(history)
+        self._limit = limit
+        self._event = asyncio.Event()
+        self._finished = False
+        self.overflowed = False
+
+    def push(self, chunk: bytes) -> bool:
+        if len(self._chunks) - self._replay >= self._limit:
+            self.overflowed = True
+            self.finish()
+            return False
+        self._chunks.append(chunk)
+        self._event.set()
+        return True
+
+    def finish(self) -> None:
+        self._finished = True
+        self._event.set()
+
+    async def iterate(self) -> AsyncIterator[bytes]:
+        while True:
+            while self._chunks:
+                if self._replay:
+                    self._replay -= 1
+                yield self._chunks.popleft()
+            if self._finished:
+                if self.overflowed:
+                    raise SubscriberOverflowError("stream subscriber buffer overflowed")
+                return
+            self._event.clear()
+            await self._event.wait()
+
+
+class StreamFlight:
+    """One upstream stream teed to every attached subscriber.
+
+    Late joiners replay the chunks seen so far, so a flight only accepts new
+    subscribers while that history is within ``join_window_bytes``.
+    """
+
+    def __init__(self, config: SingleFlightConfig) -> None:
+        self._config = config
+        self._head: asyncio.Future[StreamSource | Response] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._subscribers: list[_Subscriber] = []
+        self._history: list[bytes] = []
+        self._history_bytes = 0
+        self._closed = False
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def joinable(self) -> bool:
+        return not self._closed and self._history_bytes <= self._config.join_window_bytes
+
+    def start(
+        self,
+        open_source: Callable[[], Awaitable[StreamSource | Response]],
+        on_finish: Callable[[], None],
+    ) -> None:
+        self._task = asyncio.ensure_future(self._pump(open_source))
+        self._task.add_done_callback(lambda _task: on_finish())
+
+    async def subscribe(self) -> StreamSource | Response:
+        subscriber = _Subscriber(self._config.subscriber_buffer_chunks, list(self._history))
+        self._subscribers.append(subscriber)
+        try:
+            head = await asyncio.shield(self._head)
+        except BaseException:
+            self._detach(subscriber)
+            raise
+        if isinstance(head, Response):
+            return clone_response(head)
+        return StreamSource(
+            status_code=head.status_code,
+            media_type=head.media_type,
+            headers=dict(head.headers),
+            chunks=self._iterate(subscriber),
+        )
+
+    async def _iterate(self, subscriber: _Subscriber) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in subscriber.iterate():
+                yield chunk
+        finally:
+            self._detach(subscriber)
+
+    def _detach(self, subscriber: _Subscriber) -> None:
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+        if not self._subscribers and self._task is not None and not self._task.done():
+            # Nobody is listening any more: stop paying for the upstream stream.
+            self._closed = True
+            self._task.cancel()
+
+    async def _pump(self, open_source: Callable[[], Awaitable[StreamSource | Response]]) -> None:
+        try:
+            source = await open_source()
+        except BaseException as exc:
+            self._closed = True
+            if not self._head.done():
+                self._head.set_exception(exc)
+                # Retrieved by subscribers; mark as seen so an unobserved
+                # failure does not log "exception was never retrieved".
+                self._head.exception()
+            for subscriber in list(self._subscribers):
+                subscriber.finish()
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            return
+        self._head.set_result(source)
+        if isinstance(source, Response):
+            self._closed = True
+            return
+        chunks = source.chunks
+        try:
+            async for chunk in chunks:
+                if self.joinable:
+                    self._history.append(chunk)
+                    self._history_bytes += len(chunk)
+                    if not self.joinable:
+                        self._history = []
+                for subscriber in list(self._subscribers):
+                    if not subscriber.push(chunk):
+                        self._subscribers.remove(subscriber)
+        finally:
+            self._closed = True
+            self._history = []
+            for subscriber in self._subscribers:
+                subscriber.finish()
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+class SingleFlight:
+    """Coalesces identical in-flight requests onto a single upstream call."""
+
+    def __init__(self, config: SingleFlightConfig) -> None:
+        self.config = config
+        self._calls: dict[str, asyncio.Task[Any]] = {}
+        self._streams: dict[str, StreamFlight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Run ``fn`` once per key; returns the result and whether it was shared."""
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget_call(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task), shared
+
+    async def stream(
+        self,
+        key: str,
+        open_source: Callable[[], Awaitable[StreamSource | Response]],
+    ) -> StreamSource | Response:
+        flight = self._streams.get(key)
+        if flight is not None and flight.joinable:
+            self.coalesced += 1
+            return await flight.subscribe()
+        self.leaders += 1
+        flight = StreamFlight(self.config)
+        self._streams[key] = flight
+        flight.start(open_source, lambda: self._forget_stream(key, flight))
+        return await flight.subscribe()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
+
+    def _forget_call(self, key: str, task: asyncio.Task[Any]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    def _forget_stream(self, key: str, flight: StreamFlight) -> None:
+        if self._streams.get(key) is flight:
+            del self._streams[key]
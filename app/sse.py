@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import codecs
+import json
+import time
+from typing import Any
+
+_PREVIEW_LIMIT = 4096
+
+
+class _ChoiceState:
+    __slots__ = (
+        "index",
+        "role",
+        "content",
+        "reasoning",
+        "tool_calls",
+        "logprobs",
+        "finish_reason",
+    )
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.role = "assistant"
+        self.content: list[str] = []
+        self.reasoning: list[str] = []
+        self.tool_calls: dict[int, dict[str, Any]] = {}
+        self.logprobs: list[Any] = []
+        self.finish_reason: str | None = None
+
+    def apply_delta(self, delta: dict[str, Any]) -> None:
+        role = delta.get("role")
+        if isinstance(role, str) and role:
+            self.role = role
+        content = delta.get("content")
+        if isinstance(content, str):
+            self.content.append(content)
+        reasoning = delta.get("reasoning_content")
+        if reasoning is None:
+            reasoning = delta.get("reasoning")
+        if isinstance(reasoning, str):
+            self.reasoning.append(reasoning)
+        tool_calls = delta.get("tool_calls")
+        if isinstance(tool_calls, list):
+            for fragment in tool_calls:
+                if isinstance(fragment, dict):
+                    self._apply_tool_call(fragment)
+
+    def _apply_tool_call(self, fragment: dict[str, Any]) -> None:
+        index = int(fragment.get("index", len(self.tool_calls)))
+        call = self.tool_calls.setdefault(
+            index,
+            {"id": None, "type": "function", "name": [], "arguments": []},
+        )
+        if fragment.get("id"):
+            call["id"] = fragment["id"]
+        if fragment.get("type"):
+            call["type"] = fragment["type"]
+        function = fragment.get("function")
+        if isinstance(function, dict):
+            name = function.get("name")
+            if isinstance(name, str):
+                call["name"].append(name)
+            arguments = function.get("arguments")
+            if isinstance(arguments, str):
+                call["arguments"].append(arguments)
+
+    def to_choice(self) -> dict[str, Any]:
+        message: dict[str, Any] = {"role": self.role, "content": "".join(self.content)}
+        if self.reasoning:
+            message["reasoning_content"] = "".join(self.reasoning)
+        if self.tool_calls:
+            message["tool_calls"] = [
+                {
+                    "id": call["id"] or f"call_{index}",
+                    "type": call["type"],
+                    "function": {
+                        "name": "".join(call["name"]),
+                        "arguments": "".join(call["arguments"]),
+                    },
+                }
+                for index, call in sorted(self.tool_calls.items())
+            ]
+            if not self.content:
+                message["content"] = None
+        choice: dict[str, Any] = {
+            "index": self.index,
+            "message": message,
+            "finish_reason": self.finish_reason
+            or ("tool_calls" if self.tool_calls else "stop"),
+        }
+        if self.logprobs:
+            choice["logprobs"] = {"content": self.logprobs}
+        return choice
+
+
+class ChatCompletionAggregator:
+    """Merges ``chat.completion.chunk`` SSE events into one ``chat.completion``.
+
+    Input is fed incrementally (bytes, text or whole lines); only the merged
+    per-choice state and a short preview of the raw body are kept.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial: list[str] = []
+        self._preview: list[str] = []
+        self._preview_size = 0
+        self._states: dict[int, _ChoiceState] = {}
+        self._chat_id: str | None = None
+        self._created: int | None = None
+        self._system_fingerprint: str | None = None
+        self._usage: dict[str, Any] | None = None
+        self.chunk_count = 0
+
+    @property
+    def preview(self) -> str:
+        return "".join(self._preview)
+
+    def feed_bytes(self, data: bytes) -> None:
+        self.feed(self._decoder.decode(data))
+
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        if self._preview_size < _PREVIEW_LIMIT:
+            piece = text[: _PREVIEW_LIMIT - self._preview_size]
+            self._preview.append(piece)
+            self._preview_size += len(piece)
+        lines = text.split("\n")
+        if len(lines) == 1:
+            self._partial.append(text)
+            return
+        self._partial.append(lines[0])
+        self.feed_line("".join(self._partial))
+        for line in lines[1:-1]:
+            self.feed_line(line)
+        self._partial = [lines[-1]] if lines[-1] else []
+
+    def close(self) -> None:
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self._partial.append(tail)
+        if self._partial:
+            self.feed_line("".join(self._partial))
+            self._partial = []
+
+    def feed_line(self, line: str) -> None:
+        stripped = line.strip()
+        if not stripped or not stripped[:5].lower() == "data:":
+            return
+        payload = stripped[5:].strip()
+        if not payload or payload == "[DONE]":
+            return
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            return
+        if isinstance(chunk, dict):
+            self.feed_chunk(chunk)
+
+    def feed_chunk(self, chunk: dict[str, Any]) -> None:
+        self.chunk_count += 1
+        if self._chat_id is None:
+            self._chat_id = str(chunk.get("id", f"chatcmpl-proxy-{int(time.time())}"))
+            self._created = int(chunk.get("created", int(time.time())))
+        fingerprint = chunk.get("system_fingerprint")
+        if fingerprint and self._system_fingerprint is None:
+            self._system_fingerprint = str(fingerprint)
+        usage = chunk.get("usage")
+        if isinstance(usage, dict):
+            self._usage = usage
+        for choice in chunk.get("choices") or []:
+            if not isinstance(choice, dict):
+                continue
+            index = int(choice.get("index", 0))
+            state = self._states.get(index)
+            if state is None:
+                state = self._states[index] = _ChoiceState(index)
+            delta = choice.get("delta")
+            if isinstance(delta, dict):
+                state.apply_delta(delta)
+            logprobs = choice.get("logprobs")
+            if isinstance(logprobs, dict) and isinstance(logprobs.get("content"), list):
+                state.logprobs.extend(logprobs["content"])
+            finish_reason = choice.get("finish_reason")
+            if finish_reason is not None:
+                state.finish_reason = finish_reason
+
+    def result(self, requested_model: str) -> dict[str, Any] | None:
+        self.close()
+        if not self._states:
+            return None
+        result: dict[str, Any] = {
+            "id": self._chat_id,
+            "object": "chat.completion",
+            "created": self._created,
+            "model": requested_model,
+            "choices": [self._states[index].to_choice() for index in sorted(self._states)],
+        }
+        if self._system_fingerprint is not None:
+            result["system_fingerprint"] = self._system_fingerprint
+        if self._usage is not None:
+            result["usage"] = self._usage
+        return result
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import time
+
+_DATA_PREFIX = b"data:"
+
+
+class RequestTimings:
+    """Where the time of one proxied request went.
+
+    ``queue`` (admission wait), ``auth`` (``request_spec``, i.e. signing) and
+    ``connect`` (new upstream connections) are summed over retry attempts;
+    ``headers`` is how long the final attempt waited for response headers
+    and ``sent`` the monotonic time that attempt went out.
+    Everything from ``ttft`` on is measured on the bytes relayed to the
+    client: ``ttft`` is request arrival to the first SSE ``data:`` chunk,
+    ``gaps`` the pauses between chunks after it, ``total`` arrival to the
+    last byte.  Phases that did not happen (cache hit, coalesced follower,
+    non-stream response) stay ``None`` and are left out of the output.
+    """
+
+    __slots__ = (
+        "start",
+        "queue",
+        "auth",
+        "connect",
+        "headers",
+        "sent",
+        "attempts",
+        "ttft",
+        "gaps",
+        "total",
+        "_last_chunk",
+    )
+
+    def __init__(self, start: float | None = None) -> None:
+        self.start = time.monotonic() if start is None else start
+        self.queue: float | None = None
+        self.auth: float | None = None
+        self.connect: float | None = None
+        self.headers: float | None = None
+        self.sent = self.start
+        self.attempts = 0
+        self.ttft: float | None = None
+        self.gaps: list[float] = []
+        self.total: float | None = None
+        self._last_chunk: float | None = None
+
+    def add(self, phase: str, seconds: float) -> None:
+        current = getattr(self, phase)
+        setattr(self, phase, seconds if current is None else current + seconds)
+
+    def chunk(self, data: bytes, now: float) -> None:
+        """Record one relayed SSE chunk."""
+        if self._last_chunk is not None:
+            self.gaps.append(now - self._last_chunk)
+            self._last_chunk = now
+        elif _DATA_PREFIX in data:
+            self.ttft = now - self.start
+            self._last_chunk = now
+
+    def finish(self, now: float | None = None) -> None:
+        self.total = (time.monotonic() if now is None else now) - self.start
+
+    def phases(self) -> list[tuple[str, float]]:
+        """``(name, seconds)`` for every phase that happened, in order."""
+        phases = [
+            (name, value)
+            for name, value in (
+                ("queue", self.queue),
+                ("auth", self.auth),
+                ("connect", self.connect),
+                ("headers", self.headers),
+                ("ttft", self.ttft),
+            )
+            if value is not None
+        ]
+        if self.gaps:
+            ordered = sorted(self.gaps)
+            for name, fraction in (("gap-p50", 0.5), ("gap-p99", 0.99)):
+                phases.append((name, ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]))
+            phases.append(("gap-max", ordered[-1]))
+        if self.total is not None:
+            phases.append(("total", self.total))
+        return phases
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value, durations in milliseconds."""
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases())
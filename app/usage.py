@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+_USAGE_KEY = b'"usage"'
+_DECODER = json.JSONDecoder()
+
+# Usage is the last object in a JSON body and sits in the final chunks of an
+# SSE stream, so only this many trailing bytes are kept.
+TAIL_BYTES = 8192
+
+
+def extract_usage(tail: bytes) -> dict[str, Any] | None:
+    """Find the last non-null ``"usage": {...}`` object in ``tail``.
+
+    Works on the end of a JSON body and of an SSE stream alike, without
+    parsing anything but the usage object itself.
+    """
+    end = len(tail)
+    while True:
+        index = tail.rfind(_USAGE_KEY, 0, end)
+        if index < 0:
+            return None
+        end = index
+        rest = tail[index + len(_USAGE_KEY):].lstrip()
+        if not rest.startswith(b":"):
+            continue
+        try:
+            value, _ = _DECODER.raw_decode(rest[1:].lstrip().decode("utf-8", errors="replace"))
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            return value
+
+
+def token_counts(usage: dict[str, Any]) -> tuple[int, int]:
+    """``(prompt, completion)`` tokens, for Chat Completions and Responses
+    field names alike."""
+    counts = []
+    for keys in (("prompt_tokens", "input_tokens"), ("completion_tokens", "output_tokens")):
+        count = 0
+        for key in keys:
+            value = usage.get(key)
+            if isinstance(value, int):
+                count = value
+                break
+        counts.append(count)
+    return counts[0], counts[1]
+
+
+def total_tokens(usage: dict[str, Any] | None) -> int:
+    if not usage:
+        return 0
+    total = usage.get("total_tokens")
+    if isinstance(total, int):
+        return total
+    count = 0
+    for key in ("prompt_tokens", "completion_tokens", "input_tokens", "output_tokens"):
+        value = usage.get(key)
+        if isinstance(value, int):
+            count += value
+    return count
@@ -0,0 +1,166 @@
+"""Microbenchmark harness for gateway hot paths.
+
+Skipped unless ``GATEWAY_BENCH=1``.  Each benchmark records ops/sec and the
+peak bytes allocated by one call (``tracemalloc``), and fails when it is
+slower or allocates more than ``baseline.json`` allows.  Ops/sec is gated
+relative to a fixed reference workload timed in alternating rounds, so a
+baseline recorded on one machine still gates on another.
+
+    GATEWAY_BENCH=1 python -m pytest tests/benchmarks
+    GATEWAY_BENCH=1 GATEWAY_BENCH_UPDATE=1 python -m pytest tests/benchmarks   # rewrite the baseline
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+BASELINE = Path(__file__).with_name("baseline.json")
+ENABLED = os.getenv("GATEWAY_BENCH", "") == "1"
+UPDATE = os.getenv("GATEWAY_BENCH_UPDATE", "") == "1"
+# Allowed relative slowdown and allocation growth before a benchmark fails.
+SPEED_THRESHOLD = float(os.getenv("GATEWAY_BENCH_THRESHOLD", "0.30"))
+ALLOC_THRESHOLD = float(os.getenv("GATEWAY_BENCH_ALLOC_THRESHOLD", "0.10"))
+# Absolute slack for allocation noise (interned strings, freelists).
+ALLOC_SLACK_BYTES = 4096
+
+ROUNDS = 10
+MIN_ROUND_SECONDS = 0.05
+
+_REFERENCE = {"id": "chatcmpl-1", "choices": [{"index": 0, "delta": {"content": "x" * 64}}] * 4}
+
+
+@dataclass
+class Measurement:
+    name: str
+    ops_per_second: float
+    relative_speed: float
+    alloc_peak_bytes: int
+
+
+def _time_batch(batch: Callable[[int], None], number: int) -> float:
+    started = time.perf_counter()
+    batch(number)
+    return time.perf_counter() - started
+
+
+def _reference_batch(number: int) -> None:
+    for _ in range(number):
+        json.loads(json.dumps(_REFERENCE))
+
+
+def _round_size(batch: Callable[[int], None]) -> int:
+    batch(1)
+    number = 1
+    while _time_batch(batch, number) < MIN_ROUND_SECONDS:
+        number *= 2
+    return number
+
+
+def _ops_per_second(batch: Callable[[int], None]) -> tuple[float, float]:
+    """Best ops/sec of ``batch`` and of the reference workload over
+    ``ROUNDS`` interleaved rounds, so both see the same machine load."""
+    number = _round_size(batch)
+    reference = _round_size(_reference_batch)
+    best = best_reference = float("inf")
+    for _ in range(ROUNDS):
+        best_reference = min(best_reference, _time_batch(_reference_batch, reference))
+        best = min(best, _time_batch(batch, number))
+    return number / best, reference / best_reference
+
+
+def _alloc_peak_bytes(batch: Callable[[int], None]) -> int:
+    tracemalloc.start()
+    try:
+        batch(1)
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        batch(1)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(0, peak - before)
+
+
+class Bench:
+    def __init__(self, baseline: dict[str, Any], results: dict[str, Measurement]) -> None:
+        self.baseline = baseline
+        self.results = results
+
+    def run(self, name: str, batch: Callable[[int], None]) -> Measurement:
+        """Measure ``batch(n)``, which performs the operation ``n`` times, and
+        compare it with the stored baseline."""
+        ops, reference = _ops_per_second(batch)
+        measurement = Measurement(name, ops, ops / reference, _alloc_peak_bytes(batch))
+        self.results[name] = measurement
+        if UPDATE:
+            return measurement
+        stored = self.baseline.get("benchmarks", {}).get(name)
+        if stored is None:
+            return measurement
+        floor = stored["relative_speed"] * (1 - SPEED_THRESHOLD)
+        assert measurement.relative_speed >= floor, (
+            f"{name}: {measurement.ops_per_second:,.0f} ops/s is "
+            f"{1 - measurement.relative_speed / stored['relative_speed']:.0%} slower than the baseline"
+        )
+        if self.baseline.get("python") == list(platform.python_version_tuple()[:2]):
+            ceiling = stored["alloc_peak_bytes"] * (1 + ALLOC_THRESHOLD) + ALLOC_SLACK_BYTES
+            assert measurement.alloc_peak_bytes <= ceiling, (
+                f"{name}: peak allocation {measurement.alloc_peak_bytes:,} B exceeds "
+                f"the baseline {stored['alloc_peak_bytes']:,} B"
+            )
+        return measurement
+
+
+_results: dict[str, Measurement] = {}
+_bench: Bench | None = None
+
+
+@pytest.fixture
+def bench() -> Bench:
+    global _bench
+    if not ENABLED:
+        pytest.skip("set GATEWAY_BENCH=1 to run benchmarks")
+    if _bench is None:
+        baseline = json.loads(BASELINE.read_text(encoding="utf-8")) if BASELINE.exists() else {}
+        _bench = Bench(baseline, _results)
+    return _bench
+
+
+def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
+    if not (UPDATE and _results):
+        return
+    baseline = json.loads(BASELINE.read_text(encoding="utf-8")) if BASELINE.exists() else {}
+    benchmarks = baseline.get("benchmarks", {})
+    for name, measurement in _results.items():
+        entry = asdict(measurement)
+        del entry["name"]
+        entry["ops_per_second"] = round(entry["ops_per_second"], 1)
+        entry["relative_speed"] = float(f"{entry['relative_speed']:.6g}")
+        benchmarks[name] = entry
+    baseline = {
+        "python": list(platform.python_version_tuple()[:2]),
+        "benchmarks": dict(sorted(benchmarks.items())),
+    }
+    BASELINE.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+
+
+def pytest_terminal_summary(terminalreporter: Any) -> None:
+    if not _results:
+        return
+    terminalreporter.section("gateway benchmarks")
+    for name, measurement in sorted(_results.items()):
+        terminalreporter.write_line(
+            f"{name:<36}{measurement.ops_per_second:>14,.1f} ops/s"
+            f"{measurement.relative_speed:>12.4f} rel"
+            f"{measurement.alloc_peak_bytes:>14,} B peak"
+        )
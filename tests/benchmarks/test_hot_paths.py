@@ -0,0 +1,174 @@
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import pytest
+
+from app.auth.strategies import AuthContext, NoAuth, QwenSignatureAuth
+from app.body import ModelFieldRewriter, RequestBody
+from app.gateway import Gateway
+from app.providers.base import Provider
+from custom_resolvers import get_api_key
+
+SSE_CHUNKS = 10_000
+PROMPT_BYTES = 200 * 1024
+STREAM_CHUNK_BYTES = 16 * 1024
+
+
+def _sse_body(chunks: int) -> str:
+    base = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 1, "model": "qwen3_coder"}
+    lines = [
+        json.dumps({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}}]})
+    ]
+    for index in range(chunks):
+        delta = {"content": f"token{index % 97} "}
+        lines.append(json.dumps({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}))
+    lines.append(
+        json.dumps(
+            {
+                **base,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 51200, "completion_tokens": chunks, "total_tokens": 51200 + chunks},
+            }
+        )
+    )
+    return "".join(f"data: {line}\n\n" for line in lines) + "data: [DONE]\n\n"
+
+
+def _request_bytes() -> bytes:
+    # Realistic coding-agent request: a long system prompt plus file contents.
+    filler = "def handler(request):\n    return {'status': 'ok', \"body\": request.body}\n"
+    content = (filler * (PROMPT_BYTES // len(filler) + 1))[:PROMPT_BYTES]
+    payload = {
+        "model": "juzhi_qwen3_coder",
+        "messages": [
+            {"role": "system", "content": "You are a careful senior engineer."},
+            {"role": "user", "content": content},
+        ],
+        "temperature": 0.1,
+        "max_tokens": 4096,
+        "stream": True,
+    }
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _sync_batch(operation: Callable[[], Any]) -> Callable[[int], None]:
+    def batch(number: int) -> None:
+        for _ in range(number):
+            operation()
+
+    return batch
+
+
+def _async_batch(operation: Callable[[], Awaitable[Any]]) -> Callable[[int], None]:
+    loop = asyncio.new_event_loop()
+
+    async def many(number: int) -> None:
+        for _ in range(number):
+            await operation()
+
+    def batch(number: int) -> None:
+        loop.run_until_complete(many(number))
+
+    return batch
+
+
+@pytest.fixture(scope="module")
+def sse_body() -> str:
+    return _sse_body(SSE_CHUNKS)
+
+
+@pytest.fixture(scope="module")
+def request_bytes() -> bytes:
+    return _request_bytes()
+
+
+def test_merge_sse_chunks_10k(bench, sse_body: str) -> None:
+    merged = Gateway._merge_sse_chunks_to_chat_completion(raw_text=sse_body, requested_model="m")
+    assert merged is not None and merged["usage"]["completion_tokens"] == SSE_CHUNKS
+    bench.run(
+        "merge_sse_chunks_10k",
+        _sync_batch(lambda: Gateway._merge_sse_chunks_to_chat_completion(raw_text=sse_body, requested_model="m")),
+    )
+
+
+def test_qwen_signature_headers(bench) -> None:
+    auth = QwenSignatureAuth(appid="deepinsi", appkey="secret")
+    context = AuthContext(provider_id="panzhi", upstream_model="qwen3_coder")
+    bench.run("qwen_signature_headers", _async_batch(lambda: auth.headers(context)))
+
+
+def test_custom_resolvers_get_api_key(bench, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("INTERNAL_API_KEY_OVERRIDE", raising=False)
+    bench.run(
+        "custom_resolvers_get_api_key",
+        _sync_batch(
+            lambda: get_api_key(
+                request_url="https://juzhi.example.local/openapi/flames/api/v1/openai/chat",
+                api_key="api-id",
+                api_secret="api-secret",
+                model_id="qwen3_coder",
+                model_source="private",
+                trace_id="trace-1",
+            )
+        ),
+    )
+
+
+def test_provider_request_spec(bench) -> None:
+    provider = Provider(
+        provider_id="juzhi",
+        base_url="https://juzhi.example.local/openapi/flames/api/v1/openai/chat",
+        auth_strategy=NoAuth(),
+        path_overrides={"/chat/completions": ""},
+    )
+    bench.run(
+        "provider_request_spec",
+        _async_batch(lambda: provider.request_spec("/chat/completions", "qwen3_coder")),
+    )
+
+
+def test_provider_resolve_url(bench) -> None:
+    provider = Provider(
+        provider_id="panzhi",
+        base_url="https://panzhi.example.local/v1/",
+        auth_strategy=NoAuth(),
+        path_overrides={"/responses": "/v2/responses"},
+    )
+    paths = ("/chat/completions", "/responses")
+    bench.run(
+        "provider_resolve_url",
+        _sync_batch(lambda: [provider._resolve_url(path) for path in paths]),
+    )
+
+
+def test_extract_bearer_token(bench) -> None:
+    headers = ("Bearer local-proxy-key", "bearer  sk-0123456789abcdef ", "raw-key", "")
+    bench.run(
+        "extract_bearer_token",
+        _sync_batch(lambda: [Gateway._extract_bearer_token(header) for header in headers]),
+    )
+
+
+def test_request_body_200kb(bench, request_bytes: bytes) -> None:
+    def handle() -> bytes:
+        body = RequestBody.from_bytes(request_bytes)
+        assert body.stream
+        return body.forwarded("qwen3_coder", default_stream=False)
+
+    assert b'"qwen3_coder"' in handle()
+    bench.run("request_body_200kb", _sync_batch(handle))
+
+
+def test_model_field_rewriter_200kb(bench, request_bytes: bytes) -> None:
+    chunks = [
+        request_bytes[start : start + STREAM_CHUNK_BYTES]
+        for start in range(0, len(request_bytes), STREAM_CHUNK_BYTES)
+    ]
+
+    def rewrite() -> int:
+        rewriter = ModelFieldRewriter("qwen3_coder")
+        return sum(len(rewriter.feed(chunk)) for chunk in chunks)
+
+    bench.run("model_field_rewriter_200kb", _sync_batch(rewrite))
@@ -0,0 +1,36 @@
+from collections.abc import Callable
+from typing import Any
+
+import httpx
+import pytest
+
+from app.config import GatewayConfig
+from app.gateway import Gateway
+
+
+@pytest.fixture
+def mock_gateway() -> Callable[..., Gateway]:
+    """Builds a Gateway with one provider ``p`` serving alias ``m`` (upstream
+    model ``upstream``), answered by ``handler`` through ``httpx.MockTransport``.
+
+    ``provider`` entries are merged into the provider config and any other
+    keyword becomes a top-level registry field.
+    """
+
+    def build(handler: Callable[..., Any], *, provider: dict | None = None, **registry: Any) -> Gateway:
+        config = GatewayConfig.model_validate(
+            {
+                **registry,
+                "providers": [
+                    {
+                        "id": "p",
+                        "base_url": "http://example.local",
+                        "models": [{"alias": "m", "upstream_model": "upstream"}],
+                        **(provider or {}),
+                    }
+                ],
+            }
+        )
+        return Gateway(config, transport=httpx.MockTransport(handler))
+
+    return build
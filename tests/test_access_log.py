@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.accesslog import AccessLog
+from app.config import AccessLogConfig
+
+
+def test_access_log_writes_one_json_line_per_request(mock_gateway, tmp_path) -> None:
+    path = tmp_path / "logs" / "access.jsonl"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json={"model": "upstream", "usage": {"prompt_tokens": 3, "completion_tokens": 2}},
+        )
+
+    async def run() -> None:
+        gateway = mock_gateway(
+            handler,
+            json_passthrough=True,
+            client_api_keys=["alpha-key-0001"],
+            access_log={"enabled": True, "path": str(path)},
+        )
+        await gateway.start()
+        try:
+            headers = {"authorization": "Bearer alpha-key-0001"}
+            response = await gateway.proxy("/chat/completions", {"model": "m"}, headers=headers)
+            async for _chunk in response.body_iterator:
+                pass
+            with pytest.raises(HTTPException):
+                await gateway.proxy("/chat/completions", {"model": "nope"}, headers=headers)
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
+    ok, failed = [json.loads(line) for line in path.read_text().splitlines()]
+    assert ok["client"] == "alph...01"
+    assert (ok["model"], ok["provider"], ok["status"]) == ("m", "p", 200)
+    assert ok["usage"] == {"prompt_tokens": 3, "completion_tokens": 2}
+    assert ok["bytes"] > 0 and "total" in ok["timings_ms"]
+    assert (failed["status"], failed["provider"]) == (400, "")
+    assert "nope" in failed["error"]
+
+
+def test_full_queue_drops_instead_of_blocking() -> None:
+    log = AccessLog(AccessLogConfig(queue_size=2))
+    for _ in range(5):
+        log.log({"status": 200})
+    assert log.stats() == {"logged": 2, "sampled_out": 0, "dropped": 3, "queued": 2}
+    log.close()
+
+
+def test_sampling_keeps_every_failure() -> None:
+    log = AccessLog(AccessLogConfig(sample_rate=1e-9))
+    for status in (200, 200, 502):
+        log.log({"status": status})
+    stats = log.stats()
+    assert (stats["logged"], stats["sampled_out"]) == (1, 2)
+    log.close()
@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+
+from app.config import AdaptiveConcurrencyConfig, ConcurrencyConfig
+from app.providers.admission import AdmissionQueue
+from app.providers.limiter import AdaptiveLimiter
+
+
+def _limiter(**overrides) -> AdaptiveLimiter:
+    config = AdaptiveConcurrencyConfig(**{"enabled": True, "initial_limit": 10, **overrides})
+    queue = AdmissionQueue("test", ConcurrencyConfig(), limit=config.initial_limit)
+    return AdaptiveLimiter("p", config, queue)
+
+
+def test_aimd_grows_only_while_saturated_and_backs_off_on_errors() -> None:
+    limiter = _limiter(algorithm="aimd", backoff_ratio=0.5)
+    for _ in range(50):
+        limiter.record(True, 0.1)
+    assert limiter.stats()["limit"] == 10  # idle: no growth
+
+    limiter.queue.in_flight = 10
+    for _ in range(30):
+        limiter.record(True, 0.1)
+    assert limiter.stats()["limit"] == 12
+    assert limiter.queue.limit == 12
+
+    limiter.record(False, 0.1)
+    assert limiter.queue.limit == 6
+    limiter.record(False, 0.1)  # same latency interval: counted once
+    assert limiter.queue.limit == 6
+    assert limiter.stats()["decreases"] == 1
+
+
+def test_aimd_treats_latency_above_tolerance_as_congestion() -> None:
+    limiter = _limiter(algorithm="aimd", latency_tolerance=2.0, backoff_ratio=0.5)
+    limiter.record(True, 0.1)
+    limiter.record(True, 0.15)
+    assert limiter.queue.limit == 10
+    limiter.record(True, 0.5)
+    assert limiter.queue.limit == 5
+
+
+def test_gradient_shrinks_with_latency_and_respects_bounds() -> None:
+    limiter = _limiter(algorithm="gradient", min_limit=4, max_limit=20)
+    limiter.queue.in_flight = 10
+    for _ in range(40):
+        limiter.record(True, 0.1)
+    assert limiter.queue.limit == 20
+
+    limiter.queue.in_flight = 0
+    for _ in range(40):
+        limiter.record(True, 1.0)
+    assert limiter.queue.limit == 4
+    assert limiter.stats()["changes"] > 2
+
+
+def test_gateway_lowers_provider_limit_on_upstream_throttling(mock_gateway) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(429, json={"error": {"message": "slow down"}})
+
+    async def run() -> dict:
+        gateway = mock_gateway(
+            handler,
+            json_passthrough=True,
+            provider={
+                "adaptive_concurrency": {"enabled": True, "algorithm": "aimd", "initial_limit": 8},
+                "retry": {"enabled": False},
+            },
+        )
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m"})
+            assert response.status_code == 429
+            async for _chunk in response.body_iterator:
+                pass
+            return gateway.health()["providers"]["p"]
+        finally:
+            await gateway.close()
+
+    health = asyncio.run(run())
+    assert health["adaptive_concurrency"]["limit"] == 7
+    assert health["admission"]["limit"] == 7
+    assert health["admission"]["in_flight"] == 0
+
+
+def test_gateway_feeds_stream_first_token_latency_to_limiter(mock_gateway) -> None:
+    async def body():
+        yield b": keep-alive\n\n"
+        await asyncio.sleep(0.05)
+        yield b'data: {"choices": []}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+
+    async def run() -> dict:
+        gateway = mock_gateway(handler, provider={"adaptive_concurrency": {"enabled": True}})
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m", "stream": True})
+            async for _chunk in response.body_iterator:
+                pass
+            return gateway.health()["providers"]["p"]["adaptive_concurrency"]
+        finally:
+            await gateway.close()
+
+    assert asyncio.run(run())["baseline_seconds"] >= 0.05
@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.config import ConcurrencyConfig
+from app.providers.admission import AdmissionQueue, AdmissionRejected
+
+
+def _queue(**overrides) -> AdmissionQueue:
+    return AdmissionQueue("test", ConcurrencyConfig(**{"max_in_flight": 1, **overrides}))
+
+
+def test_queue_hands_released_slot_to_oldest_waiter() -> None:
+    async def run() -> list[str]:
+        queue = _queue()
+        order: list[str] = []
+        await queue.acquire(time.monotonic() + 1)
+
+        async def wait(name: str) -> None:
+            await queue.acquire(time.monotonic() + 1)
+            order.append(name)
+
+        waiters = [asyncio.create_task(wait(name)) for name in ("a", "b")]
+        await asyncio.sleep(0)
+        assert queue.queue_depth == 2
+        queue.release()
+        await asyncio.sleep(0)
+        queue.release()
+        await asyncio.gather(*waiters)
+        assert queue.in_flight == 1
+        assert queue.stats()["admitted"] == 3
+        return order
+
+    assert asyncio.run(run()) == ["a", "b"]
+
+
+def test_queue_rejects_when_full_and_on_deadline() -> None:
+    async def run() -> None:
+        queue = _queue(max_queue=1, max_wait_seconds=5)
+        await queue.acquire(time.monotonic() + 1)
+        waiter = asyncio.create_task(queue.acquire(time.monotonic() + 0.02))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as full:
+            await queue.acquire(time.monotonic() + 1)
+        assert full.value.status_code == 429
+        with pytest.raises(AdmissionRejected) as late:
+            await waiter
+        assert late.value.status_code == 503
+        assert late.value.retry_after_header == "5"
+        assert queue.queue_depth == 0
+        queue.release()
+        assert queue.in_flight == 0
+        stats = queue.stats()
+        assert stats["rejected_queue_full"] == 1
+        assert stats["rejected_timeout"] == 1
+
+    asyncio.run(run())
+
+
+def test_gateway_limits_provider_in_flight_and_rejects_overflow(mock_gateway) -> None:
+    release = asyncio.Event()
+    active = peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await release.wait()
+        active -= 1
+        return httpx.Response(200, json={"model": "upstream", "choices": []})
+
+    async def attempt(gateway) -> int:
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m"})
+        except HTTPException as exc:
+            assert exc.headers == {"Retry-After": "1"}
+            return exc.status_code
+        async for _chunk in response.body_iterator:
+            pass
+        return response.status_code
+
+    async def run() -> list[int]:
+        gateway = mock_gateway(
+            handler,
+            json_passthrough=True,
+            provider={"concurrency": {"max_in_flight": 2, "max_queue": 1, "max_wait_seconds": 1}},
+        )
+        try:
+            tasks = [asyncio.create_task(attempt(gateway)) for _ in range(4)]
+            for _ in range(5):
+                await asyncio.sleep(0)
+            admission = gateway.health()["providers"]["p"]["admission"]
+            assert admission["in_flight"] == 2
+            assert admission["queue_depth"] == 1
+            release.set()
+            statuses = await asyncio.gather(*tasks)
+            assert gateway.health()["providers"]["p"]["admission"]["in_flight"] == 0
+            return statuses
+        finally:
+            await gateway.close()
+
+    assert sorted(asyncio.run(run())) == [200, 200, 200, 429]
+    assert peak == 2
+
+
+def test_gateway_alias_limit_covers_streams_until_closed(mock_gateway) -> None:
+    async def sse_body():
+        yield b'data: {"choices":[]}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=sse_body()
+        )
+
+    async def run() -> None:
+        gateway = mock_gateway(
+            handler,
+            json_passthrough=True,
+            provider={
+                "models": [
+                    {
+                        "alias": "m",
+                        "upstream_model": "upstream",
+                        "concurrency": {"max_in_flight": 1, "max_wait_seconds": 0.02},
+                    }
+                ]
+            },
+        )
+        try:
+            first = await gateway.proxy("/chat/completions", {"model": "m", "stream": True})
+            with pytest.raises(HTTPException) as excinfo:
+                await gateway.proxy("/chat/completions", {"model": "m", "stream": True})
+            assert excinfo.value.status_code == 503
+            async for _chunk in first.body_iterator:
+                pass
+            stats = gateway.health()["aliases"]["m"]["admission"]
+            assert stats["in_flight"] == 0
+            assert stats["rejected_timeout"] == 1
+            second = await gateway.proxy("/chat/completions", {"model": "m", "stream": True})
+            async for _chunk in second.body_iterator:
+                pass
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.capture import TrafficCapture
+from app.config import CaptureConfig
+from app.replay import load_records, replay, report
+
+
+def test_capture_records_sampled_traffic_and_replays_it(mock_gateway, tmp_path) -> None:
+    capture_dir = tmp_path / "capture"
+
+    async def sse_body():
+        yield b'data: {"choices":[{"delta":{"content":"hi"}}]}\n\n'
+        yield b'data: {"choices":[],"usage":{"prompt_tokens":2,"completion_tokens":1}}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if b'"stream":true' in request.content.replace(b" ", b""):
+            return httpx.Response(
+                200, headers={"content-type": "text/event-stream"}, content=sse_body()
+            )
+        return httpx.Response(200, json={"model": "upstream", "choices": []})
+
+    async def run() -> None:
+        gateway = mock_gateway(
+            handler,
+            json_passthrough=True,
+            capture={"enabled": True, "dir": str(capture_dir), "include_bodies": True},
+        )
+        await gateway.start()
+        try:
+            response = await gateway.proxy(
+                "/chat/completions",
+                {"model": "m", "stream": True},
+                headers={"x-gateway-priority": "batch"},
+            )
+            async for _chunk in response.body_iterator:
+                pass
+            response = await gateway.proxy("/chat/completions", {"model": "m"})
+            async for _chunk in response.body_iterator:
+                pass
+            with pytest.raises(HTTPException):
+                await gateway.proxy("/chat/completions", {"model": "nope"})
+            # Buffered until the background flush or close.
+            assert not list(capture_dir.glob("*.jsonl"))
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
+    records = load_records([capture_dir])
+    assert [record["status"] for record in records] == [200, 200, 400]
+    stream, plain, failed = records
+    assert stream["request"] == {"model": "m", "stream": True}
+    assert stream["priority"] == "batch"
+    assert stream["usage"] == {"prompt_tokens": 2, "completion_tokens": 1}
+    assert stream["response"].endswith("data: [DONE]\n\n")
+    assert "ttft" in stream["timings_ms"] and "total" in stream["timings_ms"]
+    assert json.loads(plain["response"])["model"] == "m"
+    assert failed["request"]["model"] == "nope" and "nope" in failed["error"]
+
+    seen: list[tuple[str, str | None]] = []
+
+    async def target(request: httpx.Request) -> httpx.Response:
+        seen.append((request.url.path, request.headers.get("x-gateway-priority")))
+        return httpx.Response(200, json={})
+
+    for index, record in enumerate(records):
+        record["ts"] = 1000.0 + index * 0.1
+    results, elapsed = asyncio.run(
+        replay(
+            records,
+            target="http://gateway.local",
+            api_key="k",
+            speed=2.0,
+            transport=httpx.MockTransport(target),
+        )
+    )
+    assert seen[0] == ("/v1/chat/completions", "batch")
+    assert elapsed >= 0.1
+    summary = report(records, results, elapsed)
+    assert summary["requests"] == 3
+    assert summary["statuses"] == {"200": 3}
+    assert summary["latency_seconds"]["p50"] is not None
+
+
+def test_capture_rotates_and_keeps_max_files(tmp_path) -> None:
+    async def run() -> None:
+        capture = TrafficCapture(
+            CaptureConfig(enabled=True, dir=str(tmp_path), max_file_bytes=10, max_files=2)
+        )
+        for index in range(4):
+            capture.record({"ts": index, "request": {}})
+            await capture.flush()
+        await capture.close()
+
+    asyncio.run(run())
+    assert [record["ts"] for record in load_records([tmp_path])] == [2, 3]
@@ -0,0 +1,193 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.auth.strategies import AuthContext, AuthStrategy, NoAuth
+from app.config import CircuitBreakerConfig
+from app.gateway import Gateway
+from app.providers import circuit
+from app.providers.base import Provider
+from app.providers.circuit import CircuitBreaker
+from app.providers.router import ModelRouter
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    fake = _Clock()
+    monkeypatch.setattr(circuit.time, "monotonic", fake)
+    return fake
+
+
+def test_breaker_opens_on_consecutive_failures_and_recovers(clock) -> None:
+    breaker = CircuitBreaker(CircuitBreakerConfig(consecutive_failures=3, open_seconds=10))
+    for _ in range(2):
+        breaker.record(False)
+    breaker.record(True)
+    for _ in range(3):
+        breaker.record(False)
+    assert breaker.state == circuit.OPEN
+    assert breaker.retry_after() == pytest.approx(10)
+
+    assert breaker.try_acquire() is None
+
+    clock.now += 10
+    claim = breaker.try_acquire()
+    assert claim is not None
+    assert breaker.state == circuit.HALF_OPEN
+    assert breaker.try_acquire() is None  # only one probe at a time
+    breaker.record(True)
+    breaker.release(claim)
+    assert breaker.state == circuit.CLOSED
+    assert breaker.try_acquire() is not None
+
+
+def test_breaker_failed_probe_doubles_cooldown(clock) -> None:
+    breaker = CircuitBreaker(
+        CircuitBreakerConfig(consecutive_failures=1, open_seconds=5, max_open_seconds=8)
+    )
+    breaker.record(False)
+    clock.now += 5
+    assert breaker.try_acquire() is not None
+    breaker.record(False)
+    assert breaker.retry_after() == pytest.approx(8)
+    assert breaker.stats()["trips"] == 2
+
+
+def test_unused_probe_claim_is_released(clock) -> None:
+    breaker = CircuitBreaker(CircuitBreakerConfig(consecutive_failures=1, open_seconds=5))
+    breaker.record(False)
+    clock.now += 5
+    claim = breaker.try_acquire()
+    assert breaker.try_acquire() is None
+    breaker.release(claim)
+    assert breaker.try_acquire() is not None
+
+
+def test_breaker_opens_on_error_rate_and_slow_calls(clock) -> None:
+    breaker = CircuitBreaker(
+        CircuitBreakerConfig(
+            consecutive_failures=100,
+            min_requests=10,
+            error_rate_threshold=0.5,
+            slow_call_seconds=2.0,
+        )
+    )
+    for index in range(10):
+        breaker.record(True, 5.0 if index % 2 else 0.1)
+    assert breaker.state == circuit.OPEN
+    assert breaker.stats()["window_failures"] == 5
+
+
+def test_gateway_fails_fast_when_circuit_open(clock, mock_gateway) -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(502, json={"error": {"message": "bad gateway"}})
+
+    async def run() -> None:
+        gateway = mock_gateway(
+            handler,
+            json_passthrough=True,
+            provider={
+                "circuit_breaker": {"enabled": True, "consecutive_failures": 2, "open_seconds": 30},
+                "retry": {"enabled": False},
+            },
+        )
+        provider = gateway.router.resolve("m").provider
+        try:
+            for _ in range(2):
+                response = await gateway.proxy("/chat/completions", {"model": "m"})
+                assert response.status_code == 502
+                async for _chunk in response.body_iterator:
+                    pass
+            with pytest.raises(HTTPException) as excinfo:
+                await gateway.proxy("/chat/completions", {"model": "m"})
+            assert excinfo.value.status_code == 503
+            assert excinfo.value.headers == {"Retry-After": "30"}
+            state = gateway.health()["providers"]["p"]["endpoints"][0]["circuit"]
+            assert state["state"] == "open"
+            assert provider.endpoints[0].in_flight == 0
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
+    assert calls == 2
+
+
+class _SlowAuth(AuthStrategy):
+    async def headers(self, context: AuthContext) -> dict[str, str]:
+        await asyncio.sleep(0.01)
+        return {"Authorization": "Bearer slow"}
+
+
+def test_half_open_admits_one_probe_while_signing_suspends(mock_gateway) -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(500, json={"error": {"message": "down"}})
+
+    async def attempt(gateway: Gateway) -> int:
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m"})
+        except HTTPException as exc:
+            return exc.status_code
+        async for _chunk in response.body_iterator:
+            pass
+        return response.status_code
+
+    async def run() -> list[int]:
+        gateway = mock_gateway(
+            handler,
+            json_passthrough=True,
+            provider={
+                "circuit_breaker": {"enabled": True, "consecutive_failures": 1, "open_seconds": 0.05},
+                "retry": {"enabled": False},
+            },
+        )
+        gateway.router.resolve("m").provider.auth_strategy = _SlowAuth()
+        try:
+            assert await attempt(gateway) == 500
+            await asyncio.sleep(0.06)
+            return await asyncio.gather(*[attempt(gateway) for _ in range(20)])
+        finally:
+            await gateway.close()
+
+    statuses = asyncio.run(run())
+    assert calls == 2
+    assert sorted(statuses) == [500] + [503] * 19
+
+
+def test_router_only_claims_the_endpoint_it_picks(clock) -> None:
+    breaker_config = CircuitBreakerConfig(enabled=True, consecutive_failures=1, open_seconds=5)
+    down = Provider("down", "http://down.local", NoAuth(), circuit_breaker=breaker_config)
+    up = Provider("up", "http://up.local", NoAuth(), circuit_breaker=breaker_config)
+    router = ModelRouter()
+    router.register("a", "m", down)
+    router.register("b", "m", up)
+    router.register_group("m", [("a", 1.0), ("b", 1.0)])
+    down.endpoints[0].breaker.record(False)
+    # Make "down" the preferred pick once it cools down.
+    down.endpoints[0].observe(0.01)
+    up.endpoints[0].observe(10.0)
+
+    assert {router.resolve("m").provider.provider_id for _ in range(10)} == {"up"}
+    clock.now += 5
+    route, claim = router.acquire("m")
+    assert route.provider.provider_id == "down"
+    assert down.endpoints[0].breaker.state == circuit.HALF_OPEN
+    assert router.acquire("m")[0].provider.provider_id == "up"
+    route.endpoint.release(claim)
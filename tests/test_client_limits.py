@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.requests import Request
+
+from app.config import ClientLimitConfig
+from app.ratelimit import ClientLimit, RateLimitExceeded
+from app.usage import extract_usage
+
+
+def _request(key: str) -> Request:
+    return Request(
+        {"type": "http", "headers": [(b"authorization", f"Bearer {key}".encode())]}
+    )
+
+
+def test_request_bucket_rejects_with_openai_style_error() -> None:
+    client = ClientLimit("k", ClientLimitConfig(requests_per_minute=60, request_burst=2))
+    client.admit()
+    client.admit()
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        client.admit()
+    exc = excinfo.value
+    assert exc.status_code == 429
+    assert exc.error["code"] == "rate_limit_exceeded"
+    assert exc.error["type"] == "requests"
+    assert exc.headers["Retry-After"] == "1"
+    assert exc.headers["x-ratelimit-limit-requests"] == "2"
+    assert exc.headers["x-ratelimit-remaining-requests"] == "0"
+
+
+def test_token_debt_and_daily_quota_block_later_requests() -> None:
+    client = ClientLimit("k", ClientLimitConfig(tokens_per_minute=1000, daily_tokens=1500))
+    client.admit()
+    client.record_tokens(900)
+    client.admit()  # the token bucket is still positive
+    client.record_tokens(200)
+    with pytest.raises(RateLimitExceeded) as rate:
+        client.admit()
+    assert rate.value.error["type"] == "tokens"
+
+    client.tokens.tokens = 1000.0
+    client.record_tokens(450)
+    with pytest.raises(RateLimitExceeded) as quota:
+        client.admit()
+    assert quota.value.error["code"] == "insufficient_quota"
+    assert client.stats()["daily_tokens_used"] == 1550
+
+
+def test_extract_usage_skips_null_usage_and_truncated_head() -> None:
+    tail = (
+        b'ge":null}\n\n'
+        b'data: {"choices":[],"usage":{"prompt_tokens":3,"completion_tokens":4,"total_tokens":7}}\n\n'
+        b'data: {"choices":[{"delta":{}}],"usage":null}\n\n'
+        b"data: [DONE]\n\n"
+    )
+    assert extract_usage(tail)["total_tokens"] == 7
+    assert extract_usage(b'{"id":"x"}') is None
+
+
+def test_gateway_charges_stream_usage_and_sets_headers(mock_gateway) -> None:
+    async def sse_body():
+        yield b'data: {"choices":[{"delta":{"content":"hi"}}]}\n\n'
+        yield b'data: {"choices":[],"usage":{"prompt_tokens":5,"completion_tokens":6}}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if b'"stream":true' in request.content.replace(b" ", b""):
+            return httpx.Response(
+                200, headers={"content-type": "text/event-stream"}, content=sse_body()
+            )
+        return httpx.Response(
+            200, json={"model": "upstream", "choices": [], "usage": {"total_tokens": 20}}
+        )
+
+    async def run() -> dict:
+        gateway = mock_gateway(
+            handler,
+            json_passthrough=True,
+            client_api_keys=["key-one-1234", "key-two-5678"],
+            client_limits={"key-one-1234": {"requests_per_minute": 10, "daily_tokens": 1000}},
+        )
+        try:
+            assert gateway.authorize_client(_request("key-two-5678")) is None
+            client = gateway.authorize_client(_request("key-one-1234"))
+            response = await gateway.proxy(
+                "/chat/completions", {"model": "m", "stream": True}, client=client
+            )
+            assert response.headers["x-ratelimit-remaining-requests"] == "9"
+            async for _chunk in response.body_iterator:
+                pass
+            response = await gateway.proxy("/chat/completions", {"model": "m"}, client=client)
+            async for _chunk in response.body_iterator:
+                pass
+            return gateway.health()["clients"]
+        finally:
+            await gateway.close()
+
+    clients = asyncio.run(run())
+    assert clients["key-...34"]["daily_tokens_used"] == 31
@@ -0,0 +1,321 @@
+import asyncio
+import json
+import os
+import signal
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+import app.gateway as gateway_module
+from app.config import GatewayConfig, ReloadConfig
+from app.gateway import Gateway
+from app.reload import ConfigReloader
+
+
+def _registry(*providers: dict[str, Any], **extra: Any) -> dict[str, Any]:
+    return {"providers": list(providers), **extra}
+
+
+def _provider(provider_id: str, *aliases: str, **extra: Any) -> dict[str, Any]:
+    return {
+        "id": provider_id,
+        "base_url": f"http://{provider_id}.local",
+        "models": [{"alias": alias, "upstream_model": f"{alias}-upstream"} for alias in aliases],
+        **extra,
+    }
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    model = json.loads(request.content)["model"]
+    return httpx.Response(200, json={"id": "c", "model": model, "host": request.url.host})
+
+
+def _gateway(registry: dict[str, Any]) -> Gateway:
+    return Gateway(GatewayConfig.model_validate(registry), transport=httpx.MockTransport(_handler))
+
+
+def test_reload_reuses_unchanged_providers_and_swaps_routes() -> None:
+    async def run() -> None:
+        gateway = _gateway(_registry(_provider("a", "m1"), _provider("b", "m2")))
+        try:
+            kept = gateway.router.resolve("m1").provider
+            pool = kept.client
+            changes = gateway.apply_config(
+                GatewayConfig.model_validate(
+                    _registry(
+                        _provider("a", "m1", "m3"),
+                        _provider("c", "m2"),
+                        client_api_keys=["new-key"],
+                    )
+                )
+            )
+            assert changes["added"] == ["c"]
+            assert changes["kept"] == ["a"]
+            assert changes["removed"] == ["b"]
+            assert changes["restart_required"] == []
+            assert gateway.router.resolve("m3").provider is kept
+            assert kept.client is pool
+            assert gateway.router.resolve("m2").provider.provider_id == "c"
+            assert gateway.client_api_keys == {"new-key"}
+            assert [model["id"] for model in gateway.list_models()["data"]] == ["m1", "m2", "m3"]
+            response = await gateway.proxy("/chat/completions", {"model": "m2", "messages": []})
+            body = response.body
+            assert json.loads(body)["host"] == "c.local"
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
+
+
+def test_changed_provider_settings_build_a_new_provider() -> None:
+    async def run() -> None:
+        gateway = _gateway(_registry(_provider("a", "m1")))
+        try:
+            old = gateway.router.resolve("m1").provider
+            changes = gateway.apply_config(
+                GatewayConfig.model_validate(_registry(_provider("a", "m1", timeout_seconds=5)))
+            )
+            assert changes["added"] == ["a"] and changes["removed"] == ["a"]
+            assert gateway.router.resolve("m1").provider is not old
+            assert gateway.router.resolve("m1").provider.timeout_seconds == 5
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
+
+
+def test_in_flight_stream_finishes_on_retired_provider(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(gateway_module, "_RETIRE_POLL_SECONDS", 0.01)
+
+    async def run() -> None:
+        release = asyncio.Event()
+
+        async def body():
+            yield b'data: {"choices":[{"index":0,"delta":{"content":"a"}}]}\n\n'
+            await release.wait()
+            yield b"data: [DONE]\n\n"
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=body(), headers={"content-type": "text/event-stream"})
+
+        gateway = Gateway(
+            GatewayConfig.model_validate(_registry(_provider("a", "m1"))),
+            transport=httpx.MockTransport(handler),
+        )
+        try:
+            old = gateway.router.resolve("m1").provider
+            response = await gateway.proxy("/chat/completions", {"model": "m1", "stream": True, "messages": []})
+            chunks = response.body_iterator
+            first = await chunks.__anext__()
+            assert b"content" in first
+
+            gateway.apply_config(GatewayConfig.model_validate(_registry(_provider("b", "m1"))))
+            assert gateway.router.resolve("m1").provider.provider_id == "b"
+            await asyncio.sleep(0.05)
+            assert old.in_use == 1
+            assert old._client is not None
+            assert gateway.health()["retiring_providers"] == ["a"]
+
+            release.set()
+            rest = b"".join([chunk async for chunk in chunks])
+            assert b"[DONE]" in rest
+            await asyncio.sleep(0.05)
+            assert old.in_use == 0
+            assert old._client is None
+            assert "retiring_providers" not in gateway.health()
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
+
+
+def test_request_awaiting_the_cache_keeps_a_retired_provider_open(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(gateway_module, "_RETIRE_POLL_SECONDS", 0.01)
+
+    async def run() -> None:
+        gateway = Gateway(
+            GatewayConfig.model_validate(
+                _registry(_provider("a", "m1"), response_cache={"enabled": True})
+            ),
+            transport=httpx.MockTransport(_handler),
+        )
+        release = asyncio.Event()
+        lookup = gateway.response_cache.get
+
+        async def slow_get(key: str):
+            await release.wait()
+            return await lookup(key)
+
+        gateway.response_cache.get = slow_get
+        try:
+            old = gateway.router.resolve("m1").provider
+            request = asyncio.create_task(
+                gateway.proxy("/chat/completions", {"model": "m1", "temperature": 0, "messages": []})
+            )
+            await asyncio.sleep(0.01)
+            gateway.apply_config(GatewayConfig.model_validate(_registry(_provider("b", "m1"))))
+            await asyncio.sleep(0.05)
+            assert gateway.health()["retiring_providers"] == ["a"]
+
+            release.set()
+            response = await request
+            assert response.status_code == 200
+            assert json.loads(response.body)["host"] == "a.local"
+            await asyncio.sleep(0.05)
+            assert old.in_use == 0
+            assert old._client is None
+            assert "retiring_providers" not in gateway.health()
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
+
+
+def test_admission_queue_survives_reload_when_limits_are_unchanged() -> None:
+    async def run() -> None:
+        limited = {"alias": "m1", "upstream_model": "u", "concurrency": {"max_in_flight": 2}}
+        provider = {"id": "a", "base_url": "http://a.local", "models": [limited]}
+        gateway = _gateway(_registry(provider))
+        try:
+            queue = gateway.router.admission("m1")
+            assert queue is not None
+            gateway.apply_config(GatewayConfig.model_validate(_registry(provider)))
+            assert gateway.router.admission("m1") is queue
+            changed = {**limited, "concurrency": {"max_in_flight": 3}}
+            gateway.apply_config(GatewayConfig.model_validate(_registry({**provider, "models": [changed]})))
+            assert gateway.router.admission("m1") is not queue
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
+
+
+def test_restart_only_sections_are_reported() -> None:
+    async def run() -> None:
+        gateway = _gateway(_registry(_provider("a", "m1")))
+        try:
+            changes = gateway.apply_config(
+                GatewayConfig.model_validate(
+                    _registry(_provider("a", "m1"), response_cache={"enabled": True})
+                )
+            )
+            assert changes["restart_required"] == ["response_cache"]
+            assert gateway.response_cache is None
+            assert not gateway.config.response_cache.enabled
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
+
+
+def _write(path: Path, registry: dict[str, Any] | str) -> None:
+    path.write_text(registry if isinstance(registry, str) else json.dumps(registry), encoding="utf-8")
+
+
+def test_reloader_keeps_serving_on_a_broken_registry(tmp_path: Path) -> None:
+    path = tmp_path / "model_registry.json"
+    _write(path, _registry(_provider("a", "m1")))
+
+    async def run() -> None:
+        gateway = _gateway(json.loads(path.read_text(encoding="utf-8")))
+        reloader = ConfigReloader(
+            gateway, path, ReloadConfig(watch=False, sighup=False), lambda: GatewayConfig.from_file(path)
+        )
+        try:
+            _write(path, '{"providers": [')
+            assert not await reloader.reload()
+            _write(path, _registry(_provider("a", "m1"), _provider("b", "m1")))
+            assert not await reloader.reload()
+            assert "duplicated" in reloader.last_error
+            assert reloader.stats()["failures"] == 2
+            assert gateway.list_models()["data"][0]["id"] == "m1"
+            response = await gateway.proxy("/chat/completions", {"model": "m1", "messages": []})
+            assert response.status_code == 200
+
+            _write(path, _registry(_provider("a", "m1", "m2")))
+            assert await reloader.reload()
+            assert reloader.stats()["reloads"] == 1
+            assert reloader.last_error is None
+            assert [model["id"] for model in gateway.list_models()["data"]] == ["m1", "m2"]
+        finally:
+            await reloader.close()
+            await gateway.close()
+
+    asyncio.run(run())
+
+
+def test_reloader_watches_the_file(tmp_path: Path) -> None:
+    path = tmp_path / "model_registry.json"
+    _write(path, _registry(_provider("a", "m1")))
+
+    async def run() -> None:
+        gateway = _gateway(json.loads(path.read_text(encoding="utf-8")))
+        reloader = ConfigReloader(
+            gateway,
+            path,
+            ReloadConfig(poll_interval_seconds=0.01, sighup=False),
+            lambda: GatewayConfig.from_file(path),
+        )
+        await reloader.start()
+        try:
+            _write(path, _registry(_provider("a", "m1", "m2")))
+            for _ in range(200):
+                if reloader.reloads:
+                    break
+                await asyncio.sleep(0.01)
+            assert reloader.reloads == 1
+            assert "m2" in [model["id"] for model in gateway.list_models()["data"]]
+        finally:
+            await reloader.close()
+            await gateway.close()
+
+    asyncio.run(run())
+
+
+def test_sighup_triggers_a_reload(tmp_path: Path) -> None:
+    path = tmp_path / "model_registry.json"
+    _write(path, _registry(_provider("a", "m1")))
+
+    async def run() -> None:
+        gateway = _gateway(json.loads(path.read_text(encoding="utf-8")))
+        reloader = ConfigReloader(
+            gateway, path, ReloadConfig(watch=False), lambda: GatewayConfig.from_file(path)
+        )
+        await reloader.start()
+        try:
+            _write(path, _registry(_provider("a", "m2")))
+            os.kill(os.getpid(), signal.SIGHUP)
+            for _ in range(200):
+                if reloader.reloads:
+                    break
+                await asyncio.sleep(0.01)
+            assert [model["id"] for model in gateway.list_models()["data"]] == ["m2"]
+        finally:
+            await reloader.close()
+            await gateway.close()
+
+    asyncio.run(run())
+
+
+def test_close_lets_triggered_reloads_finish(tmp_path: Path) -> None:
+    path = tmp_path / "model_registry.json"
+    _write(path, _registry(_provider("a", "m1")))
+
+    async def run() -> None:
+        gateway = _gateway(json.loads(path.read_text(encoding="utf-8")))
+        reloader = ConfigReloader(
+            gateway, path, ReloadConfig(watch=False, sighup=False), lambda: GatewayConfig.from_file(path)
+        )
+        try:
+            _write(path, _registry(_provider("a", "m1", "m2")))
+            reloader.trigger()
+            reloader.trigger()
+            await reloader.close()
+            assert reloader.reloads == 2
+            assert [model["id"] for model in gateway.list_models()["data"]] == ["m1", "m2"]
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
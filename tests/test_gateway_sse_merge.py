@@ -1,4 +1,10 @@
+import asyncio
+import json
+
+import httpx
+
 from app.gateway import Gateway
+from app.sse import ChatCompletionAggregator
 
 
 def test_merge_sse_chunks_to_chat_completion() -> None:
@@ -20,3 +26,54 @@ def test_merge_sse_chunks_to_chat_completion() -> None:
     assert merged["choices"][0]["message"]["content"] == "你好"
     assert merged["choices"][0]["finish_reason"] == "stop"
 
+
+
+def _sse(chunk: dict) -> str:
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+
+def test_aggregator_merges_tool_calls_reasoning_and_logprobs() -> None:
+    body = (
+        _sse({"id": "c1", "created": 1, "choices": [{"index": 0, "delta": {"role": "assistant", "reasoning_content": "think "}}]})
+        + _sse({"id": "c1", "choices": [{"index": 0, "delta": {"reasoning_content": "more"}, "logprobs": {"content": [{"token": "a"}]}}]})
+        + _sse({"id": "c1", "choices": [{"index": 0, "delta": {"tool_calls": [{"index": 0, "id": "call_1", "type": "function", "function": {"name": "read_file", "arguments": "{\"pa"}}]}}]})
+        + _sse({"id": "c1", "choices": [{"index": 0, "delta": {"tool_calls": [{"index": 0, "function": {"arguments": "th\": \"a.py\"}"}}]}, "logprobs": {"content": [{"token": "b"}]}}]})
+        + _sse({"id": "c1", "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}], "usage": {"total_tokens": 7}})
+        + "data: [DONE]\n\n"
+    )
+    aggregator = ChatCompletionAggregator()
+    raw = body.encode("utf-8")
+    # Feed in awkward slices so lines and multi-byte characters straddle chunks.
+    for offset in range(0, len(raw), 7):
+        aggregator.feed_bytes(raw[offset : offset + 7])
+    merged = aggregator.result("alias")
+    assert merged is not None
+    choice = merged["choices"][0]
+    assert choice["finish_reason"] == "tool_calls"
+    assert choice["message"]["reasoning_content"] == "think more"
+    assert choice["message"]["content"] is None
+    assert choice["message"]["tool_calls"] == [
+        {"id": "call_1", "type": "function", "function": {"name": "read_file", "arguments": '{"path": "a.py"}'}}
+    ]
+    assert choice["logprobs"] == {"content": [{"token": "a"}, {"token": "b"}]}
+    assert merged["usage"] == {"total_tokens": 7}
+
+
+def test_non_stream_request_answered_with_sse_is_merged(mock_gateway) -> None:
+    body = (
+        _sse({"id": "c1", "created": 1, "choices": [{"index": 0, "delta": {"content": "你"}}]})
+        + _sse({"id": "c1", "choices": [{"index": 0, "delta": {"content": "好"}, "finish_reason": "stop"}]})
+    )
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body.encode())
+
+    async def run() -> dict:
+        gateway = mock_gateway(handler)
+        response = await gateway.proxy("/chat/completions", {"model": "m", "messages": []})
+        await gateway.close()
+        return json.loads(response.body)
+
+    merged = asyncio.run(run())
+    assert merged["model"] == "m"
+    assert merged["choices"][0]["message"]["content"] == "你好"
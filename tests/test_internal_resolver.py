@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.auth.strategies import AuthContext, InternalApiKeyResolverAuth
+
+CALLS: list[str] = []
+
+
+def blocking_resolver(**kwargs: str) -> str:
+    CALLS.append(threading.current_thread().name)
+    time.sleep(0.05)
+    return f"token-{kwargs['model_id']}"
+
+
+def hanging_resolver(**kwargs: str) -> str:
+    time.sleep(0.5)
+    return "late"
+
+
+async def async_resolver(**kwargs: str) -> str:
+    return "async-token"
+
+
+def _auth(resolver: str, **kwargs) -> InternalApiKeyResolverAuth:
+    return InternalApiKeyResolverAuth(
+        resolver=f"{__name__}:{resolver}",
+        model_id_from="upstream_model",
+        token_ttl_seconds=0,
+        **kwargs,
+    )
+
+
+def test_sync_resolver_runs_off_loop_and_dedupes_concurrent_calls(monkeypatch) -> None:
+    monkeypatch.setenv("TRACE_ID", "fixed-trace")
+    CALLS.clear()
+    auth = _auth("blocking_resolver")
+    context = AuthContext(provider_id="juzhi", upstream_model="m1")
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        for _ in range(5):
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    async def run() -> list[dict[str, str]]:
+        results = await asyncio.gather(*[auth.headers(context) for _ in range(5)], ticker())
+        return results[:5]
+
+    headers = asyncio.run(run())
+    auth.close()
+    assert all(item == {"Authorization": "Bearer token-m1"} for item in headers)
+    assert len(CALLS) == 1
+    assert CALLS[0].startswith("auth-resolver")
+    assert ticks == 5
+    assert auth.stats()["resolver"] == "thread"
+
+
+TRACE_IDS: list[str] = []
+
+
+async def tracing_resolver(**kwargs: str) -> str:
+    TRACE_IDS.append(kwargs["trace_id"])
+    return "token"
+
+
+def test_resolver_gets_own_trace_id_per_request_without_trace_env(monkeypatch) -> None:
+    monkeypatch.delenv("TRACE_ID", raising=False)
+    TRACE_IDS.clear()
+    auth = InternalApiKeyResolverAuth(
+        resolver=f"{__name__}:tracing_resolver",
+        model_id_from="upstream_model",
+    )
+    context = AuthContext(provider_id="juzhi", upstream_model="m1")
+
+    async def run() -> None:
+        await asyncio.gather(*[auth.headers(context) for _ in range(3)])
+
+    asyncio.run(run())
+    assert len(set(TRACE_IDS)) == 3
+    assert auth.stats()["shares_tokens"] is False
+
+
+def test_sync_resolver_timeout_is_reported() -> None:
+    auth = _auth("hanging_resolver", resolver_timeout_seconds=0.05)
+    context = AuthContext(provider_id="juzhi", upstream_model="m1")
+    with pytest.raises(RuntimeError, match="timed out"):
+        asyncio.run(auth.headers(context))
+    auth.close()
+
+
+def test_async_resolver_is_awaited_inline() -> None:
+    auth = _auth("async_resolver")
+    headers = asyncio.run(auth.headers(AuthContext(provider_id="juzhi", upstream_model="m1")))
+    assert headers == {"Authorization": "Bearer async-token"}
+    assert auth.stats()["resolver"] == "async"
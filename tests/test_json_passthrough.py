@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.responses import StreamingResponse
+
+from app.body import ModelFieldRewriter
+
+
+@pytest.mark.parametrize("step", [1, 3, 4096])
+def test_rewriter_replaces_only_top_level_model(step: int) -> None:
+    raw = (
+        b'{"id":"x","choices":[{"message":{"content":"\\"model\\": \\"keep\\""},"model":"inner"}],'
+        b'"model" : "upstream-\\"name","usage":{"total_tokens":3}}'
+    )
+    rewriter = ModelFieldRewriter("alias")
+    out = b"".join(rewriter.feed(raw[offset : offset + step]) for offset in range(0, len(raw), step))
+    parsed = json.loads(out)
+    assert parsed["model"] == "alias"
+    assert parsed["choices"][0]["model"] == "inner"
+    assert parsed["choices"][0]["message"]["content"] == '"model": "keep"'
+
+
+def test_rewriter_leaves_arrays_untouched() -> None:
+    raw = b'[{"model":"x"}]'
+    assert ModelFieldRewriter("alias").feed(raw) == raw
+
+
+def test_json_response_is_streamed_through_with_model_rewritten(mock_gateway) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"id": "1", "model": "upstream", "choices": []})
+
+    async def run() -> tuple[object, bytes]:
+        gateway = mock_gateway(handler, json_passthrough=True)
+        response = await gateway.proxy("/chat/completions", {"model": "m", "messages": []})
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        await gateway.close()
+        return response, body
+
+    response, body = asyncio.run(run())
+    assert isinstance(response, StreamingResponse)
+    assert json.loads(body)["model"] == "m"
+
+
+def test_non_json_upstream_body_is_still_wrapped_as_error(mock_gateway) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(502, text="<html>bad gateway</html>")
+
+    async def run() -> dict:
+        gateway = mock_gateway(handler, json_passthrough=True)
+        response = await gateway.proxy("/chat/completions", {"model": "m", "messages": []})
+        await gateway.close()
+        return json.loads(response.body)
+
+    content = asyncio.run(run())
+    assert content["error"]["upstream_status"] == 502
+    assert "bad gateway" in content["error"]["raw"]
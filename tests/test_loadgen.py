@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.loadgen import Step, compare, format_report, main, regressions, run
+from app.mock_upstream import MockUpstreamSettings, create_app
+
+FAST = {"ttft_seconds": 0.0, "tokens_per_second": 0.0, "completion_tokens": 6, "tokens_per_chunk": 2}
+
+
+def _run(steps: list[Step], settings: MockUpstreamSettings, **options) -> dict:
+    transport = httpx.ASGITransport(app=create_app(settings))
+    return asyncio.run(
+        run(steps, ["a", "b"], target="http://mock.local", api_key="k", check=False, transport=transport, **options)
+    )
+
+
+def test_closed_loop_reports_every_mode() -> None:
+    report = _run(
+        [Step("stream", concurrency=2), Step("json", concurrency=2)], MockUpstreamSettings(**FAST), requests=6
+    )
+    stream, plain = report["steps"]
+    for step in (stream, plain):
+        assert step["requests"] == step["ok"] == 6
+        assert step["errors"] == {}
+        assert step["completion_tokens_per_second"] > 0
+        assert step["latency_seconds"]["p99"] is not None
+        assert step["models"]["a"]["requests"] == step["models"]["b"]["requests"] == 3
+    assert stream["ttft_seconds"]["p50"] is not None
+    assert plain["ttft_seconds"]["p50"] is None
+    assert "c=2" in format_report(report)
+
+
+def test_stream_chunks_give_ttft_and_inter_chunk_gaps() -> None:
+    async def body():
+        for content in ("a", "b", "c"):
+            yield f'data: {{"choices":[{{"delta":{{"content":"{content}"}}}}]}}\n\n'.encode()
+        yield b'data: {"choices":[],"usage":{"completion_tokens":3}}\n\ndata: [DONE]\n\n'
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+    report = asyncio.run(
+        run(
+            [Step("stream", concurrency=1)],
+            ["a"],
+            target="http://gw.local",
+            api_key="",
+            check=False,
+            transport=transport,
+            requests=1,
+        )
+    )
+    (step,) = report["steps"]
+    assert step["ok"] == 1
+    assert step["ttft_seconds"]["p50"] is not None
+    assert step["itl_seconds"]["max"] is not None
+    assert step["completion_tokens_per_second"] > 0
+
+
+def test_open_loop_counts_errors_by_kind() -> None:
+    settings = MockUpstreamSettings(**FAST, error_rate=1.0, error_status=503)
+    report = _run([Step("json", rate=200.0)], settings, requests=5)
+    (step,) = report["steps"]
+    assert step["requests"] == 5
+    assert step["ok"] == 0
+    assert step["errors"] == {"http_503": 5}
+
+
+def test_compare_flags_regressions() -> None:
+    def step(rps: float, p99: float) -> dict:
+        latency = {"p50": p99 / 2, "p90": p99, "p99": p99, "max": p99}
+        empty = {"p50": None, "p90": None, "p99": None, "max": None}
+        return {
+            "mode": "json",
+            "concurrency": 4,
+            "rate": None,
+            "throughput_rps": rps,
+            "latency_seconds": latency,
+            "ttft_seconds": empty,
+        }
+
+    changes = compare({"steps": [step(8.0, 1.5)]}, {"steps": [step(10.0, 1.0)]})
+    assert changes[0]["throughput_rps"] == pytest.approx(-0.2)
+    assert changes[0]["latency_p99"] == pytest.approx(0.5)
+    assert "ttft_p99" not in changes[0]
+    assert len(regressions(changes, 0.1)) == 2
+    assert regressions(changes, 0.6) == []
+
+
+def test_preflight_rejects_unknown_alias() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/health":
+            return httpx.Response(200, json={"status": "ok"})
+        return httpx.Response(200, json={"object": "list", "data": [{"id": "a"}]})
+
+    with pytest.raises(RuntimeError, match="not registered: b"):
+        asyncio.run(
+            run(
+                [Step("json", concurrency=1)],
+                ["a", "b"],
+                target="http://gw.local",
+                api_key="k",
+                transport=httpx.MockTransport(handler),
+                requests=1,
+            )
+        )
+
+
+def test_cli_writes_json_report(tmp_path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]) -> None:
+    app = create_app(MockUpstreamSettings(**FAST))
+    original = httpx.AsyncClient.__init__
+
+    def patched(self, *args, **kwargs):
+        kwargs["transport"] = httpx.ASGITransport(app=app)
+        original(self, *args, **kwargs)
+
+    monkeypatch.setattr(httpx.AsyncClient, "__init__", patched)
+    output = tmp_path / "run.json"
+    main(["--models", "a", "--mode", "stream", "--requests", "2", "--no-check", "--output", str(output)])
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["steps"][0]["ok"] == 2
+    assert "stream" in capsys.readouterr().out
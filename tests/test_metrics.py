@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.metrics import MetricsRegistry
+
+
+def _sample(text: str, line_prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_prefix} not in metrics")
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    registry = MetricsRegistry()
+    for value in (0.003, 0.2, 0.2, 500.0):
+        registry.ttft_seconds.observe(("m", "p"), value)
+    text = registry.render()
+    labels = 'alias="m",provider="p"'
+    assert _sample(text, f'gateway_time_to_first_token_seconds_bucket{{{labels},le="0.005"}}') == 1
+    assert _sample(text, f'gateway_time_to_first_token_seconds_bucket{{{labels},le="0.25"}}') == 3
+    assert _sample(text, f'gateway_time_to_first_token_seconds_bucket{{{labels},le="+Inf"}}') == 4
+    assert _sample(text, f"gateway_time_to_first_token_seconds_count{{{labels}}}") == 4
+    assert _sample(text, f"gateway_time_to_first_token_seconds_sum{{{labels}}}") == pytest.approx(500.403)
+
+
+def test_gateway_records_requests_streams_and_usage(mock_gateway) -> None:
+    async def sse_body():
+        yield b'data: {"choices":[{"delta":{"content":"hi"}}]}\n\n'
+        yield b'data: {"choices":[],"usage":{"prompt_tokens":5,"completion_tokens":6}}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if b'"stream":true' in request.content.replace(b" ", b""):
+            return httpx.Response(
+                200, headers={"content-type": "text/event-stream"}, content=sse_body()
+            )
+        return httpx.Response(503, json={"error": {"message": "busy"}})
+
+    async def run() -> str:
+        gateway = mock_gateway(handler, provider={"retry": {"enabled": False}}, json_passthrough=True)
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m", "stream": True})
+            assert _sample(gateway.render_metrics(), 'gateway_requests_in_flight{alias="m",provider="p"}') == 1
+            async for _chunk in response.body_iterator:
+                pass
+            response = await gateway.proxy("/chat/completions", {"model": "m"})
+            async for _chunk in response.body_iterator:
+                pass
+            with pytest.raises(HTTPException):
+                await gateway.proxy("/chat/completions", {"model": "no-such-model"})
+            return gateway.render_metrics()
+        finally:
+            await gateway.close()
+
+    text = asyncio.run(run())
+    labels = 'alias="m",provider="p"'
+    assert _sample(text, f'gateway_requests_total{{{labels},status_class="2xx"}}') == 1
+    assert _sample(text, f'gateway_requests_total{{{labels},status_class="5xx"}}') == 1
+    assert _sample(text, 'gateway_requests_total{alias="",provider="",status_class="4xx"}') == 1
+    assert _sample(text, f"gateway_requests_in_flight{{{labels}}}") == 0
+    assert _sample(text, f"gateway_time_to_first_token_seconds_count{{{labels}}}") == 1
+    assert _sample(text, f"gateway_stream_duration_seconds_count{{{labels}}}") == 1
+    assert _sample(text, f'gateway_tokens_total{{{labels},kind="prompt"}}') == 5
+    assert _sample(text, f'gateway_tokens_total{{{labels},kind="completion"}}') == 6
+    assert _sample(text, f"gateway_relayed_bytes_total{{{labels}}}") > 100
+    assert _sample(text, 'gateway_pool_max_connections{provider="p"}') == 100
+
+
+def test_render_sums_snapshots_of_other_workers(tmp_path) -> None:
+    registry = MetricsRegistry(snapshot_dir=tmp_path)
+    registry.requests.inc(("m", "p", "2xx"), 2)
+    registry.ttft_seconds.observe(("m", "p"), 0.2)
+    other = MetricsRegistry()
+    other.requests.inc(("m", "p", "2xx"), 3)
+    other.ttft_seconds.observe(("m", "p"), 0.2)
+    other.in_flight.inc(("m", "p"))
+    (tmp_path / "1.json").write_text(
+        json.dumps(
+            {
+                name: [[list(labels), value] for labels, value in family.values.items()]
+                for name, family in other._families.items()
+            }
+        )
+    )
+    text = registry.render()
+    assert _sample(text, 'gateway_requests_total{alias="m",provider="p",status_class="2xx"}') == 5
+    assert _sample(text, 'gateway_time_to_first_token_seconds_count{alias="m",provider="p"}') == 2
+    assert _sample(text, 'gateway_requests_in_flight{alias="m",provider="p"}') == 1
+
+
+def test_render_takes_the_maximum_of_per_worker_limits(tmp_path) -> None:
+    registry = MetricsRegistry(snapshot_dir=tmp_path)
+    registry.admission_limit.set(("provider", "p"), 8)
+    registry.admission_rejected.set(("provider", "p", "timeout"), 2)
+    registry.pool_max_connections.set(("p",), 100)
+    other = MetricsRegistry()
+    other.admission_limit.set(("provider", "p"), 6)
+    other.admission_rejected.set(("provider", "p", "timeout"), 3)
+    other.pool_max_connections.set(("p",), 100)
+    (tmp_path / "1.json").write_text(
+        json.dumps(
+            {
+                name: [[list(labels), value] for labels, value in family.values.items()]
+                for name, family in other._families.items()
+            }
+        )
+    )
+    text = registry.render()
+    assert _sample(text, 'gateway_admission_limit{scope="provider",name="p"}') == 8
+    assert _sample(text, 'gateway_pool_max_connections{provider="p"}') == 100
+    assert "# TYPE gateway_admission_rejected_total counter" in text
+    assert _sample(text, 'gateway_admission_rejected_total{scope="provider",name="p",reason="timeout"}') == 5
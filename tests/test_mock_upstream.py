@@ -0,0 +1,134 @@
+import asyncio
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.config import GatewayConfig
+from app.gateway import Gateway
+from app.mock_upstream import MockUpstreamSettings, create_app
+
+
+def _gateway(settings: MockUpstreamSettings, provider: dict[str, Any]) -> Gateway:
+    app = create_app(settings)
+    config = GatewayConfig.model_validate(
+        {
+            "providers": [
+                {"id": "p", "models": [{"alias": "m", "upstream_model": "qwen3_coder"}], **provider}
+            ]
+        }
+    )
+    return Gateway(config, transport=httpx.ASGITransport(app=app))
+
+
+async def _call(gateway: Gateway, stream: bool) -> tuple[int, bytes]:
+    response = await gateway.proxy(
+        "/chat/completions",
+        {"model": "m", "stream": stream, "messages": [{"role": "user", "content": "hi"}]},
+    )
+    if not hasattr(response, "body_iterator"):
+        return response.status_code, bytes(response.body)
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    return response.status_code, body
+
+
+FAST = {"ttft_seconds": 0.0, "tokens_per_second": 0.0, "completion_tokens": 6, "tokens_per_chunk": 4}
+
+
+@pytest.mark.parametrize("appkey, status", [("secret", 200), ("wrong", 401)])
+def test_panzhi_checksum_is_verified(appkey: str, status: int) -> None:
+    settings = MockUpstreamSettings(platform="panzhi", appid="deepinsi", appkey="secret", **FAST)
+    provider = {
+        "provider_type": "panzhi",
+        "base_url": "http://mock.local/v1",
+        "auth": {"appid": "deepinsi", "appkey": appkey},
+    }
+
+    async def run() -> tuple[int, bytes]:
+        gateway = _gateway(settings, provider)
+        try:
+            return await _call(gateway, stream=False)
+        finally:
+            await gateway.close()
+
+    code, body = asyncio.run(run())
+    assert code == status
+    if status == 200:
+        assert b'"completion_tokens":6' in body.replace(b" ", b"")
+    else:
+        assert b"X-CheckSum mismatch" in body
+
+
+@pytest.mark.parametrize("secret, status", [("s3cret", 200), ("other", 401)])
+def test_juzhi_hmac_token_is_verified(monkeypatch, secret: str, status: int) -> None:
+    base = "http://mock.local/openapi/flames/api/v1/openai/chat"
+    for name, value in {
+        "OPENAI_API_BASE": base,
+        "OPENAI_API_ID": "api-id",
+        "OPENAI_API_SECRET": secret,
+        "MODELSOURCE": "private",
+        "MODEL_ID": "model-1",
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("INTERNAL_API_KEY_OVERRIDE", raising=False)
+    settings = MockUpstreamSettings(platform="juzhi", api_id="api-id", api_secret="s3cret", **FAST)
+    provider = {"provider_type": "juzhi", "path_overrides": {"/chat/completions": ""}}
+
+    async def run() -> tuple[int, bytes]:
+        gateway = _gateway(settings, provider)
+        try:
+            return await _call(gateway, stream=True)
+        finally:
+            await gateway.close()
+
+    code, body = asyncio.run(run())
+    assert code == status
+    if status == 200:
+        assert body.count(b'"content": "tok tok tok tok "') == 1
+        assert body.endswith(b"data: [DONE]\n\n")
+    else:
+        assert b"signature mismatch" in body
+
+
+def test_injected_errors_and_disconnects() -> None:
+    settings = MockUpstreamSettings(error_rate=1.0, error_status=429, **FAST)
+
+    async def run() -> int:
+        gateway = _gateway(settings, {"base_url": "http://mock.local", "retry": {"enabled": False}})
+        try:
+            code, _ = await _call(gateway, stream=False)
+            return code
+        finally:
+            await gateway.close()
+
+    assert asyncio.run(run()) == 429
+
+    app = create_app(MockUpstreamSettings(disconnect_rate=1.0, **FAST))
+
+    async def stream() -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://mock.local") as client:
+            await client.post("/v1/chat/completions", json={"model": "x", "stream": True})
+
+    with pytest.raises(httpx.RemoteProtocolError, match="dropped the stream"):
+        asyncio.run(stream())
+    assert app.state.stats.disconnects == 1
+
+
+def test_gateway_survives_a_dropped_upstream_stream() -> None:
+    settings = MockUpstreamSettings(disconnect_rate=1.0, **FAST)
+
+    async def run() -> tuple[HTTPException, dict[str, Any]]:
+        gateway = _gateway(settings, {"base_url": "http://mock.local"})
+        try:
+            with pytest.raises(HTTPException) as excinfo:
+                await _call(gateway, stream=True)
+            return excinfo.value, gateway.health()
+        finally:
+            await gateway.close()
+
+    exc, health = asyncio.run(run())
+    assert exc.status_code == 502
+    assert "dropped the stream" in exc.detail
+    assert health["in_flight"] == 0
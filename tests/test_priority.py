@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import httpx
+
+from app.config import ConcurrencyConfig
+from app.providers.admission import AdmissionQueue, Priority
+
+
+def test_weighted_fair_queue_interleaves_flows_by_weight() -> None:
+    batch = Priority(lane="batch", flow="batch-key", weight=1.0)
+    interactive = Priority(lane="interactive", flow="ide-key", weight=4.0)
+
+    async def run() -> list[str]:
+        queue = AdmissionQueue("test", ConcurrencyConfig(max_in_flight=1))
+        order: list[str] = []
+        await queue.acquire(time.monotonic() + 1)
+
+        async def wait(priority: Priority) -> None:
+            await queue.acquire(time.monotonic() + 1, priority)
+            order.append(priority.lane)
+            await asyncio.sleep(0)
+            queue.release()
+
+        # The batch job queued its whole burst before the IDE user arrived.
+        tasks = [asyncio.create_task(wait(batch)) for _ in range(6)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(wait(interactive)) for _ in range(4)]
+        await asyncio.sleep(0)
+        queue.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    order = asyncio.run(run())
+    assert order[:5].count("interactive") == 4
+    assert order[-1] == "batch"
+
+
+def test_priority_comes_from_client_lane_and_header(mock_gateway) -> None:
+    gateway = mock_gateway(
+        lambda request: httpx.Response(200, json={}),
+        priority={"client_lanes": {"eval-key": "batch"}},
+    )
+    assert gateway.resolve_priority({"authorization": "Bearer ide"}).lane == "interactive"
+    assert gateway.resolve_priority({"authorization": "Bearer eval-key"}) == Priority(
+        lane="batch", flow="eval-key", weight=1.0
+    )
+    # A batch key cannot promote itself; anyone can step down.
+    assert (
+        gateway.resolve_priority(
+            {"authorization": "Bearer eval-key", "x-gateway-priority": "interactive"}
+        ).lane
+        == "batch"
+    )
+    assert (
+        gateway.resolve_priority(
+            {"authorization": "Bearer ide", "x-gateway-priority": "batch"}
+        ).lane
+        == "batch"
+    )
+
+
+def test_batch_lane_uses_its_own_pool(mock_gateway) -> None:
+    async def run() -> dict:
+        gateway = mock_gateway(
+            lambda request: httpx.Response(200, json={"choices": []}),
+            json_passthrough=True,
+            provider={"lane_pools": {"batch": {"max_connections": 2}}},
+        )
+        provider = gateway.router.resolve("m").provider
+        try:
+            assert provider.client_for("batch") is not provider.client
+            assert provider.client_for("interactive") is provider.client
+            response = await gateway.proxy(
+                "/chat/completions",
+                {"model": "m"},
+                headers={"x-gateway-priority": "batch"},
+            )
+            async for _chunk in response.body_iterator:
+                pass
+            return gateway.health()["providers"]["p"]["pool"]["lanes"]
+        finally:
+            await gateway.close()
+
+    lanes = asyncio.run(run())
+    assert lanes["batch"]["max_connections"] == 2
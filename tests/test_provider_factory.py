@@ -1,4 +1,5 @@
 import asyncio
+import base64
 
 from app.config import ModelConfig, ProviderConfig
 from app.providers.factory import ProviderFactory
@@ -48,3 +49,46 @@ def test_juzhi_factory_reuses_neibu_auth_mechanism(monkeypatch) -> None:
     url, headers, _ = asyncio.run(provider.request_spec("/chat/completions", "test_model"))
     assert url == "http://example.local/openapi/chat/chat/completions"
     assert headers["Authorization"] == "Bearer signed-token"
+
+
+def test_juzhi_auth_snapshots_env_at_build_time(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_BASE", "http://example.local/openapi/chat")
+    monkeypatch.setenv("OPENAI_API_ID", "id-at-build")
+    monkeypatch.setenv("OPENAI_API_SECRET", "secret")
+    monkeypatch.delenv("INTERNAL_API_KEY_OVERRIDE", raising=False)
+    config = ProviderConfig(
+        id="juzhi_test",
+        provider_type="juzhi",
+        auth={"token_ttl_seconds": 0},
+        models=[ModelConfig(alias="c", upstream_model="test_model")],
+    )
+    provider = ProviderFactory.create_provider(config)
+    monkeypatch.setenv("OPENAI_API_ID", "id-changed-later")
+    _, headers, _ = asyncio.run(provider.request_spec("/chat/completions", "test_model"))
+    token = headers["Authorization"].removeprefix("Bearer ")
+    assert 'api_key="id-at-build"' in base64.b64decode(token).decode("utf-8")
+
+
+def test_factory_builds_weighted_endpoints(monkeypatch) -> None:
+    monkeypatch.setenv("PANZHI_APPID", "demo-app")
+    monkeypatch.setenv("PANZHI_APPKEY", "demo-key")
+    monkeypatch.setenv("PANZHI_BACKUP_URL", "http://backup.local/v1/")
+    config = ProviderConfig(
+        id="panzhi",
+        provider_type="panzhi",
+        endpoints=[
+            {"base_url": "http://primary.local/v1", "weight": 3},
+            {"base_url_env": "PANZHI_BACKUP_URL"},
+        ],
+        models=[ModelConfig(alias="a", upstream_model="qwen3_coder")],
+    )
+    provider = ProviderFactory.create_provider(config)
+    assert provider.base_url == "http://primary.local/v1"
+    assert [(e.base_url, e.weight) for e in provider.endpoints] == [
+        ("http://primary.local/v1", 3.0),
+        ("http://backup.local/v1", 1.0),
+    ]
+    url, _, _ = asyncio.run(
+        provider.request_spec("/chat/completions", "qwen3_coder", base_url="http://backup.local/v1")
+    )
+    assert url == "http://backup.local/v1/chat/completions"
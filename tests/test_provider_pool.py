@@ -0,0 +1,85 @@
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+import httpx
+
+from app.auth.strategies import NoAuth
+from app.config import GatewayConfig, PoolConfig
+from app.gateway import Gateway
+from app.providers.base import Provider
+
+
+def test_pool_config_inherits_from_provider_defaults(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_BASE", "http://example.local/openapi/chat")
+    registry = {
+        "provider_defaults": {
+            "juzhi": {"pool": {"max_connections": 8, "http2": False}},
+        },
+        "providers": [
+            {
+                "id": "juzhi_a",
+                "provider_type": "juzhi",
+                "pool": {"keepalive_expiry": 60},
+                "models": [{"alias": "a", "upstream_model": "model-a"}],
+            }
+        ],
+    }
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
+        json.dump(registry, f)
+    config = GatewayConfig.from_file(Path(f.name))
+    pool = config.providers[0].pool
+    assert pool.max_connections == 8
+    assert pool.keepalive_expiry == 60
+    assert pool.max_keepalive_connections == PoolConfig().max_keepalive_connections
+
+
+def test_each_provider_gets_its_own_client(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_BASE", "http://example.local/openapi/chat")
+    monkeypatch.setenv("INTERNAL_API_KEY_OVERRIDE", "signed-token")
+    config = GatewayConfig.model_validate(
+        {
+            "providers": [
+                {
+                    "id": "juzhi_a",
+                    "provider_type": "juzhi",
+                    "models": [{"alias": "a", "upstream_model": "model-a"}],
+                },
+                {
+                    "id": "juzhi_b",
+                    "provider_type": "juzhi",
+                    "pool": {"max_connections": 4},
+                    "models": [{"alias": "b", "upstream_model": "model-b"}],
+                },
+            ]
+        }
+    )
+    gateway = Gateway(config)
+    try:
+        provider_a = gateway.router.resolve("a").provider
+        provider_b = gateway.router.resolve("b").provider
+        assert provider_a.client is not provider_b.client
+        health = gateway.health()
+        assert health["providers"]["juzhi_b"]["pool"]["max_connections"] == 4
+    finally:
+        asyncio.run(gateway.close())
+
+
+def test_pool_stats_degrade_without_httpcore_pool() -> None:
+    async def run() -> dict[str, object]:
+        provider = Provider(
+            provider_id="p",
+            base_url="http://example.local",
+            auth_strategy=NoAuth(),
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})),
+        )
+        response = await provider.client.post("http://example.local/chat/completions")
+        assert response.status_code == 200
+        stats = provider.pool_stats()
+        await provider.aclose()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["connections"] == 0
+    assert stats["max_connections"] == 100
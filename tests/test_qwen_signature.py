@@ -41,3 +41,40 @@ def test_qwen_signature_can_attach_authorization_header() -> None:
         auth.headers(AuthContext(provider_id="corp-qwen", upstream_model="qwen3_coder"))
     )
     assert headers["Authorization"] == "Bearer secret-appkey"
+
+
+def test_qwen_signature_defaults_to_fresh_request_id_per_call() -> None:
+    auth = QwenSignatureAuth(appid="deepinsi", appkey="secret")
+    context = AuthContext(provider_id="corp-qwen", upstream_model="qwen3_coder")
+    first = asyncio.run(auth.headers(context))
+    second = asyncio.run(auth.headers(context))
+    csids = [
+        json.loads(base64.b64decode(headers["X-Server-Param"]))["csid"]
+        for headers in (first, second)
+    ]
+    assert csids[0] != csids[1]
+    assert csids[0][:32] == csids[1][:32] == "deepinsiqwen3_coder0000000000000"
+
+
+def test_qwen_signature_reuses_headers_within_same_second_when_enabled(monkeypatch) -> None:
+    now = [1_700_000_000.2]
+    monkeypatch.setattr("app.auth.strategies.time.time", lambda: now[0])
+    auth = QwenSignatureAuth(appid="deepinsi", appkey="secret", token_ttl_seconds=1.0)
+    context = AuthContext(provider_id="corp-qwen", upstream_model="qwen3_coder")
+
+    first = asyncio.run(auth.headers(context))
+    second = asyncio.run(auth.headers(context))
+    now[0] += 1.0
+    third = asyncio.run(auth.headers(context))
+
+    assert first is second
+    assert third["X-CurTime"] == str(int(now[0]))
+    assert auth.stats() == {"ttl_seconds": 1.0, "hits": 1, "misses": 2}
+
+
+def test_qwen_signature_cache_can_be_disabled() -> None:
+    auth = QwenSignatureAuth(appid="deepinsi", appkey="secret", token_ttl_seconds=0)
+    context = AuthContext(provider_id="corp-qwen", upstream_model="qwen3_coder")
+    first = asyncio.run(auth.headers(context))
+    second = asyncio.run(auth.headers(context))
+    assert first["X-Server-Param"] != second["X-Server-Param"]
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from app.body import RequestBody
+
+
+def test_reads_model_and_stream_from_raw_body() -> None:
+    raw = b'{"messages":[{"role":"user","content":"{\\"model\\": [}"}],"model":"alias","stream":true}'
+    body = RequestBody.from_bytes(raw)
+    assert body.model == "alias"
+    assert body.stream is True
+    assert body.get("messages")[0]["content"] == '{"model": [}'
+
+
+def test_forwarded_splices_upstream_model_and_keeps_other_bytes() -> None:
+    raw = b'{ "model" : "alias",\n "messages": [{"role": "user", "content": "hi"}], "temperature": 0 }'
+    forwarded = RequestBody.from_bytes(raw).forwarded("upstream-x", default_stream=False)
+    parsed = json.loads(forwarded)
+    assert parsed == {
+        "model": "upstream-x",
+        "stream": False,
+        "messages": [{"role": "user", "content": "hi"}],
+        "temperature": 0,
+    }
+    assert b'"messages": [{"role": "user", "content": "hi"}], "temperature": 0 }' in forwarded
+
+
+def test_forwarded_keeps_explicit_stream_flag() -> None:
+    raw = b'{"model":"alias","stream":true}'
+    forwarded = RequestBody.from_bytes(raw).forwarded("up", default_stream=False)
+    assert json.loads(forwarded) == {"model": "up", "stream": True}
+
+
+def test_dict_and_raw_bodies_forward_the_same_payload() -> None:
+    payload = {"model": "alias", "messages": [{"role": "user", "content": "你好"}]}
+    from_dict = RequestBody.from_payload(payload).forwarded("up")
+    from_raw = RequestBody.from_bytes(json.dumps(payload).encode()).forwarded("up")
+    assert json.loads(from_dict) == json.loads(from_raw)
+
+
+@pytest.mark.parametrize(
+    ("raw", "message"),
+    [
+        (b"not json", "Body must be valid JSON."),
+        (b'{"model": "a"', "Body must be valid JSON."),
+        (b'["model"]', "Body must be a JSON object."),
+        (b'{"model": tru}', "Body must be valid JSON."),
+    ],
+)
+def test_invalid_bodies_fall_back_to_full_parse_errors(raw: bytes, message: str) -> None:
+    with pytest.raises(ValueError, match=message):
+        RequestBody.from_bytes(raw)
+
+
+def test_duplicate_top_level_keys_use_full_parse_semantics() -> None:
+    body = RequestBody.from_bytes(b'{"model":"a","model":"b"}')
+    assert body.model == "b"
+
+
+def test_nested_model_keys_fall_back_to_reencoding() -> None:
+    raw = b'{"metadata":{"model":"client-side"},"model":"alias"}'
+    forwarded = json.loads(RequestBody.from_bytes(raw).forwarded("up"))
+    assert forwarded == {"metadata": {"model": "client-side"}, "model": "up"}
@@ -0,0 +1,104 @@
+import asyncio
+
+import httpx
+
+from app.cache import ResponseCache, is_cacheable_request, payload_fingerprint
+from app.config import ResponseCacheConfig
+
+
+def test_fingerprint_ignores_key_order() -> None:
+    route = {"provider_id": "p", "upstream_model": "up"}
+    a = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0}
+    b = {"temperature": 0, "messages": [{"content": "hi", "role": "user"}], "model": "m"}
+    key = payload_fingerprint("/chat/completions", a, **route)
+    assert key == payload_fingerprint("/chat/completions", b, **route)
+    assert key != payload_fingerprint("/completions", a, **route)
+
+
+def test_fingerprint_includes_resolved_route() -> None:
+    payload = {"model": "m", "messages": [], "temperature": 0}
+    key = payload_fingerprint("/chat/completions", payload, provider_id="p", upstream_model="up")
+    assert key != payload_fingerprint(
+        "/chat/completions", payload, provider_id="q", upstream_model="up"
+    )
+    assert key != payload_fingerprint(
+        "/chat/completions", payload, provider_id="p", upstream_model="up-v2"
+    )
+
+
+def test_only_deterministic_or_opted_in_requests_are_cacheable() -> None:
+    payload = {"model": "m", "messages": [], "temperature": 0}
+    assert is_cacheable_request("/chat/completions", payload, {})
+    assert not is_cacheable_request("/chat/completions", {**payload, "temperature": 0.7}, {})
+    assert is_cacheable_request(
+        "/chat/completions", {**payload, "temperature": 0.7}, {"x-gateway-cache": "on"}
+    )
+    assert not is_cacheable_request("/chat/completions", payload, {"x-gateway-cache": "bypass"})
+    assert not is_cacheable_request("/chat/completions", {**payload, "stream": True}, {})
+
+
+def test_lru_evicts_by_bytes_and_honours_ttl() -> None:
+    async def run() -> None:
+        cache = ResponseCache(ResponseCacheConfig(enabled=True, max_bytes=10, ttl_seconds=60))
+        await cache.put("a", status_code=200, body=b"123456")
+        await cache.put("b", status_code=200, body=b"123456")
+        assert await cache.get("a") is None
+        assert (await cache.get("b")).body == b"123456"
+
+        expired = ResponseCache(ResponseCacheConfig(enabled=True, ttl_seconds=-1))
+        await expired.put("a", status_code=200, body=b"x")
+        assert await expired.get("a") is None
+
+    asyncio.run(run())
+
+
+def test_disk_tier_survives_new_instance(tmp_path) -> None:
+    async def run() -> None:
+        config = ResponseCacheConfig(enabled=True, disk_dir=str(tmp_path))
+        await ResponseCache(config).put("k" * 64, status_code=200, body=b'{"ok":true}')
+        fresh = ResponseCache(config)
+        entry = await fresh.get("k" * 64)
+        assert entry is not None
+        assert entry.body == b'{"ok":true}'
+        assert fresh.disk_hits == 1
+
+    asyncio.run(run())
+
+
+def test_disk_tier_drops_malformed_entries(tmp_path) -> None:
+    async def run() -> None:
+        config = ResponseCacheConfig(enabled=True, disk_dir=str(tmp_path))
+        cache = ResponseCache(config)
+        for key, header in (
+            ("a" * 64, b'{"expires_at": 9e18}'),
+            ("b" * 64, b'{"status_code": "teapot", "expires_at": 9e18}'),
+            ("c" * 64, b'["not", "a", "dict"]'),
+        ):
+            path = tmp_path / key[:2] / f"{key}.bin"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(header + b"\n{}")
+            assert await cache.get(key) is None
+            assert not path.exists()
+        assert cache.misses == 3
+
+    asyncio.run(run())
+
+
+def test_gateway_serves_repeated_deterministic_request_from_cache(mock_gateway) -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"id": "1", "model": "upstream", "choices": []})
+
+    async def run() -> list[str]:
+        gateway = mock_gateway(handler, response_cache={"enabled": True})
+        payload = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0}
+        first = await gateway.proxy("/chat/completions", dict(payload))
+        second = await gateway.proxy("/chat/completions", dict(payload))
+        await gateway.close()
+        assert first.body == second.body
+        return [first.headers["x-gateway-cache"], second.headers["x-gateway-cache"]]
+
+    assert asyncio.run(run()) == ["MISS", "HIT"]
+    assert len(calls) == 1
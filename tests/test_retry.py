@@ -0,0 +1,126 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.config import RetryConfig
+from app.providers.retry import RetryBudget, backoff_delay, is_retryable_error
+
+
+def _retry(**overrides) -> dict:
+    return {"retry": {"enabled": True, "backoff_base_seconds": 0, **overrides}}
+
+
+async def _drain(response) -> bytes:
+    if hasattr(response, "body_iterator"):
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return bytes(response.body)
+
+
+def test_retry_budget_caps_retries_to_ratio() -> None:
+    budget = RetryBudget(RetryConfig(budget_ratio=0.1, budget_burst=2))
+    assert budget.try_withdraw()
+    assert budget.try_withdraw()
+    assert not budget.try_withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.try_withdraw()
+    assert not budget.try_withdraw()
+    assert budget.stats()["budget_exhausted"] == 2
+
+
+def test_backoff_delay_is_jittered_and_capped() -> None:
+    config = RetryConfig(backoff_base_seconds=0.1, backoff_max_seconds=0.3)
+    assert 0 <= backoff_delay(1, config) <= 0.1
+    assert all(0 <= backoff_delay(10, config) <= 0.3 for _ in range(20))
+    assert is_retryable_error(httpx.ConnectError("refused"))
+    assert not is_retryable_error(httpx.ReadTimeout("slow"))
+
+
+def test_json_request_retries_connect_error_and_resigns(monkeypatch, mock_gateway) -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise httpx.ConnectError("connection reset")
+        return httpx.Response(200, json={"model": "up", "choices": []})
+
+    async def run() -> bytes:
+        gateway = mock_gateway(handler, provider=_retry())
+        provider = gateway.router.resolve("m").provider
+        signed = 0
+        original = provider.request_spec
+
+        async def counting_request_spec(*args, **kwargs):
+            nonlocal signed
+            signed += 1
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(provider, "request_spec", counting_request_spec)
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m"})
+            assert response.status_code == 200
+            assert signed == 2
+            assert gateway.health()["providers"]["p"]["retry"]["retries"] == 1
+            return await _drain(response)
+        finally:
+            await gateway.close()
+
+    assert b'"model":"m"' in asyncio.run(run()).replace(b" ", b"")
+    assert calls == 2
+
+
+def test_stream_request_retries_retryable_status(mock_gateway) -> None:
+    statuses = iter([503, 200])
+
+    async def sse_body():
+        yield b'data: {"choices":[]}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        status = next(statuses)
+        if status != 200:
+            return httpx.Response(status, json={"error": {"message": "busy"}})
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=sse_body()
+        )
+
+    async def run() -> bytes:
+        gateway = mock_gateway(handler, provider=_retry())
+        provider = gateway.router.resolve("m").provider
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m", "stream": True})
+            assert response.status_code == 200
+            body = await _drain(response)
+            assert provider.endpoints[0].in_flight == 0
+            return body
+        finally:
+            await gateway.close()
+
+    assert asyncio.run(run()).endswith(b"data: [DONE]\n\n")
+
+
+def test_retries_stop_when_budget_is_exhausted(mock_gateway) -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        raise httpx.ConnectError("refused")
+
+    async def run() -> None:
+        gateway = mock_gateway(
+            handler, provider=_retry(max_attempts=5, budget_burst=1, budget_ratio=0)
+        )
+        try:
+            with pytest.raises(HTTPException) as excinfo:
+                await gateway.proxy("/chat/completions", {"model": "m"})
+            assert excinfo.value.status_code == 502
+        finally:
+            await gateway.close()
+
+    asyncio.run(run())
+    assert calls == 2
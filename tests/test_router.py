@@ -21,3 +21,88 @@ def test_router_rejects_duplicate_alias() -> None:
     with pytest.raises(RuntimeError):
         router.register("qwen3_coder", "another", provider_b)
 
+
+
+def _provider(provider_id: str) -> Provider:
+    return Provider(
+        provider_id=provider_id,
+        base_url=f"http://{provider_id}.local",
+        auth_strategy=NoAuth(),
+    )
+
+
+def test_router_alias_group_prefers_faster_endpoint() -> None:
+    router = ModelRouter()
+    fast, slow = _provider("fast"), _provider("slow")
+    router.register("qwen3_fast", "qwen3", fast)
+    router.register("qwen3_slow", "qwen3", slow)
+    router.register_group("qwen3", [("qwen3_fast", 1.0), ("qwen3_slow", 1.0)])
+    fast.endpoints[0].observe(0.05)
+    slow.endpoints[0].observe(2.0)
+
+    picks = [router.resolve("qwen3").provider.provider_id for _ in range(50)]
+
+    assert set(picks) == {"fast"}
+    assert router.list_model_ids() == ["qwen3", "qwen3_fast", "qwen3_slow"]
+    models = {item["id"]: item["owned_by"] for item in router.list_openai_models()["data"]}
+    assert models["qwen3"] == "fast,slow"
+    assert len(router.list_providers()) == 2
+
+
+def test_router_alias_group_accounts_for_in_flight() -> None:
+    router = ModelRouter()
+    busy, idle = _provider("busy"), _provider("idle")
+    router.register("a", "m", busy)
+    router.register("b", "m", idle)
+    router.register_group("m", [("a", 1.0), ("b", 1.0)])
+    busy.endpoints[0].observe(0.1)
+    idle.endpoints[0].observe(0.3)
+    for _ in range(5):
+        busy.endpoints[0].begin()
+
+    assert router.resolve("m").provider.provider_id == "idle"
+
+
+def test_router_alias_group_rejects_unknown_member() -> None:
+    router = ModelRouter()
+    router.register("a", "m", _provider("a"))
+    with pytest.raises(RuntimeError, match="unknown model alias 'missing'"):
+        router.register_group("group", [("a", 1.0), ("missing", 1.0)])
+    with pytest.raises(RuntimeError, match="collides"):
+        router.register_group("a", [("a", 1.0)])
+
+
+def test_failed_attempts_do_not_make_endpoint_look_fast() -> None:
+    router = ModelRouter()
+    broken, healthy = _provider("broken"), _provider("healthy")
+    router.register("a", "m", broken)
+    router.register("b", "m", healthy)
+    router.register_group("m", [("a", 1.0), ("b", 1.0)])
+    healthy.endpoints[0].record(True, 0.5)
+    for _ in range(3):
+        broken.endpoints[0].record(False, 0.001)
+
+    assert {router.resolve("m").provider.provider_id for _ in range(20)} == {"healthy"}
+
+
+def test_unmeasured_endpoint_is_weighted_by_in_flight() -> None:
+    router = ModelRouter()
+    fresh, measured = _provider("fresh"), _provider("measured")
+    router.register("a", "m", fresh)
+    router.register("b", "m", measured)
+    router.register_group("m", [("a", 1.0), ("b", 1.0)])
+    measured.endpoints[0].observe(0.2)
+    for _ in range(3):
+        fresh.endpoints[0].begin()
+
+    assert router.resolve("m").provider.provider_id == "measured"
+
+
+def test_pick_two_choices_terminates_with_skewed_weights() -> None:
+    router = ModelRouter()
+    heavy, light = _provider("heavy"), _provider("light")
+    router.register("a", "m", heavy)
+    router.register("b", "m", light)
+    router.register_group("m", [("a", 1e9), ("b", 1e-9)])
+
+    assert router.resolve("m").provider.provider_id in {"heavy", "light"}
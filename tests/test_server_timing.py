@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+
+from app.timing import RequestTimings
+
+
+def _phases(value: str) -> dict[str, float]:
+    result = {}
+    for entry in value.split(", "):
+        name, duration = entry.split(";dur=")
+        result[name] = float(duration)
+    return result
+
+
+def test_ttft_waits_for_the_first_data_chunk_and_gaps_follow_it() -> None:
+    timings = RequestTimings(start=100.0)
+    timings.chunk(b": keep-alive\n\n", 100.5)
+    timings.chunk(b'data: {"choices":[]}\n\n', 101.0)
+    for now in (101.1, 101.2, 101.3, 102.3):
+        timings.chunk(b'data: {"choices":[]}\n\n', now)
+    timings.finish(103.0)
+
+    phases = _phases(timings.server_timing())
+    assert phases["ttft"] == 1000.0
+    assert phases["gap-p50"] == 100.0
+    assert phases["gap-max"] == 1000.0
+    assert phases["total"] == 3000.0
+    assert "queue" not in phases and "connect" not in phases
+
+
+def test_json_response_carries_server_timing(mock_gateway) -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"model": "upstream", "choices": []})
+
+    async def run() -> dict[str, float]:
+        gateway = mock_gateway(
+            handler, provider={"concurrency": {"max_in_flight": 1}}, json_passthrough=True
+        )
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m"})
+            async for _chunk in response.body_iterator:
+                pass
+            return _phases(response.headers["Server-Timing"])
+        finally:
+            await gateway.close()
+
+    phases = asyncio.run(run())
+    assert {"queue", "auth", "headers"} <= phases.keys()
+    assert "ttft" not in phases
+
+
+def test_stream_ends_with_timing_comment_when_enabled(mock_gateway) -> None:
+    async def sse_body():
+        yield b'data: {"choices":[{"delta":{"content":"a"}}]}\n\n'
+        await asyncio.sleep(0.01)
+        yield b'data: {"choices":[{"delta":{"content":"b"}}]}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=sse_body()
+        )
+
+    async def run(stream_comment: bool) -> tuple[bytes, httpx.Headers]:
+        gateway = mock_gateway(handler, server_timing={"stream_comment": stream_comment})
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m", "stream": True})
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            return body, response.headers
+        finally:
+            await gateway.close()
+
+    body, headers = asyncio.run(run(True))
+    assert "server-timing" not in headers
+    head, comment = body.rsplit(b"data: [DONE]\n\n", 1)
+    assert comment.startswith(b": server-timing ") and comment.endswith(b"\n\n")
+    phases = _phases(comment[len(b": server-timing "):].strip().decode())
+    assert phases["gap-max"] >= 10
+    assert phases["total"] >= phases["ttft"] + phases["gap-max"]
+
+    body, _ = asyncio.run(run(False))
+    assert body.endswith(b"data: [DONE]\n\n")
@@ -0,0 +1,173 @@
+import asyncio
+import signal
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.config import CircuitBreakerConfig, ClientLimitConfig
+from app.providers import circuit
+from app.providers.circuit import CircuitBreaker
+from app.ratelimit import ClientRateLimiter, RateLimitExceeded
+from app.shared import SharedStore
+
+
+def test_rate_limits_and_quota_are_shared_between_workers(tmp_path) -> None:
+    path = tmp_path / "state.sqlite3"
+    config = ClientLimitConfig(requests_per_minute=60, request_burst=2, daily_tokens=100)
+    # Two limiters on the same file stand in for two worker processes.
+    first = ClientRateLimiter({"k": config}, ClientLimitConfig(), SharedStore(path)).for_key("k")
+    second = ClientRateLimiter({"k": config}, ClientLimitConfig(), SharedStore(path)).for_key("k")
+
+    first.admit()
+    second.admit()
+    with pytest.raises(RateLimitExceeded):
+        first.admit()
+
+    second.record_tokens(100)
+    assert first.daily_used == 100
+    first.requests.take(-2)  # give the request tokens back
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        first.admit()
+    assert excinfo.value.error["code"] == "insufficient_quota"
+
+
+def test_breaker_trip_is_seen_by_other_workers(tmp_path) -> None:
+    path = tmp_path / "state.sqlite3"
+    config = CircuitBreakerConfig(consecutive_failures=1, open_seconds=30)
+    tripped, other = CircuitBreaker(config), CircuitBreaker(config)
+    tripped.share(SharedStore(path), "breaker:p:http://a")
+    other.share(SharedStore(path), "breaker:p:http://a")
+
+    assert other.try_acquire() is not None
+    tripped.record(False)
+    other._shared_checked = float("-inf")
+    assert other.try_acquire() is None
+    assert other.state == circuit.OPEN
+    assert other.retry_after() == pytest.approx(30, abs=1)
+
+
+def test_locked_store_falls_back_to_worker_local_limits(tmp_path) -> None:
+    path = tmp_path / "state.sqlite3"
+    config = ClientLimitConfig(requests_per_minute=60, request_burst=2, daily_tokens=100)
+    store = SharedStore(path)
+    client = ClientRateLimiter({"k": config}, ClientLimitConfig(), store).for_key("k")
+    client.admit()
+    client.record_tokens(10)
+
+    # Another worker holds the write lock (e.g. stalled mid-transaction).
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        client.admit()
+        with pytest.raises(RateLimitExceeded):
+            client.admit()
+        client.record_tokens(5)
+        assert client.daily_used == 15
+        assert time.monotonic() - started < 0.5
+        assert store.busy > 0
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+
+    client.record_tokens(1)
+    assert store.get(client._daily_name()) == 16
+
+
+def test_drain_rejects_new_requests_and_waits_for_streams(mock_gateway) -> None:
+    release = asyncio.Event()
+
+    async def sse_body():
+        yield b'data: {"choices":[]}\n\n'
+        await release.wait()
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=sse_body()
+        )
+
+    async def run() -> bytes:
+        gateway = mock_gateway(handler)
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m", "stream": True})
+            assert not await gateway.drain(0.01)
+            with pytest.raises(HTTPException) as excinfo:
+                await gateway.proxy("/chat/completions", {"model": "m"})
+            assert excinfo.value.status_code == 503
+            assert gateway.health()["status"] == "draining"
+
+            async def consume() -> bytes:
+                return b"".join([chunk async for chunk in response.body_iterator])
+
+            reader = asyncio.create_task(consume())
+            drained = asyncio.create_task(gateway.drain(1.0))
+            await asyncio.sleep(0.01)
+            assert not drained.done()
+            release.set()
+            assert await drained
+            return await reader
+        finally:
+            await gateway.close()
+
+    assert asyncio.run(run()).endswith(b"data: [DONE]\n\n")
+
+
+def test_sigterm_drains_before_handing_over_to_uvicorn(mock_gateway) -> None:
+    from app.main import _drain_on_sigterm
+
+    release = asyncio.Event()
+
+    async def sse_body():
+        yield b'data: {"choices":[]}\n\n'
+        await release.wait()
+        yield b"data: [DONE]\n\n"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=sse_body())
+
+    class FakeServer:
+        """Stands in for the uvicorn server whose handler gets wrapped."""
+
+        def __init__(self) -> None:
+            self.config = SimpleNamespace(timeout_graceful_shutdown=30)
+            self.exits: list[int] = []
+
+        def handle_exit(self, sig: int, frame: object) -> None:
+            self.exits.append(sig)
+
+    async def run() -> FakeServer:
+        server = FakeServer()
+        gateway = mock_gateway(handler)
+        signal.signal(signal.SIGTERM, server.handle_exit)
+        restore = _drain_on_sigterm(gateway, 30.0)
+        try:
+            response = await gateway.proxy("/chat/completions", {"model": "m", "stream": True})
+            signal.raise_signal(signal.SIGTERM)
+            assert gateway.draining
+            assert gateway.health()["status"] == "draining"
+            await asyncio.sleep(0.05)
+            assert server.exits == []  # still serving while the stream runs
+            release.set()
+            async for _chunk in response.body_iterator:
+                pass
+            for _ in range(100):
+                if server.exits:
+                    break
+                await asyncio.sleep(0.01)
+            return server
+        finally:
+            restore()
+            await gateway.close()
+
+    original = signal.getsignal(signal.SIGTERM)
+    try:
+        server = asyncio.run(run())
+    finally:
+        signal.signal(signal.SIGTERM, original)
+    assert server.exits == [signal.SIGTERM]
+    assert 0 < server.config.timeout_graceful_shutdown <= 30
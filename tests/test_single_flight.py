@@ -0,0 +1,118 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import SingleFlightConfig
+from app.singleflight import SingleFlight, StreamSource, SubscriberOverflowError
+
+
+async def _read_body(response) -> bytes:
+    if hasattr(response, "body_iterator"):
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return bytes(response.body)
+
+
+def test_identical_json_requests_share_one_upstream_call(mock_gateway) -> None:
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"id": "1", "model": "upstream", "choices": []})
+
+    async def run() -> list[bytes]:
+        gateway = mock_gateway(handler, single_flight={"enabled": True})
+        payload = {"model": "m", "messages": [{"role": "user", "content": "plan"}]}
+        responses = await asyncio.gather(
+            *[gateway.proxy("/chat/completions", dict(payload)) for _ in range(3)]
+        )
+        await gateway.close()
+        return [bytes(response.body) for response in responses]
+
+    bodies = asyncio.run(run())
+    assert len(calls) == 1
+    assert len(set(bodies)) == 1
+    assert b'"model":"m"' in bodies[0]
+
+
+def test_identical_stream_requests_fan_out_one_upstream_stream(mock_gateway) -> None:
+    calls = []
+
+    async def sse_body():
+        for token in ["a", "b", "c"]:
+            await asyncio.sleep(0.01)
+            yield f'data: {{"choices":[{{"delta":{{"content":"{token}"}}}}]}}\n\n'.encode()
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=sse_body()
+        )
+
+    async def run() -> list[bytes]:
+        gateway = mock_gateway(handler, single_flight={"enabled": True})
+        payload = {"model": "m", "stream": True, "messages": [{"role": "user", "content": "x"}]}
+        responses = await asyncio.gather(
+            *[gateway.proxy("/chat/completions", dict(payload)) for _ in range(3)]
+        )
+        bodies = await asyncio.gather(*[_read_body(response) for response in responses])
+        await gateway.close()
+        return bodies
+
+    bodies = asyncio.run(run())
+    assert len(calls) == 1
+    assert len(set(bodies)) == 1
+    assert bodies[0].endswith(b"data: [DONE]\n\n")
+
+
+def test_slow_subscriber_is_dropped_when_buffer_overflows() -> None:
+    async def chunks():
+        for index in range(10):
+            yield str(index).encode()
+
+    async def open_source() -> StreamSource:
+        return StreamSource(status_code=200, media_type="text/event-stream", headers={}, chunks=chunks())
+
+    async def run() -> list[bytes]:
+        flight = SingleFlight(SingleFlightConfig(enabled=True, subscriber_buffer_chunks=2))
+        source = await flight.stream("k", open_source)
+        await asyncio.sleep(0.01)
+        received = []
+        with pytest.raises(SubscriberOverflowError):
+            async for chunk in source.chunks:
+                received.append(chunk)
+        return received
+
+    assert asyncio.run(run()) == [b"0", b"1"]
+
+
+def test_late_joiner_replays_history_longer_than_buffer() -> None:
+    more = asyncio.Event()
+
+    async def chunks():
+        for index in range(7):
+            if index == 5:
+                await more.wait()
+            yield str(index).encode()
+            # Let the leader keep up; only the late joiner is behind.
+            await asyncio.sleep(0.001)
+
+    async def open_source() -> StreamSource:
+        return StreamSource(status_code=200, media_type="text/event-stream", headers={}, chunks=chunks())
+
+    async def drain(source: StreamSource) -> list[bytes]:
+        return [chunk async for chunk in source.chunks]
+
+    async def run() -> tuple[list[bytes], list[bytes]]:
+        flight = SingleFlight(SingleFlightConfig(enabled=True, subscriber_buffer_chunks=2))
+        leader = await flight.stream("k", open_source)
+        leading = asyncio.ensure_future(drain(leader))
+        await asyncio.sleep(0.01)
+        joiner = await flight.stream("k", open_source)
+        more.set()
+        return await leading, await drain(joiner)
+
+    expected = [str(index).encode() for index in range(7)]
+    assert asyncio.run(run()) == (expected, expected)
@@ -0,0 +1,145 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from starlette.requests import Request
+
+from app.config import UsageLedgerConfig
+from app.ledger import UsageLedger
+
+
+def test_ledger_books_json_and_stream_usage_per_key(mock_gateway, tmp_path) -> None:
+    async def sse_body():
+        yield b'data: {"choices":[{"delta":{"content":"hi"}}],"usage":null}\n\n'
+        yield b'data: {"choices":[],"usage":{"prompt_tokens":7,"completion_tokens":3,"total_tokens":10}}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if b'"stream":true' in request.content.replace(b" ", b""):
+            return httpx.Response(
+                200, headers={"content-type": "text/event-stream"}, content=sse_body()
+            )
+        return httpx.Response(
+            200,
+            json={"model": "upstream", "usage": {"input_tokens": 4, "output_tokens": 1}},
+        )
+
+    async def run() -> tuple[list[dict], list[dict]]:
+        gateway = mock_gateway(
+            handler,
+            json_passthrough=True,
+            client_api_keys=["alpha-key-0001", "bravo-key-0002"],
+            usage_ledger={"enabled": True, "path": str(tmp_path / "usage.sqlite3")},
+        )
+        await gateway.start()
+        try:
+            for key, stream in (
+                ("alpha-key-0001", True),
+                ("alpha-key-0001", False),
+                ("bravo-key-0002", False),
+            ):
+                response = await gateway.proxy(
+                    "/chat/completions",
+                    {"model": "m", "stream": stream},
+                    headers={"authorization": f"Bearer {key}"},
+                )
+                async for _chunk in response.body_iterator:
+                    pass
+            # Nothing is written until the background flush.
+            assert gateway.usage_ledger.stats()["pending_rows"] == 2
+            by_client = await gateway.usage_ledger.query(group_by=("client",))
+            by_day = await gateway.usage_ledger.query(group_by=("day", "alias", "provider"))
+            return by_client, by_day
+        finally:
+            await gateway.close()
+
+    by_client, by_day = asyncio.run(run())
+    # Keys are booked masked, never in full.
+    assert by_client == [
+        {"client": "alph...01", "requests": 2, "prompt_tokens": 11, "completion_tokens": 4, "total_tokens": 15},
+        {"client": "brav...02", "requests": 1, "prompt_tokens": 4, "completion_tokens": 1, "total_tokens": 5},
+    ]
+    assert len(by_day) == 1 and by_day[0]["alias"] == "m" and by_day[0]["provider"] == "p"
+    assert by_day[0]["total_tokens"] == 20
+
+
+def test_failed_flush_keeps_totals_for_the_next_one(tmp_path) -> None:
+    async def run() -> tuple[int, list[dict]]:
+        ledger = UsageLedger(UsageLedgerConfig(enabled=True, path=str(tmp_path / "usage.sqlite3")))
+        ledger.record("k", "m", "p", {"prompt_tokens": 2, "completion_tokens": 1})
+        write = ledger._write
+
+        def broken(batch):
+            raise sqlite3.OperationalError("database is locked")
+
+        ledger._write = broken
+        assert await ledger.flush() == 0
+        ledger.record("k", "m", "p", {"prompt_tokens": 2, "completion_tokens": 1})
+        ledger._write = write
+        written = await ledger.flush()
+        rows = await ledger.query(group_by=())
+        await ledger.close()
+        return written, rows
+
+    written, rows = asyncio.run(run())
+    assert written == 1
+    assert rows == [{"requests": 2, "prompt_tokens": 4, "completion_tokens": 2, "total_tokens": 6}]
+
+
+def test_query_rejects_unknown_group(tmp_path) -> None:
+    async def run() -> None:
+        ledger = UsageLedger(UsageLedgerConfig(enabled=True, path=str(tmp_path / "usage.sqlite3")))
+        try:
+            with pytest.raises(ValueError):
+                await ledger.query(group_by=("model; DROP TABLE usage",))
+        finally:
+            await ledger.close()
+
+    asyncio.run(run())
+
+
+def test_usage_endpoint_shows_other_clients_only_to_admin_keys(mock_gateway, tmp_path) -> None:
+    from app.main import usage
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"usage": {"prompt_tokens": 1, "completion_tokens": 1}})
+
+    async def run() -> dict[str, list[dict]]:
+        gateway = mock_gateway(
+            handler,
+            client_api_keys=["alpha-key-0001", "bravo-key-0002", "admin-key-0003"],
+            usage_ledger={
+                "enabled": True,
+                "path": str(tmp_path / "usage.sqlite3"),
+                "admin_keys": ["admin-key-0003"],
+            },
+        )
+        app = SimpleNamespace(state=SimpleNamespace(gateway=gateway))
+        await gateway.start()
+        try:
+            for key in ("alpha-key-0001", "bravo-key-0002"):
+                await gateway.proxy(
+                    "/chat/completions", {"model": "m"}, headers={"authorization": f"Bearer {key}"}
+                )
+            await gateway.usage_ledger.flush()
+            results = {}
+            for key, client in (
+                ("alpha-key-0001", None),
+                ("alpha-key-0001", "brav...02"),
+                ("admin-key-0003", None),
+            ):
+                request = Request(
+                    {"type": "http", "app": app, "headers": [(b"authorization", f"Bearer {key}".encode())]}
+                )
+                result = await usage(request, group_by="client", client=client)
+                results[f"{key}:{client}"] = [row["client"] for row in result["data"]]
+            return results
+        finally:
+            await gateway.close()
+
+    results = asyncio.run(run())
+    assert results["alpha-key-0001:None"] == ["alph...01"]
+    assert results["alpha-key-0001:brav...02"] == ["alph...01"]
+    assert results["admin-key-0003:None"] == ["alph...01", "brav...02"]